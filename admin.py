@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import TeacherProfile, Assignment, Quiz
+from .models import (
+    TeacherProfile, Assignment, Quiz, GradebookEntry, DataJob, AccountInvite, ProfilingSession,
+    AutomationRule, AutomationAlert, AutomationRun, RiskModelRun, StudentRiskScore,
+    SystemSetting, ApiTokenVersion, SchoolAnnouncement, AnnouncementCursor,
+)
 
 @admin.register(TeacherProfile)
 class TeacherProfileAdmin(admin.ModelAdmin):
@@ -15,3 +19,73 @@ class AssignmentAdmin(admin.ModelAdmin):
 class QuizAdmin(admin.ModelAdmin):
     list_display = ('title', 'subject', 'classroom')
     search_fields = ('title', 'subject__name', 'classroom__name')
+
+@admin.register(GradebookEntry)
+class GradebookEntryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'classroom', 'subject', 'weighted_percentage', 'rank', 'percentile')
+    list_filter = ('classroom', 'subject')
+    search_fields = ('student__username', 'classroom__name', 'subject__name')
+
+@admin.register(DataJob)
+class DataJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'job_type', 'status', 'rows_done', 'rows_total', 'created_by', 'created_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('rows_done', 'rows_total', 'artifact', 'artifact_size', 'worker',
+                       'started_at', 'finished_at', 'heartbeat_at')
+
+@admin.register(AccountInvite)
+class AccountInviteAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'expires_at', 'used_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('token_hash',)
+
+@admin.register(ProfilingSession)
+class ProfilingSessionAdmin(admin.ModelAdmin):
+    list_display = ('url_pattern', 'user', 'requests_remaining', 'interval_ms', 'created_by', 'expires_at')
+    search_fields = ('url_pattern', 'user__username')
+
+@admin.register(AutomationRule)
+class AutomationRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'rule_type', 'status', 'interval_minutes', 'last_run_at', 'next_run_at')
+    list_filter = ('rule_type', 'status')
+
+@admin.register(AutomationAlert)
+class AutomationAlertAdmin(admin.ModelAdmin):
+    list_display = ('rule', 'user', 'message', 'created_at', 'resolved_at')
+    list_filter = ('rule',)
+    search_fields = ('user__username',)
+
+@admin.register(AutomationRun)
+class AutomationRunAdmin(admin.ModelAdmin):
+    list_display = ('rule', 'started_at', 'duration_ms', 'matched', 'alerts_created', 'alerts_resolved')
+    list_filter = ('rule',)
+
+@admin.register(RiskModelRun)
+class RiskModelRunAdmin(admin.ModelAdmin):
+    list_display = ('scored_at', 'trained_at', 'students_scored', 'training_rows', 'train_ms', 'score_ms')
+    readonly_fields = ('feature_names', 'coefficients', 'means', 'scales', 'summary')
+
+@admin.register(StudentRiskScore)
+class StudentRiskScoreAdmin(admin.ModelAdmin):
+    list_display = ('student', 'score', 'level', 'top_factor', 'scored_at')
+    list_filter = ('level',)
+    search_fields = ('student__username',)
+
+@admin.register(SystemSetting)
+class SystemSettingAdmin(admin.ModelAdmin):
+    list_display = ('key', 'value', 'updated_by', 'updated_at')
+
+@admin.register(ApiTokenVersion)
+class ApiTokenVersionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'version', 'revoked_at')
+    search_fields = ('user__username',)
+
+@admin.register(SchoolAnnouncement)
+class SchoolAnnouncementAdmin(admin.ModelAdmin):
+    list_display = ('message', 'author', 'created_at')
+    search_fields = ('message',)
+
+@admin.register(AnnouncementCursor)
+class AnnouncementCursorAdmin(admin.ModelAdmin):
+    list_display = ('user', 'classroom', 'last_read_id', 'updated_at')
+    search_fields = ('user__username',)
@@ -0,0 +1,134 @@
+"""
+Announcement delivery with per-user read cursors
+
+Announcements are stored once per stream: classroom.Announcement for a
+classroom, SchoolAnnouncement for the whole school. Nothing is written per
+recipient, so posting to a 2,000-member school audience is one INSERT.
+
+What a user has read is an AnnouncementCursor per stream (the last read
+announcement id; the school stream has classroom=None). Ids only grow, so
+"unread" is "id greater than the cursor", and unread_counts() is a single
+query: a grouped count over the user's classroom streams, each compared with
+its cursor through the (user, classroom) unique index, UNION the school
+stream. Marking a stream read moves one cursor forward, never back and never
+past the stream's newest announcement.
+
+A user's classroom streams (their own classroom, their children's, or the
+ones they teach) are cached under the 'students', 'family' and 'classrooms'
+version groups.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from classroom.models import Announcement, Classroom
+from users.models import StudentProfile
+
+from . import caching
+from .models import AnnouncementCursor, SchoolAnnouncement
+
+SCHOOL = None
+INBOX_SIZE = 20
+
+
+def classroom_ids(user):
+    """Sorted ids of the classrooms whose announcements reach the user"""
+    def build():
+        role = getattr(user, 'role', None)
+        if role == 'student':
+            profiles = StudentProfile.objects.filter(user=user)
+        elif role == 'parent':
+            profiles = StudentProfile.objects.filter(parents__user=user)
+        else:
+            return sorted(Classroom.objects.filter(teacher=user).values_list('pk', flat=True))
+        return sorted(set(profiles.exclude(classroom=None).values_list('classroom_id', flat=True)))
+    return caching.cached('announcement_classrooms', ['students', 'family', 'classrooms'], build, key=[user.pk])
+
+
+def _last_read(user, classroom):
+    return Coalesce(
+        Subquery(AnnouncementCursor.objects.filter(user=user, classroom=classroom).values('last_read_id')[:1]),
+        0, output_field=BigIntegerField(),
+    )
+
+
+def unread_counts(user):
+    """{classroom_id: unread, SCHOOL: unread} for the user's streams that have unread announcements"""
+    by_classroom = (Announcement.objects
+                    .filter(classroom_id__in=classroom_ids(user), pk__gt=_last_read(user, OuterRef('classroom_id')))
+                    .annotate(stream=F('classroom_id'))
+                    .values_list('stream')
+                    .annotate(unread=Count('pk'))
+                    .order_by())
+    school = (SchoolAnnouncement.objects
+              .filter(pk__gt=_last_read(user, None))
+              .annotate(stream=Value(SCHOOL, output_field=IntegerField()))
+              .values_list('stream')
+              .annotate(unread=Count('pk'))
+              .order_by())
+    # The school count is over the whole table, so it comes back as 0 rather than no row
+    return {stream: unread for stream, unread in by_classroom.union(school, all=True) if unread}
+
+
+def unread_total(user):
+    return sum(unread_counts(user).values())
+
+
+def inbox(user, limit=INBOX_SIZE):
+    """The user's newest announcements from every stream, newest first, each flagged unread or not"""
+    classrooms = classroom_ids(user)
+    cursors = dict(AnnouncementCursor.objects.filter(Q(classroom__in=classrooms) | Q(classroom=None), user=user)
+                   .values_list('classroom_id', 'last_read_id'))
+    by_classroom = (Announcement.objects.filter(classroom_id__in=classrooms)
+                    .annotate(stream=F('classroom_id'), stream_name=F('classroom__name'))
+                    .values_list('pk', 'stream', 'stream_name', 'message', 'created_at')
+                    .order_by())
+    school = (SchoolAnnouncement.objects
+              .annotate(stream=Value(SCHOOL, output_field=IntegerField()), stream_name=Value('School'))
+              .values_list('pk', 'stream', 'stream_name', 'message', 'created_at')
+              .order_by())
+    rows = by_classroom.union(school, all=True).order_by('-created_at')[:limit]
+    return [
+        {'id': pk, 'classroom': classroom, 'stream': name, 'message': message, 'created_at': created_at,
+         'unread': pk > cursors.get(classroom, 0)}
+        for pk, classroom, name, message, created_at in rows
+    ]
+
+
+def post(message, classroom=None, author=None):
+    """Publish to a classroom, or to the whole school without one; the same single write for any audience"""
+    if classroom is None:
+        return SchoolAnnouncement.objects.create(message=message, author=author)
+    return Announcement.objects.create(classroom=classroom, message=message)
+
+
+def latest_id(classroom_id=SCHOOL):
+    stream = (SchoolAnnouncement.objects.all() if classroom_id is SCHOOL
+              else Announcement.objects.filter(classroom_id=classroom_id))
+    return stream.aggregate(latest=Max('pk'))['latest'] or 0
+
+
+def mark_read(user, classroom_id=SCHOOL, up_to=None):
+    """
+    Move the user's cursor for a stream forward to `up_to` (by default, and at
+    most, its newest announcement); returns where the cursor now is
+    """
+    latest = latest_id(classroom_id)
+    # Past the newest id the cursor would hide announcements posted later
+    up_to = latest if up_to is None else min(up_to, latest)
+    cursors = AnnouncementCursor.objects.filter(user=user, classroom_id=classroom_id)
+    if cursors.filter(last_read_id__lt=up_to).update(last_read_id=up_to):
+        return up_to
+    last_read = cursors.values_list('last_read_id', flat=True).first()
+    if last_read is not None:
+        # Already at or past up_to
+        return last_read
+    try:
+        with transaction.atomic():
+            AnnouncementCursor.objects.create(user=user, classroom_id=classroom_id, last_read_id=up_to)
+    except IntegrityError:
+        # Created concurrently: move that one forward instead
+        cursors.filter(last_read_id__lt=up_to).update(last_read_id=up_to)
+        return cursors.values_list('last_read_id', flat=True).get()
+    return up_to
@@ -0,0 +1,156 @@
+"""
+Cached JWT authentication for the API
+
+SimpleJWT's JWTAuthentication loads the user row on every request.
+CachedJWTAuthentication keeps the users it resolved in a bounded LRU per
+process (JWT_USER_CACHE_SIZE entries), each until the token that loaded it
+expires, so clients polling the API are authenticated without a query.
+
+Revocation goes through a version counter per user (ApiTokenVersion):
+
+- tokens from VersionedTokenObtainPairSerializer carry the version current
+  when they were issued, and a token older than the user's version is
+  rejected
+- cached users are only used while their version is current, so the next
+  request after a bump reloads the user (and fails if it was deactivated)
+- revoke_tokens() bumps it, and so does any change to a user's password,
+  active flag or role (see signals)
+
+The current versions are read through the cache for JWT_VERSION_CACHE_TIMEOUT
+seconds. With a cache shared by all workers a revocation applies everywhere
+on the next request; with the local-memory cache other workers see it
+within that timeout.
+
+Settings:
+
+    SIMPLE_JWT = {'TOKEN_OBTAIN_SERIALIZER': 'teacher.api_auth.VersionedTokenObtainPairSerializer'}
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ApiTokenVersion
+
+VERSION_CLAIM = 'ver'
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_VERSION_TIMEOUT = 60
+
+
+def _version_key(user_id):
+    return f'teacher:token_version:{user_id}'
+
+
+def _version_timeout():
+    return getattr(settings, 'JWT_VERSION_CACHE_TIMEOUT', DEFAULT_VERSION_TIMEOUT)
+
+
+def token_version(user_id):
+    """The user's current token version (0 until their tokens are first revoked)"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = ApiTokenVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+        cache.set(_version_key(user_id), version, _version_timeout())
+    return version
+
+
+def revoke_tokens(user_id):
+    """Reject every token issued to the user so far and drop them from the user caches"""
+    with transaction.atomic():
+        if not ApiTokenVersion.objects.filter(user_id=user_id).update(version=F('version') + 1):
+            ApiTokenVersion.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+        version = ApiTokenVersion.objects.get(user_id=user_id).version
+    publish_version(user_id, version)
+    return version
+
+
+def publish_version(user_id, version):
+    cache.set(_version_key(user_id), version, _version_timeout())
+    users.discard(user_id)
+
+
+class UserCache:
+    """Thread-safe LRU of user_id -> (user, version, expires_at)"""
+
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return self._max_size or getattr(settings, 'JWT_USER_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, cached_version, expires_at = entry
+            if cached_version != version or expires_at <= time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user_id, user, version, expires_at):
+        with self._lock:
+            self._entries[user_id] = (user, version, expires_at)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+users = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves users from the LRU while their token version is current"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        version = token_version(user_id)
+        if validated_token.get(VERSION_CLAIM, 0) < version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        user = users.get(user_id, version)
+        if user is None:
+            user = super().get_user(validated_token)
+            users.put(user_id, user, version, validated_token['exp'])
+        # Each request gets its own copy, so nothing set on request.user leaks into the next
+        return copy.copy(user)
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues token pairs stamped with the user's current token version"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[VERSION_CLAIM] = token_version(user.pk)
+        return token
@@ -0,0 +1,181 @@
+"""
+Rule-based automation
+
+Each AutomationRule type compiles to one set-based query over the whole
+school (an aggregate grouped by student or teacher), so a run costs a fixed
+number of queries however many students there are. The users it returns
+are diffed against the rule's open alerts:
+
+- users matched for the first time get an alert (one bulk insert)
+- users with an open alert are not alerted again while they keep matching
+- open alerts of users who no longer match are resolved (one update), so a
+  later relapse raises a new alert
+
+Rules run on their own interval from the run_automation command (cron or
+--interval); every run is logged as an AutomationRun and timed in the
+automation_rule_duration_seconds metric.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, F, FloatField, OuterRef, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from grades.models import Grade
+
+from . import system_settings
+from .metrics import AUTOMATION_ALERTS, AUTOMATION_RULE_DURATION
+from .models import AutomationAlert, AutomationRule, AutomationRun
+
+logger = logging.getLogger(__name__)
+
+RULE_TYPES = {}
+
+
+def rule_type(name, **defaults):
+    """Register the query for a rule type; defaults are overridden by AutomationRule.params"""
+    def register(func):
+        RULE_TYPES[name] = (func, defaults)
+        return func
+    return register
+
+
+@rule_type('low_attendance', days=14, threshold=None, min_sessions=3)
+def low_attendance(now, days, threshold, min_sessions):
+    """Students whose attendance percentage over the last `days` days is below `threshold`"""
+    if threshold is None:
+        threshold = system_settings.get('attendance_threshold')
+    rows = (
+        AttendanceRecord.objects
+        .filter(session__start_time__gte=now - timedelta(days=days), session__start_time__lte=now,
+                student__is_active=True)
+        .values('student')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status='present')))
+        .filter(total__gte=min_sessions)
+        .annotate(rate=Cast('present', FloatField()) * 100 / F('total'))
+        .filter(rate__lt=threshold)
+        .values_list('student', 'rate')
+    )
+    return {student: (rate, f"Attendance {rate:.1f}% over the last {days} days") for student, rate in rows}
+
+
+@rule_type('missing_attendance', hours=24, grace_minutes=30)
+def missing_attendance(now, hours, grace_minutes):
+    """Teachers with sessions that started in the last `hours` hours and have no attendance marked"""
+    rows = (
+        AttendanceSession.objects
+        .filter(start_time__gte=now - timedelta(hours=hours), start_time__lte=now - timedelta(minutes=grace_minutes))
+        .filter(~Exists(AttendanceRecord.objects.filter(session=OuterRef('pk'))))
+        .values('teacher')
+        .annotate(sessions=Count('id'))
+        .values_list('teacher', 'sessions')
+    )
+    return {teacher: (sessions, f"{sessions} session(s) without attendance in the last {hours} hours")
+            for teacher, sessions in rows}
+
+
+@rule_type('low_grades', days=30, threshold=60.0, min_grades=2)
+def low_grades(now, days, threshold, min_grades):
+    """Students whose average grade over the last `days` days is below `threshold`"""
+    rows = (
+        Grade.objects
+        .filter(date_assigned__gte=(now - timedelta(days=days)).date(), student__is_active=True)
+        .values('student')
+        .annotate(count=Count('id'), average=Avg('percentage'))
+        .filter(count__gte=min_grades, average__lt=threshold)
+        .values_list('student', 'average')
+    )
+    return {student: (float(average), f"Average grade {average:.1f}% over the last {days} days")
+            for student, average in rows}
+
+
+DEFAULT_RULES = [
+    {'name': 'Low Attendance Alerts', 'rule_type': 'low_attendance', 'interval_minutes': 1440,
+     'description': 'Alert when a student falls below the attendance threshold over 14 days'},
+    {'name': 'Attendance Reminders', 'rule_type': 'missing_attendance', 'interval_minutes': 60,
+     'description': 'Remind teachers of sessions with no attendance marked'},
+    {'name': 'Performance Monitoring', 'rule_type': 'low_grades', 'interval_minutes': 1440,
+     'description': 'Alert when a student averages below 60% over 30 days'},
+]
+
+
+def install_default_rules():
+    """Create the default rules that do not exist yet; returns how many were created"""
+    existing = set(AutomationRule.objects.values_list('rule_type', flat=True))
+    rules = [AutomationRule(**rule) for rule in DEFAULT_RULES if rule['rule_type'] not in existing]
+    AutomationRule.objects.bulk_create(rules)
+    return len(rules)
+
+
+def evaluate(rule, now=None):
+    """{user_id: (value, message)} for every user the rule currently matches"""
+    if rule.rule_type not in RULE_TYPES:
+        raise ValueError(f'Unknown rule type: {rule.rule_type}')
+    query, defaults = RULE_TYPES[rule.rule_type]
+    params = {**defaults, **{key: value for key, value in rule.params.items() if key in defaults}}
+    return query(now or timezone.now(), **params)
+
+
+def sync_alerts(rule, matched, now):
+    """Open alerts for newly matched users and resolve the rest; returns (created, resolved)"""
+    open_alerts = dict(AutomationAlert.objects.filter(rule=rule, resolved_at__isnull=True)
+                       .values_list('user_id', 'id'))
+    new_alerts = [
+        AutomationAlert(rule=rule, user_id=user_id, value=value, message=message[:255])
+        for user_id, (value, message) in matched.items() if user_id not in open_alerts
+    ]
+    # The partial unique index keeps a concurrent run from opening a duplicate
+    AutomationAlert.objects.bulk_create(new_alerts, ignore_conflicts=True)
+    stale = [alert_id for user_id, alert_id in open_alerts.items() if user_id not in matched]
+    resolved = AutomationAlert.objects.filter(id__in=stale).update(resolved_at=now) if stale else 0
+    return len(new_alerts), resolved
+
+
+def run_rule(rule, now=None):
+    """Evaluate one rule, update its alerts and log the run"""
+    now = now or timezone.now()
+    run = AutomationRun(rule=rule, started_at=now)
+    start = time.perf_counter()
+    try:
+        with transaction.atomic():
+            matched = evaluate(rule, now)
+            run.alerts_created, run.alerts_resolved = sync_alerts(rule, matched, now)
+        run.matched = len(matched)
+        outcome = 'completed'
+    except Exception as e:
+        logger.exception('Automation rule %s failed', rule.pk)
+        run.error = str(e) or e.__class__.__name__
+        outcome = 'failed'
+    elapsed = time.perf_counter() - start
+    run.duration_ms = elapsed * 1000
+    run.save()
+    AUTOMATION_RULE_DURATION.observe(elapsed, rule=str(rule.pk), rule_type=rule.rule_type, outcome=outcome)
+    AUTOMATION_ALERTS.inc(run.alerts_created, rule_type=rule.rule_type)
+    return run
+
+
+def claim(rule, now):
+    """Schedule the rule's next run; False if another runner already took this one"""
+    next_run_at = now + timedelta(minutes=rule.interval_minutes)
+    claimed = AutomationRule.objects.filter(pk=rule.pk, next_run_at=rule.next_run_at).update(
+        last_run_at=now, next_run_at=next_run_at)
+    rule.last_run_at, rule.next_run_at = now, next_run_at
+    return bool(claimed)
+
+
+def due_rules(now=None):
+    now = now or timezone.now()
+    return AutomationRule.objects.filter(status='active').filter(
+        Q(next_run_at__isnull=True) | Q(next_run_at__lte=now))
+
+
+def run_due_rules(now=None, force=False):
+    """Run every active rule whose interval has elapsed (every active rule with force)"""
+    now = now or timezone.now()
+    rules = AutomationRule.objects.filter(status='active') if force else due_rules(now)
+    return [run_rule(rule, now) for rule in rules if claim(rule, now)]
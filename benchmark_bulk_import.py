@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Benchmark the bulk CSV importer: import 50k students with classroom and
+parent links, then re-import the same file as an update. Everything runs in
+one transaction that is rolled back, so the database is left untouched.
+"""
+
+import io
+import os
+import sys
+import time
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from django.db import transaction
+
+from classroom.models import Classroom
+from users.models import CustomUser, ParentProfile
+from teacher.bulk_import import import_csv
+
+ROWS = int(os.environ.get('BENCH_IMPORT_ROWS', 50_000))
+PARENTS = 500
+PREFIX = 'bench_import'
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_csv(classroom):
+    lines = ['username,first_name,last_name,email,student_id,classroom,parent_username']
+    for i in range(ROWS):
+        lines.append(f'{PREFIX}_{i},Student,{i},{PREFIX}_{i}@example.com,BI{i:07d},'
+                     f'{classroom.name},{PREFIX}_parent_{i % PARENTS}')
+    return '\n'.join(lines) + '\n'
+
+
+def timed_import(label, text):
+    start = time.perf_counter()
+    result = import_csv('students', io.StringIO(text))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {elapsed:>7.2f} s  {ROWS / elapsed:>10,.0f} rows/s  "
+          f"created={result.created:,} updated={result.updated:,} failed={result.failed}")
+    return result
+
+
+def run_benchmark():
+    print("📥 Bulk import benchmark")
+    print("=" * 50)
+    print(f"Students: {ROWS:,}  Parents: {PARENTS}")
+
+    try:
+        with transaction.atomic():
+            teacher = CustomUser.objects.create_user(username=f'{PREFIX}_teacher', role='teacher')
+            classroom = Classroom.objects.create(name=f'{PREFIX}_class', grade='9th', teacher=teacher)
+            for i in range(PARENTS):
+                user = CustomUser.objects.create_user(username=f'{PREFIX}_parent_{i}', role='parent')
+                ParentProfile.objects.create(user=user)
+            text = build_csv(classroom)
+
+            created = timed_import('create', text)
+            updated = timed_import('update', text)
+            raise Rollback
+    except Rollback:
+        pass
+
+    if created.created != ROWS or updated.updated != ROWS:
+        print("❌ Not every row was imported")
+        sys.exit(1)
+    print("✅ Import complete (rolled back)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
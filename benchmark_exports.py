@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark the streaming export engine: push 10M attendance-shaped rows
+through the CSV/JSONL encoders (optionally gzip) and check that peak RSS
+stays under a fixed ceiling.
+
+    python benchmark_exports.py                 # 10M synthetic rows
+    BENCH_EXPORT_SOURCE=db python benchmark_exports.py   # stream the real attendance table
+"""
+
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from teacher import exports
+
+ROWS = int(os.environ.get('BENCH_EXPORT_ROWS', 10_000_000))
+RSS_CEILING_MB = int(os.environ.get('BENCH_EXPORT_RSS_MB', 64))
+SOURCE = os.environ.get('BENCH_EXPORT_SOURCE', 'synthetic')
+STATUSES = ['present'] * 17 + ['late'] * 2 + ['absent']
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def synthetic_rows(count):
+    start = datetime(2025, 1, 6, 9, 0)
+    for i in range(count):
+        session_start = start + timedelta(hours=i // 30)
+        yield (i + 1, i // 30 + 1, 'Mathematics - 9A', '9A', 'Mathematics', session_start,
+               i % 30 + 1, f'student_{i % 30 + 1}', STATUSES[i % 20],
+               session_start + timedelta(minutes=i % 15), '')
+
+
+def run_export(export_format, compress):
+    if SOURCE == 'db':
+        blocks = exports.export_stream(['attendance'], export_format, compress=compress)
+    else:
+        columns = [column for column, _ in exports.EXPORT_DATASETS['attendance']['fields']]
+        sections = [('attendance', columns, synthetic_rows(ROWS))]
+        blocks = exports.encode_sections(sections, export_format, compress=compress)
+
+    total = 0
+    start = time.perf_counter()
+    for block in blocks:
+        total += len(block)
+    return total, time.perf_counter() - start
+
+
+def run_benchmark():
+    print("📦 Streaming export benchmark")
+    print("=" * 50)
+    if SOURCE == 'db':
+        print("Source: attendance table")
+    else:
+        print(f"Source: synthetic  Rows: {ROWS:,}")
+    baseline = peak_rss_mb()
+    print(f"Baseline RSS: {baseline:.1f} MB  Ceiling: +{RSS_CEILING_MB} MB\n")
+
+    failed = False
+    for export_format, compress in [('csv', False), ('csv', True), ('jsonl', True)]:
+        size, elapsed = run_export(export_format, compress)
+        growth = peak_rss_mb() - baseline
+        label = export_format + ('.gz' if compress else '')
+        ok = growth <= RSS_CEILING_MB
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {label:<9} {size / 1024 / 1024:>9.1f} MB out  "
+              f"{elapsed:>7.1f} s  peak RSS growth {growth:.1f} MB")
+
+    if failed:
+        print("\n❌ Export exceeded the RSS ceiling")
+        sys.exit(1)
+    print("\n✅ All exports stayed within the RSS ceiling")
+
+
+if __name__ == '__main__':
+    run_benchmark()
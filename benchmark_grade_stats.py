@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Benchmark the vectorized grade statistics engine against per-row Python loops
+at 1M grade rows.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from teacher import grade_stats
+from teacher.grade_stats import GradeFrame, GRADE_TYPES, GRADE_TYPE_WEIGHTS
+
+ROWS = int(os.environ.get('BENCH_GRADE_ROWS', 1_000_000))
+STUDENTS = 20_000
+SUBJECTS = 15
+
+
+def build_frame(rows, seed=42):
+    """Synthetic frame with the same distribution as comprehensive_data_expansion.py"""
+    rng = np.random.default_rng(seed)
+    percentages = np.clip(rng.normal(78, 12, rows), 0, 100).round(2)
+    possible = rng.choice([10, 20, 25, 50, 100], rows).astype(np.float64)
+    return GradeFrame(
+        student_ids=rng.integers(1, STUDENTS + 1, rows),
+        subject_ids=rng.integers(1, SUBJECTS + 1, rows),
+        type_codes=rng.integers(0, len(GRADE_TYPES), rows),
+        points_earned=(percentages / 100 * possible).round(2),
+        points_possible=possible,
+        percentages=percentages,
+        days=rng.integers(739000, 739090, rows),
+    )
+
+
+def loop_weighted(frame):
+    by_type = {}
+    for student_id, type_code, percentage in zip(
+            frame.student_ids.tolist(), frame.type_codes.tolist(), frame.percentages.tolist()):
+        cell = by_type.setdefault(student_id, {}).setdefault(type_code, [0.0, 0])
+        cell[0] += percentage
+        cell[1] += 1
+    result = {}
+    for student_id, types in by_type.items():
+        weighted = total_weight = 0.0
+        for type_code, (total, count) in types.items():
+            weight = GRADE_TYPE_WEIGHTS[GRADE_TYPES[type_code]]
+            weighted += weight * total / count
+            total_weight += weight
+        result[student_id] = weighted / total_weight
+    return result
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:>10.1f} ms")
+    return result, elapsed
+
+
+def run_benchmark():
+    print("📊 Grade statistics benchmark")
+    print("=" * 50)
+    print(f"Rows: {ROWS:,}  Students: {STUDENTS:,}  Subjects: {SUBJECTS}")
+
+    frame, _ = timed("build frame", build_frame, ROWS)
+
+    print("\nVectorized:")
+    vectorized, fast = timed("weighted_percentages", grade_stats.weighted_percentages, frame)
+    timed("average_percentages", grade_stats.average_percentages, frame)
+    timed("gpa", grade_stats.gpa, frame)
+    timed("percentile_ranks", grade_stats.percentile_ranks, frame)
+    timed("moving_average_trend", grade_stats.moving_average_trend, frame)
+    timed("trend_slopes", grade_stats.trend_slopes, frame)
+
+    print("\nPython loop:")
+    looped, slow = timed("weighted_percentages", loop_weighted, frame)
+
+    mismatches = sum(1 for k, v in looped.items() if abs(vectorized[k] - v) > 1e-9)
+    print(f"\n✅ Speedup: {slow / fast:.1f}x")
+    if mismatches:
+        print(f"❌ {mismatches} students differ between implementations")
+        sys.exit(1)
+    print("✅ Results identical")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Benchmark the at-risk pipeline (feature building, retraining and scoring) on
+synthetic data for 100k students, the size of the nightly batch for a large
+district.
+"""
+
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from django.utils import timezone
+
+from teacher import risk
+from teacher.grade_stats import GRADE_TYPES, GradeFrame
+
+STUDENTS = int(os.environ.get('BENCH_RISK_STUDENTS', 100_000))
+CLASSROOMS = STUDENTS // 30
+DAYS = risk.WINDOW_DAYS + risk.HORIZON_DAYS
+SESSIONS_PER_DAY = 0.5
+GRADES_PER_STUDENT = 12
+ASSIGNMENTS_PER_CLASSROOM = 20
+TRAIN_BUDGET_S = 60
+SCORE_BUDGET_S = 30
+
+
+def build_inputs(now, seed=42):
+    """Synthetic inputs where a hidden per-student risk drives absences, grades and missed work"""
+    rng = np.random.default_rng(seed)
+    end = now.timestamp()
+    students = np.arange(1, STUDENTS + 1)
+    classrooms = rng.integers(1, CLASSROOMS + 1, STUDENTS)
+    hidden_risk = rng.beta(1.5, 6, STUDENTS)
+
+    sessions = int(DAYS * SESSIONS_PER_DAY)
+    attendance_students = np.repeat(students, sessions)
+    attendance_times = end - rng.uniform(0, DAYS * 86400, len(attendance_students))
+    absent = rng.random(len(attendance_students)) < hidden_risk[attendance_students - 1]
+    late = ~absent & (rng.random(len(attendance_students)) < 0.08)
+    status = np.where(absent, 2, np.where(late, 1, 0))
+
+    grade_students = np.repeat(students, GRADES_PER_STUDENT)
+    rows = len(grade_students)
+    percentages = np.clip(rng.normal(85 - 60 * hidden_risk[grade_students - 1], 10), 0, 100).round(2)
+    grades = GradeFrame(
+        student_ids=grade_students,
+        subject_ids=rng.integers(1, 16, rows),
+        type_codes=rng.integers(0, len(GRADE_TYPES), rows),
+        points_earned=percentages,
+        points_possible=np.full(rows, 100.0),
+        percentages=percentages,
+        days=now.date().toordinal() - rng.integers(0, DAYS, rows),
+    )
+
+    assignment_classrooms = np.repeat(np.arange(1, CLASSROOMS + 1), ASSIGNMENTS_PER_CLASSROOM)
+    assignment_due = end - rng.uniform(0, DAYS * 86400, len(assignment_classrooms))
+    submitted_students = np.repeat(students, ASSIGNMENTS_PER_CLASSROOM)
+    submitted_mask = rng.random(len(submitted_students)) > hidden_risk[submitted_students - 1]
+    submitted_students = submitted_students[submitted_mask]
+    submission_due = end - rng.uniform(0, DAYS * 86400, len(submitted_students))
+    submitted = submission_due + rng.normal(-86400, 2 * 86400, len(submitted_students))
+
+    inputs = risk.RiskInputs(
+        students, classrooms,
+        (attendance_students, attendance_times, status),
+        grades,
+        (assignment_classrooms, assignment_due),
+        (submitted_students, submission_due, submitted),
+    )
+    return inputs, hidden_risk
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:>10.1f} ms")
+    return result, elapsed
+
+
+def run_benchmark():
+    print("🎯 At-risk pipeline benchmark")
+    print("=" * 50)
+    now = timezone.now()
+    (inputs, hidden_risk), _ = timed("build synthetic inputs", build_inputs, now)
+    print(f"Students: {STUDENTS:,}  Attendance rows: {len(inputs.attendance_times):,}  "
+          f"Grades: {len(inputs.grades):,}  Submissions: {len(inputs.submitted):,}")
+
+    print("\nRetraining:")
+    as_of = now - timedelta(days=risk.HORIZON_DAYS)
+    (labels, labelled), label_time = timed("outcomes", risk.outcomes, inputs, as_of, now)
+    X_train, feature_time = timed("build_features (training)", risk.build_features, inputs, as_of)
+    model, fit_time = timed("LogisticModel.fit", risk.LogisticModel.fit, X_train[labelled], labels[labelled])
+    train_total = label_time + feature_time + fit_time
+
+    print("\nScoring:")
+    X, feature_time = timed("build_features (scoring)", risk.build_features, inputs, now)
+    scores, predict_time = timed("predict_proba", model.predict_proba, X)
+    _, factor_time = timed("top_factors", model.top_factors, X)
+    _, level_time = timed("risk_levels", risk.risk_levels, scores)
+    score_total = feature_time + predict_time + factor_time + level_time
+
+    # Higher hidden risk should mean a higher score
+    order = np.argsort(scores)
+    decile = len(order) // 10
+    bottom, top = hidden_risk[order[:decile]].mean(), hidden_risk[order[-decile:]].mean()
+    print(f"\nTraining rows: {int(labelled.sum()):,}  Positive rate: {labels[labelled].mean():.1%}")
+    print(f"Hidden risk, lowest vs highest scored decile: {bottom:.2f} vs {top:.2f}")
+    print(f"Retraining {train_total:.2f}s  Scoring {score_total:.2f}s")
+
+    if top <= bottom:
+        print("❌ Scores do not rank the riskier students higher")
+        sys.exit(1)
+    if train_total > TRAIN_BUDGET_S or score_total > SCORE_BUDGET_S:
+        print(f"❌ Over budget ({TRAIN_BUDGET_S}s retraining, {SCORE_BUDGET_S}s scoring)")
+        sys.exit(1)
+    print("✅ Nightly batch fits its budget")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Benchmark per-request session overhead for each SESSION_MODE: requests for
+an authenticated session go through SessionMiddleware, and the queries and
+time spent loading (and, for one request in ten, saving) the session are
+reported. Then a backlog of expired sessions is pruned in batches and the
+time per batch, about how long each holds the write lock, is reported.
+"""
+
+import os
+import sys
+import time
+from datetime import timedelta
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from importlib import import_module
+
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from teacher import sessions
+
+REQUESTS = int(os.environ.get('BENCH_SESSION_REQUESTS', 2000))
+EXPIRED = int(os.environ.get('BENCH_SESSION_EXPIRED', 50_000))
+BATCH_SIZE = 1000
+WRITE_EVERY = 10
+
+
+class Rollback(Exception):
+    pass
+
+
+def view(request):
+    # What AuthenticationMiddleware reads on every request
+    request.session.get('_auth_user_id')
+    if request.GET.get('write'):
+        request.session['last_page'] = request.path
+    return HttpResponse()
+
+
+def measure(mode):
+    with override_settings(**sessions.session_settings(mode)):
+        store = import_module(sessions.SESSION_MODES[mode]['SESSION_ENGINE']).SessionStore()
+        store['_auth_user_id'] = '1'
+        store.save()
+        middleware = SessionMiddleware(view)
+        factory = RequestFactory()
+        cookie = store.session_key
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for i in range(REQUESTS):
+                request = factory.get('/', {'write': '1'} if i % WRITE_EVERY == 0 else {})
+                request.COOKIES['sessionid'] = cookie
+                response = middleware(request)
+                if 'sessionid' in response.cookies:
+                    # Signed cookies change whenever the data does
+                    cookie = response.cookies['sessionid'].value
+            elapsed = time.perf_counter() - start
+    return elapsed / REQUESTS * 1e6, len(queries) / REQUESTS
+
+
+def prune_backlog():
+    now = timezone.now()
+    Session.objects.bulk_create([
+        Session(session_key=f'bench_{i:032d}', session_data='', expire_date=now - timedelta(days=1))
+        for i in range(EXPIRED)
+    ], batch_size=5000)
+    start = time.perf_counter()
+    deleted = sessions.prune_expired(batch_size=BATCH_SIZE, now=now)
+    return deleted, time.perf_counter() - start
+
+
+def run_benchmark():
+    print("🍪 Session overhead benchmark")
+    print("=" * 50)
+    print(f"Requests per mode: {REQUESTS:,} (a write every {WRITE_EVERY})  Expired sessions: {EXPIRED:,}")
+
+    results = {}
+    try:
+        with transaction.atomic():
+            print("\nPer request:")
+            for mode in sessions.SESSION_MODES:
+                micros, queries = measure(mode)
+                results[mode] = queries
+                print(f"  {mode:<16} {micros:>8.1f} µs  {queries:>5.2f} queries")
+
+            print("\nPruning:")
+            deleted, elapsed = prune_backlog()
+            batches = -(-EXPIRED // BATCH_SIZE)
+            print(f"  deleted {deleted:,} in {elapsed:.2f}s  ({batches} batches of {BATCH_SIZE}, "
+                  f"{elapsed / batches * 1000:.1f} ms each)")
+            raise Rollback
+    except Rollback:
+        pass
+
+    if results['db'] < 1 or results['signed_cookies'] > 0 or results['cached_db'] >= results['db']:
+        print("❌ Session modes do not cut session queries as expected")
+        sys.exit(1)
+    if deleted != EXPIRED:
+        print("❌ Not every expired session was pruned")
+        sys.exit(1)
+    print("✅ Cached and cookie sessions avoid the per-request session query (rolled back)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,179 @@
+"""
+View-level performance benchmarks
+
+Drives the major pages and API endpoints through the Django test client,
+logged in as the role that normally uses them, and records per endpoint:
+
+- p50/p95 latency over N timed requests (after warm-up requests)
+- the number of SQL queries one request runs
+- peak Python memory allocated during one request (tracemalloc)
+
+Results are compared with a stored JSON baseline. Query counts must not
+grow at all; latency and memory may grow by a tolerance before a scenario
+counts as a regression. Endpoints whose URL is not installed are skipped,
+so the suite runs against whichever apps the project enables.
+
+The baseline (benchmark_baseline.json next to this module) depends on the
+machine and on which apps are installed, so it is not shipped. Record it
+once on the machine that runs the comparison, with every app installed, and
+commit it:
+
+    python manage.py run_benchmarks --update-baseline
+
+Until it exists run_benchmarks only prints the results. Re-record it after an
+intentional change in cost, or when the dataset preset changes.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+
+from attendance.models import AttendanceSession
+from feedback.models import FeedbackSession
+from users.models import CustomUser, ParentProfile
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+LATENCY_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# Absolute slack so sub-millisecond endpoints do not fail on timer noise
+LATENCY_SLACK_MS = 5.0
+MEMORY_SLACK_KB = 64
+
+# name, URL name, role, URL args from the fixture context
+SCENARIOS = [
+    ('attendance_list', 'attendance:attendance_list', 'teacher', ()),
+    ('attendance_dashboard', 'attendance:attendance_dashboard', 'teacher', ()),
+    ('attendance_sessions_list', 'attendance:attendance_sessions_list', 'teacher', ()),
+    ('attendance_session_detail', 'attendance:attendance_session_detail', 'teacher', ('session_id',)),
+    ('attendance_student_profile', 'attendance:attendance_student_profile', 'teacher', ('student_id',)),
+    ('attendance_reports', 'attendance:attendance_reports', 'teacher', ()),
+    ('parent_dashboard', 'users:parent_dashboard', 'parent', ()),
+    ('parent_student_report', 'users:parent_student_report', 'parent', ('child_id',)),
+    ('student_grades', 'grades:student_grades', 'teacher', ('student_id',)),
+    ('feedback_dashboard', 'feedback:feedback_dashboard', 'teacher', ()),
+    ('feedback_analytics', 'feedback:feedback_analytics', 'teacher', ()),
+    ('feedback_session_detail', 'feedback:feedback_session_detail', 'teacher', ('feedback_session_id',)),
+    ('api_teacherprofiles', 'teacherprofile-list', 'teacher', ()),
+    ('api_assignments', 'assignment-list', 'teacher', ()),
+    ('api_quizzes', 'quiz-list', 'teacher', ()),
+    ('api_gradebook', 'gradebook-list', 'teacher', ()),
+]
+
+
+def fixture_context(prefix='load'):
+    """Users and object ids to drive the scenarios with, taken from a generated dataset"""
+    teacher = CustomUser.objects.filter(role='teacher', username__startswith=prefix).order_by('pk').first()
+    parent_profile = ParentProfile.objects.filter(
+        user__username__startswith=prefix, students__isnull=False,
+    ).select_related('user').order_by('pk').first()
+    session = AttendanceSession.objects.filter(teacher=teacher).order_by('pk').first()
+    feedback_session = FeedbackSession.objects.filter(created_by=teacher).order_by('pk').first()
+    child = parent_profile.students.order_by('pk').first() if parent_profile else None
+    return {
+        'users': {'teacher': teacher, 'parent': parent_profile.user if parent_profile else None},
+        'session_id': session.pk if session else None,
+        'student_id': child.user_id if child else None,
+        'child_id': child.user_id if child else None,
+        'feedback_session_id': feedback_session.pk if feedback_session else None,
+    }
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(client, url, iterations=20, warmup=3):
+    """Latency percentiles, query count and peak memory for GET url"""
+    for _ in range(warmup):
+        response = client.get(url)
+    if warmup and response.status_code != 200:
+        return {'error': f'status {response.status_code}'}
+
+    # Queries and memory come from one instrumented request so they do not
+    # skew the timed ones
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    # captured_queries is read from the live log, which later requests reset
+    query_count = len(queries)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if response.status_code != 200:
+        return {'error': f'status {response.status_code}'}
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(_percentile(timings, 0.50), 2),
+        'p95_ms': round(_percentile(timings, 0.95), 2),
+        'queries': query_count,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_scenarios(context, iterations=20, warmup=3, only=None, scenarios=SCENARIOS):
+    """{scenario name: measurements, or {'skipped': reason} / {'error': reason}}"""
+    results = {}
+    clients = {}
+    for name, url_name, role, arg_names in scenarios:
+        if only and name not in only:
+            continue
+        args = [context.get(arg) for arg in arg_names]
+        user = context['users'].get(role)
+        if user is None or None in args:
+            results[name] = {'skipped': 'no data for this scenario'}
+            continue
+        try:
+            url = reverse(url_name, args=args)
+        except NoReverseMatch:
+            results[name] = {'skipped': f'{url_name} is not installed'}
+            continue
+        if role not in clients:
+            clients[role] = Client()
+            clients[role].force_login(user)
+        results[name] = measure(clients[role], url, iterations=iterations, warmup=warmup)
+    return results
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    """{'dataset': volumes, 'results': {...}} or None when there is no baseline yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def save_baseline(results, dataset, path=DEFAULT_BASELINE):
+    measured = {name: result for name, result in results.items() if 'p95_ms' in result}
+    with open(path, 'w') as baseline:
+        json.dump({'dataset': dataset, 'results': measured}, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+def compare(results, baseline, latency_tolerance=LATENCY_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """List of human-readable regressions against a baseline"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline['results'].get(name)
+        if not expected or 'p95_ms' not in result:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: {result['queries']} queries (baseline {expected['queries']})")
+        latency_budget = expected['p95_ms'] * (1 + latency_tolerance) + LATENCY_SLACK_MS
+        if result['p95_ms'] > latency_budget:
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms (baseline {expected['p95_ms']}ms)")
+        memory_budget = expected['peak_kb'] * (1 + memory_tolerance) + MEMORY_SLACK_KB
+        if result['peak_kb'] > memory_budget:
+            regressions.append(f"{name}: peak {result['peak_kb']}KB (baseline {expected['peak_kb']}KB)")
+    return regressions
@@ -0,0 +1,451 @@
+"""
+Bulk CSV import for students, grades and attendance
+
+Files are parsed as a stream in chunks. Each chunk is validated as a batch,
+with names resolved to ids in one query per lookup table, and then upserted
+with bulk operations. A row that fails validation is reported with its line
+number and does not stop the rest of the import.
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import ParentProfile, StudentProfile
+
+from . import caching, fragments, parent_access, rollups
+from .gradebook import schedule_moves, schedule_refresh
+from .metrics import ATTENDANCE_MARKS
+from .provisioning import HashingPool, hash_passwords
+
+User = get_user_model()
+
+CHUNK_SIZE = 1000
+ATTENDANCE_STATUSES = ['present', 'late', 'absent', 'excused']
+GRADE_TYPES = ['assignment', 'quiz', 'exam', 'project', 'participation', 'homework']
+
+REQUIRED_COLUMNS = {
+    'students': ['username', 'first_name', 'last_name', 'student_id'],
+    'grades': ['student', 'subject', 'teacher', 'title', 'grade_type',
+               'points_earned', 'points_possible', 'date_assigned'],
+    'attendance': ['session_id', 'student', 'status'],
+}
+
+
+class ImportResult:
+    """Counts and row-level errors for one import"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.rows = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append({'line': line, 'message': message})
+
+    @property
+    def failed(self):
+        return len({error['line'] for error in self.errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors[:1000],
+        }
+
+
+def _chunks(reader, size):
+    # DictReader.line_num counts physical lines, so quoted newlines keep the right numbers
+    while True:
+        chunk = []
+        for row in islice(reader, size):
+            chunk.append((reader.line_num, {k.strip(): (v or '').strip() for k, v in row.items() if k}))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _by_name(model, names, field='name'):
+    """One query mapping names to ids; duplicate names resolve to the lowest id"""
+    mapping = {}
+    for pk, name in model.objects.filter(**{f'{field}__in': names}).order_by('-pk').values_list('pk', field):
+        mapping[name] = pk
+    return mapping
+
+
+def _users_by_username(usernames, role=None):
+    users = User.objects.filter(username__in=usernames)
+    if role:
+        users = users.filter(role=role)
+    return dict(users.values_list('username', 'pk'))
+
+
+def import_students(chunk, result, pool):
+    """Upsert users, student profiles and parent links for a chunk of rows"""
+    classrooms = _by_name(Classroom, {row['classroom'] for _, row in chunk if row.get('classroom')})
+    existing_users = dict(User.objects.filter(
+        username__in=[row['username'] for _, row in chunk],
+    ).values_list('username', 'role'))
+    previous_classrooms = dict(StudentProfile.objects.filter(
+        user__username__in=[row['username'] for _, row in chunk],
+    ).values_list('user__username', 'classroom_id'))
+    taken_student_ids = dict(StudentProfile.objects.filter(
+        student_id__in=[row['student_id'] for _, row in chunk],
+    ).values_list('student_id', 'user__username'))
+    parents = dict(ParentProfile.objects.filter(
+        user__username__in={row['parent_username'] for _, row in chunk if row.get('parent_username')},
+    ).values_list('user__username', 'pk'))
+
+    valid = {}
+    claimed = {}
+    for line, row in chunk:
+        errors = [f'{column} is required' for column in REQUIRED_COLUMNS['students'] if not row[column]]
+        if existing_users.get(row['username'], 'student') != 'student':
+            errors.append(f"{row['username']} is an existing {existing_users[row['username']]} account")
+        if row.get('classroom') and row['classroom'] not in classrooms:
+            errors.append(f"Unknown classroom: {row['classroom']}")
+        owner = taken_student_ids.get(row['student_id'])
+        # Earlier rows in this chunk claim their student IDs too
+        owner = owner or claimed.get(row['student_id'])
+        if owner and owner != row['username']:
+            errors.append(f"Student ID {row['student_id']} already belongs to {owner}")
+        if row.get('parent_username') and row['parent_username'] not in parents:
+            errors.append(f"Unknown parent: {row['parent_username']}")
+        for message in errors:
+            result.add_error(line, message)
+        if not errors:
+            # A later row for the same username wins
+            valid[row['username']] = row
+            claimed[row['student_id']] = row['username']
+
+    if not valid:
+        return
+    valid = list(valid.values())
+
+    new_rows = [row for row in valid if row['username'] not in existing_users]
+    hashes = dict(zip((row['username'] for row in new_rows),
+                      hash_passwords([row.get('password') for row in new_rows], pool=pool)))
+
+    with transaction.atomic():
+        # Passwords are only set for new accounts; re-imports never reset them
+        User.objects.bulk_create(
+            [
+                User(
+                    username=row['username'],
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    email=row.get('email', ''),
+                    role='student',
+                    password=hashes.get(row['username'], ''),
+                )
+                for row in valid
+            ],
+            update_conflicts=True,
+            unique_fields=['username'],
+            update_fields=['first_name', 'last_name', 'email', 'role'],
+        )
+        user_ids = _users_by_username([row['username'] for row in valid])
+        StudentProfile.objects.bulk_create(
+            [
+                StudentProfile(
+                    user_id=user_ids[row['username']],
+                    student_id=row['student_id'],
+                    roll_number=row.get('roll_number', ''),
+                    grade=row.get('grade', ''),
+                    classroom_id=classrooms.get(row.get('classroom')),
+                )
+                for row in valid
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['student_id', 'roll_number', 'grade', 'classroom'],
+        )
+        # The upsert sends no post_save, so re-rank the classrooms students moved between
+        moves = {}
+        for row in valid:
+            old, new = previous_classrooms.get(row['username']), classrooms.get(row.get('classroom'))
+            if old != new:
+                moves[user_ids[row['username']]] = (old, new)
+        schedule_moves(moves)
+        links = [row for row in valid if row.get('parent_username')]
+        linked_parents = {parents[row['parent_username']] for row in links}
+        if links:
+            profile_ids = dict(StudentProfile.objects.filter(
+                user_id__in=[user_ids[row['username']] for row in links],
+            ).values_list('user_id', 'pk'))
+            Through = ParentProfile.students.through
+            Through.objects.bulk_create(
+                [
+                    Through(parentprofile_id=parents[row['parent_username']],
+                            studentprofile_id=profile_ids[user_ids[row['username']]])
+                    for row in links
+                ],
+                ignore_conflicts=True,
+            )
+    # bulk_create sends no post_save, so retire cached student and family data here
+    caching.bump('students', 'family')
+    fragments.bump_for(User, id=user_ids.values())
+    fragments.bump_for(StudentProfile, user_id=user_ids.values())
+    if linked_parents:
+        # Nor does it send m2m_changed, so the parents' children sets are retired here too
+        parent_access.bump_parents(parent_access.parent_user_ids(linked_parents))
+
+    result.created += len(new_rows)
+    result.updated += len(valid) - len(new_rows)
+
+
+def _parsed(parser, value):
+    # Django's parsers return None for bad formats but raise for impossible dates
+    try:
+        return parser(value)
+    except ValueError:
+        return None
+
+
+def _decimal(value, field, errors):
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError):
+        number = None
+    # NaN and Infinity parse, but compare and round by raising
+    if number is None or not number.is_finite():
+        errors.append(f'{field} must be a number')
+        return None
+    return number
+
+
+def _fits(model, field, value):
+    """Whether the value fits the model's DecimalField once rounded to its places"""
+    field = model._meta.get_field(field)
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+    # The first check keeps quantize() from failing on huge exponents
+    return abs(value) < limit and abs(value.quantize(Decimal(10) ** -field.decimal_places)) < limit
+
+
+def import_grades(chunk, result, pool):
+    """Upsert grades keyed on (student, subject, teacher, title)"""
+    students = _users_by_username({row['student'] for _, row in chunk}, role='student')
+    teachers = _users_by_username({row['teacher'] for _, row in chunk}, role='teacher')
+    subjects = _by_name(Subject, {row['subject'] for _, row in chunk})
+
+    valid = {}
+    for line, row in chunk:
+        errors = []
+        if row['student'] not in students:
+            errors.append(f"Unknown student: {row['student']}")
+        if row['teacher'] not in teachers:
+            errors.append(f"Unknown teacher: {row['teacher']}")
+        if row['subject'] not in subjects:
+            errors.append(f"Unknown subject: {row['subject']}")
+        if row['grade_type'] not in GRADE_TYPES:
+            errors.append(f"Invalid grade type: {row['grade_type']}")
+        earned = _decimal(row['points_earned'], 'points_earned', errors)
+        possible = _decimal(row['points_possible'], 'points_possible', errors)
+        if earned is not None and earned < 0:
+            errors.append('points_earned must not be negative')
+        if possible is not None and possible <= 0:
+            errors.append('points_possible must be positive')
+        for field, value in (('points_earned', earned), ('points_possible', possible)):
+            if value is not None and not _fits(Grade, field, value):
+                errors.append(f'{field} is too large')
+        if not errors and not _fits(Grade, 'percentage', earned / possible * 100):
+            errors.append(f'points_earned of {earned} out of {possible} is not a storable percentage')
+        assigned = _parsed(parse_date, row['date_assigned'])
+        if assigned is None:
+            errors.append('date_assigned must be YYYY-MM-DD')
+        for message in errors:
+            result.add_error(line, message)
+        if errors:
+            continue
+        key = (students[row['student']], subjects[row['subject']], teachers[row['teacher']], row['title'])
+        # A later row for the same grade wins, as it would with row-by-row saves
+        valid[key] = Grade(
+            student_id=key[0], subject_id=key[1], teacher_id=key[2], title=key[3],
+            grade_type=row['grade_type'],
+            points_earned=earned,
+            points_possible=possible,
+            percentage=(earned / possible * 100).quantize(Decimal('0.01')),
+            date_assigned=assigned,
+            comments=row.get('comments', ''),
+        )
+
+    if not valid:
+        return
+
+    existing = {
+        (student_id, subject_id, teacher_id, title): pk
+        for pk, student_id, subject_id, teacher_id, title in Grade.objects.filter(
+            student_id__in={k[0] for k in valid},
+            subject_id__in={k[1] for k in valid},
+            title__in={k[3] for k in valid},
+        ).values_list('pk', 'student_id', 'subject_id', 'teacher_id', 'title')
+    }
+    to_update = []
+    to_create = []
+    for key, grade in valid.items():
+        if key in existing:
+            grade.pk = existing[key]
+            to_update.append(grade)
+        else:
+            to_create.append(grade)
+
+    with transaction.atomic():
+        Grade.objects.bulk_create(to_create)
+        Grade.objects.bulk_update(
+            to_update,
+            ['grade_type', 'points_earned', 'points_possible', 'percentage', 'date_assigned', 'comments'],
+        )
+        # Bulk writes skip the Grade signals, so refresh the gradebook here
+        classrooms = dict(StudentProfile.objects.filter(
+            user_id__in={key[0] for key in valid},
+        ).values_list('user_id', 'classroom_id'))
+        for classroom_id, subject_id in {(classrooms.get(key[0]), key[1]) for key in valid}:
+            schedule_refresh(classroom_id, subject_id)
+    fragments.bump_for(Grade, student_id={key[0] for key in valid})
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+
+def import_attendance(chunk, result, pool):
+    """Upsert attendance records keyed on (session, student)"""
+    students = _users_by_username({row['student'] for _, row in chunk}, role='student')
+    session_ids = set()
+    for _, row in chunk:
+        if row['session_id'].isdigit():
+            session_ids.add(int(row['session_id']))
+    sessions = set(AttendanceSession.objects.filter(pk__in=session_ids).values_list('pk', flat=True))
+
+    valid = {}
+    for line, row in chunk:
+        errors = []
+        session_id = int(row['session_id']) if row['session_id'].isdigit() else None
+        if session_id not in sessions:
+            errors.append(f"Unknown session: {row['session_id']}")
+        if row['student'] not in students:
+            errors.append(f"Unknown student: {row['student']}")
+        if row['status'] not in ATTENDANCE_STATUSES:
+            errors.append(f"Invalid status: {row['status']}")
+        marked_at = None
+        if row.get('marked_at'):
+            marked_at = _parsed(parse_datetime, row['marked_at'])
+            if marked_at is None:
+                errors.append('marked_at must be an ISO date/time')
+        for message in errors:
+            result.add_error(line, message)
+        if errors:
+            continue
+        key = (session_id, students[row['student']])
+        valid[key] = AttendanceRecord(
+            session_id=key[0], student_id=key[1], status=row['status'],
+            marked_at=marked_at, notes=row.get('notes', ''), updated_at=timezone.now(),
+        )
+
+    if not valid:
+        return
+
+    existing = {
+        (session_id, student_id): (pk, status)
+        for pk, session_id, student_id, status in AttendanceRecord.objects.filter(
+            session_id__in={k[0] for k in valid},
+            student_id__in={k[1] for k in valid},
+        ).values_list('pk', 'session_id', 'student_id', 'status')
+    }
+    to_update = []
+    to_create = []
+    marked = []
+    for key, record in valid.items():
+        if key in existing:
+            record.pk, old_status = existing[key]
+            to_update.append(record)
+            if record.status != old_status:
+                marked.append(record)
+        else:
+            to_create.append(record)
+            marked.append(record)
+
+    with transaction.atomic():
+        AttendanceRecord.objects.bulk_create(to_create)
+        AttendanceRecord.objects.bulk_update(to_update, ['status', 'marked_at', 'notes', 'updated_at'])
+    # bulk_create does not send post_save, so count these marks and
+    # invalidate the students' fragments here
+    fragments.bump_for(AttendanceRecord, student_id={key[1] for key in valid})
+    rollups.rebuild_sessions({key[0] for key in valid}, {key[1] for key in valid})
+    # Only new marks and status changes count, as for single saves
+    statuses = {}
+    for record in marked:
+        statuses[record.status] = statuses.get(record.status, 0) + 1
+    for status, count in statuses.items():
+        ATTENDANCE_MARKS.inc(count, status=status)
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+
+# dataset -> importer(chunk, result, pool), pool being the import's password HashingPool
+IMPORTERS = {
+    'students': import_students,
+    'grades': import_grades,
+    'attendance': import_attendance,
+}
+
+
+def import_csv(dataset, stream, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Import a CSV text stream into a dataset. `progress` is called with the
+    number of rows handled after each chunk.
+    """
+    if dataset not in IMPORTERS:
+        raise ValueError(f'Unknown import type: {dataset}')
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    header = [column.strip() for column in (reader.fieldnames or [])]
+    missing = [column for column in REQUIRED_COLUMNS[dataset] if column not in header]
+    if missing:
+        result.add_error(1, f"Missing columns: {', '.join(missing)}")
+        return result
+
+    importer = IMPORTERS[dataset]
+    # One hashing pool for the whole file rather than one per chunk
+    with HashingPool() as pool:
+        for chunk in _chunks(reader, chunk_size):
+            result.rows += len(chunk)
+            importer(chunk, result, pool)
+            if progress:
+                progress(len(chunk))
+    return result
+
+
+def import_file(dataset, path, chunk_size=CHUNK_SIZE, progress=None):
+    with open(path, newline='', encoding='utf-8-sig') as stream:
+        return import_csv(dataset, stream, chunk_size=chunk_size, progress=progress)
+
+
+def count_rows(path):
+    """Approximate data rows in a CSV file without parsing it"""
+    lines = 0
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(1024 * 1024), b''):
+            lines += block.count(b'\n')
+    return max(0, lines - 1)
+
+
+def errors_csv(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['line', 'message'])
+    for error in result.errors:
+        writer.writerow([error['line'], error['message']])
+    return buffer.getvalue()
@@ -0,0 +1,128 @@
+"""
+Versioned caching of reference lists and per-role navigation data
+
+Cached values are keyed by the version stamps of the data groups they
+depend on ('classrooms', 'subjects', 'students', 'family'). Saving or
+deleting a row bumps its group's stamp (see signals), which retires every
+key built from the old stamp at once; nothing is ever deleted by pattern.
+Stamps start from the current time in milliseconds so an evicted stamp can
+never come back as a value an old key was built with.
+
+With a cache shared by all processes (Redis, Memcached, database) an
+invalidation is seen everywhere immediately; with the default local-memory
+cache each process only sees its own bumps until entries expire, after the
+system setting cache_timeout_minutes (or NAVIGATION_CACHE_TIMEOUT seconds when
+the deployment pins it).
+
+Templates read the menu data through the navigation tags
+({% nav_children as ... %}, {% nav_student as ... %}), which need no
+settings. Adding 'teacher.caching.navigation' to
+TEMPLATES['OPTIONS']['context_processors'] optionally provides the same
+values lazily to every template, and the tags then reuse them.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from classroom.models import Classroom
+from subject.models import Subject
+from users.models import StudentProfile
+
+from . import system_settings
+from .metrics import record_cache
+
+KEY_PREFIX = 'teacher'
+GROUPS = ('classrooms', 'subjects', 'students', 'family')
+_MISSING = object()
+
+
+def timeout():
+    configured = getattr(settings, 'NAVIGATION_CACHE_TIMEOUT', None)
+    if configured is not None:
+        return configured
+    return system_settings.get('cache_timeout_minutes') * 60
+
+
+def _version_key(group):
+    return f'{KEY_PREFIX}:version:{group}'
+
+
+def versions(groups):
+    """{group: stamp} with one cache round trip"""
+    keys = {_version_key(group): group for group in groups}
+    found = cache.get_many(keys)
+    stamps = {keys[key]: value for key, value in found.items()}
+    for key, group in keys.items():
+        if group not in stamps:
+            cache.add(key, int(time.time() * 1000), None)
+            stamps[group] = cache.get(key)
+    return stamps
+
+
+def bump(*groups):
+    """Invalidate everything cached from `groups`"""
+    for group in groups:
+        key = _version_key(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), None)
+
+
+def cached(name, groups, build, key=()):
+    """build() cached under the current versions of `groups`"""
+    stamps = versions(groups)
+    cache_key = ':'.join([KEY_PREFIX, name, *(str(stamps[group]) for group in groups), *map(str, key)])
+    value = cache.get(cache_key, _MISSING)
+    record_cache(name, value is not _MISSING)
+    if value is _MISSING:
+        value = build()
+        cache.set(cache_key, value, timeout())
+    return value
+
+
+def classrooms():
+    """[{'id', 'name'}] for classroom dropdowns"""
+    return cached('classrooms', ['classrooms'], lambda: list(Classroom.objects.values('id', 'name')))
+
+
+def subjects():
+    """[{'id', 'name'}] for subject dropdowns"""
+    return cached('subjects', ['subjects'], lambda: list(Subject.objects.values('id', 'name')))
+
+
+def parent_children(user):
+    """[{'id', 'name'}] for the children menu of a parent; id is the student's user id"""
+    def build():
+        rows = StudentProfile.objects.filter(parents__user=user).order_by('pk').values_list(
+            'user_id', 'user__first_name', 'user__last_name', 'user__username')
+        return [
+            {'id': user_id, 'name': f'{first} {last}'.strip() or username}
+            for user_id, first, last, username in rows
+        ]
+    return cached('parent_children', ['family'], build, key=[user.pk])
+
+
+def student_profile(user):
+    """The student's profile with its classroom, or None"""
+    return cached(
+        'student_profile', ['students', 'classrooms'],
+        lambda: StudentProfile.objects.select_related('classroom').filter(user=user).first(),
+        key=[user.pk],
+    )
+
+
+def navigation(request):
+    """Context processor: role-specific menu data, only fetched if a template uses it"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    role = getattr(user, 'role', None)
+    if role == 'parent':
+        return {'nav_children': SimpleLazyObject(lambda: parent_children(user))}
+    if role == 'student':
+        return {'nav_student': SimpleLazyObject(lambda: student_profile(user))}
+    return {}
@@ -18,13 +18,14 @@ django.setup()
 
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from users.models import AdminProfile, TeacherProfile, StudentProfile, ParentProfile
+from users.models import AdminProfile, StudentProfile
 from classroom.models import Classroom
 from subject.models import Subject
 from grades.models import Grade
 from assignments.models import Assignment, AssignmentSubmission
 from attendance.models import AttendanceSession, AttendanceRecord
 from feedback.models import FeedbackCategory, FeedbackSession, FeedbackResponse
+from teacher.provisioning import provision_accounts
 # from notifications.models import Notification  # Not available in current setup
 
 User = get_user_model()
@@ -58,45 +59,34 @@ def create_teachers(count=25):
     """Create realistic teacher accounts"""
     print(f"🧑‍🏫 Creating {count} teachers...")
     
-    teachers = []
     departments = ['Mathematics', 'Science', 'English', 'Social Studies', 'Arts', 'Physical Education', 'Technology']
+    accounts = []
     
     for i in range(count):
         first_name = fake.first_name()
         last_name = fake.last_name()
         username = f"teacher_{first_name.lower()}_{last_name.lower()}_{i+1}"
-        email = f"{username}@smartclassroom.edu"
-        
-        teacher, created = User.objects.get_or_create(
-            username=username,
-            defaults={
-                'email': email,
-                'first_name': first_name,
-                'last_name': last_name,
-                'role': 'teacher',
-                'phone_number': fake.phone_number()[:15],
-                'address': fake.address()[:200],
-                'date_of_birth': fake.date_of_birth(minimum_age=25, maximum_age=65),
-                'is_active': True
+        accounts.append({
+            'username': username,
+            'password': 'teacher123',
+            'email': f"{username}@smartclassroom.edu",
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone_number': fake.phone_number()[:15],
+            'address': fake.address()[:200],
+            'date_of_birth': fake.date_of_birth(minimum_age=25, maximum_age=65),
+            'is_active': True,
+            'profile': {
+                'department': random.choice(departments),
+                'hire_date': fake.date_between(start_date='-10y', end_date='today'),
+                'qualification': random.choice(['B.Ed', 'M.Ed', 'M.A.', 'M.Sc.', 'Ph.D.']),
+                'experience_years': random.randint(1, 30),
+                'specialization': random.choice(SUBJECTS_DATA)['name']
             }
-        )
-        
-        if created:
-            teacher.set_password('teacher123')
-            teacher.save()
-            
-            # Create teacher profile
-            profile, _ = TeacherProfile.objects.get_or_create(
-                user=teacher,
-                defaults={
-                    'department': random.choice(departments),
-                    'hire_date': fake.date_between(start_date='-10y', end_date='today'),
-                    'qualification': random.choice(['B.Ed', 'M.Ed', 'M.A.', 'M.Sc.', 'Ph.D.']),
-                    'experience_years': random.randint(1, 30),
-                    'specialization': random.choice(SUBJECTS_DATA)['name']
-                }
-            )
-            teachers.append(teacher)
+        })
+    
+    # Passwords are hashed across all cores and rows inserted in bulk
+    teachers, _ = provision_accounts(accounts, 'teacher')
     
     print(f"✅ Created {len(teachers)} new teachers")
     return teachers
@@ -105,47 +95,35 @@ def create_students(count=80):
     """Create realistic student accounts"""
     print(f"👨‍🎓 Creating {count} students...")
     
-    students = []
+    accounts = []
     
     for i in range(count):
         first_name = fake.first_name()
         last_name = fake.last_name()
         username = f"student_{first_name.lower()}_{last_name.lower()}_{i+1}"
-        email = f"{username}@smartclassroom.edu"
-        
-        student, created = User.objects.get_or_create(
-            username=username,
-            defaults={
-                'email': email,
-                'first_name': first_name,
-                'last_name': last_name,
-                'role': 'student',
-                'phone_number': fake.phone_number()[:15],
-                'address': fake.address()[:200],
-                'date_of_birth': fake.date_of_birth(minimum_age=10, maximum_age=18),
-                'is_active': True
+        accounts.append({
+            'username': username,
+            'password': 'student123',
+            'email': f"{username}@smartclassroom.edu",
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone_number': fake.phone_number()[:15],
+            'address': fake.address()[:200],
+            'date_of_birth': fake.date_of_birth(minimum_age=10, maximum_age=18),
+            'is_active': True,
+            'profile': {
+                'grade': random.choice(GRADES_LIST),
+                'admission_date': fake.date_between(start_date='-3y', end_date='today'),
+                'parent_guardian_name': fake.name(),
+                'parent_guardian_phone': fake.phone_number()[:15],
+                'emergency_contact_name': fake.name(),
+                'emergency_contact_phone': fake.phone_number()[:15],
+                'blood_group': random.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']),
+                'medical_conditions': random.choice(['None', 'Asthma', 'Allergies', 'Diabetes', 'None', 'None'])
             }
-        )
-        
-        if created:
-            student.set_password('student123')
-            student.save()
-            
-            # Create student profile
-            profile, _ = StudentProfile.objects.get_or_create(
-                user=student,
-                defaults={
-                    'grade': random.choice(GRADES_LIST),
-                    'admission_date': fake.date_between(start_date='-3y', end_date='today'),
-                    'parent_guardian_name': fake.name(),
-                    'parent_guardian_phone': fake.phone_number()[:15],
-                    'emergency_contact_name': fake.name(),
-                    'emergency_contact_phone': fake.phone_number()[:15],
-                    'blood_group': random.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']),
-                    'medical_conditions': random.choice(['None', 'Asthma', 'Allergies', 'Diabetes', 'None', 'None'])
-                }
-            )
-            students.append(student)
+        })
+    
+    students, _ = provision_accounts(accounts, 'student')
     
     print(f"✅ Created {len(students)} new students")
     return students
@@ -154,51 +132,35 @@ def create_parents(students, count=60):
     """Create parent accounts and link them to students"""
     print(f"👨‍👩‍👧‍👦 Creating {count} parents...")
     
-    parents = []
+    student_profile_ids = list(StudentProfile.objects.filter(user__in=students).values_list('id', flat=True))
+    accounts = []
     
     for i in range(count):
         first_name = fake.first_name()
         last_name = fake.last_name()
         username = f"parent_{first_name.lower()}_{last_name.lower()}_{i+1}"
-        email = f"{username}@smartclassroom.edu"
-        
-        parent, created = User.objects.get_or_create(
-            username=username,
-            defaults={
-                'email': email,
-                'first_name': first_name,
-                'last_name': last_name,
-                'role': 'parent',
-                'phone_number': fake.phone_number()[:15],
-                'address': fake.address()[:200],
-                'date_of_birth': fake.date_of_birth(minimum_age=25, maximum_age=60),
-                'is_active': True
-            }
-        )
-        
-        if created:
-            parent.set_password('parent123')
-            parent.save()
-            
-            # Create parent profile and link to 1-3 students
-            profile, _ = ParentProfile.objects.get_or_create(
-                user=parent,
-                defaults={
-                    'occupation': fake.job(),
-                    'relationship': random.choice(['Father', 'Mother', 'Guardian']),
-                    'workplace': fake.company(),
-                    'work_phone': fake.phone_number()[:15]
-                }
-            )
-            
-            # Link to random students (1-3 children per parent)
-            num_children = random.randint(1, min(3, len(students)))
-            selected_students = random.sample(students, num_children)
-            
-            for student in selected_students:
-                profile.students.add(student.student_profile)
-            
-            parents.append(parent)
+        # Link to random students (1-3 children per parent)
+        num_children = random.randint(1, min(3, len(student_profile_ids))) if student_profile_ids else 0
+        accounts.append({
+            'username': username,
+            'password': 'parent123',
+            'email': f"{username}@smartclassroom.edu",
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone_number': fake.phone_number()[:15],
+            'address': fake.address()[:200],
+            'date_of_birth': fake.date_of_birth(minimum_age=25, maximum_age=60),
+            'is_active': True,
+            'profile': {
+                'occupation': fake.job(),
+                'relationship': random.choice(['Father', 'Mother', 'Guardian']),
+                'workplace': fake.company(),
+                'work_phone': fake.phone_number()[:15]
+            },
+            'students': random.sample(student_profile_ids, num_children),
+        })
+    
+    parents, _ = provision_accounts(accounts, 'parent')
     
     print(f"✅ Created {len(parents)} new parents")
     return parents
@@ -0,0 +1,127 @@
+"""
+SQLite backend for running the project on db.sqlite3 in production
+
+Use it with ENGINE 'teacher.db_backends.sqlite3'. Compared with Django's
+backend it:
+
+- applies PRAGMAS on every new connection: WAL so readers never block the
+  writer, synchronous=NORMAL (durable at checkpoints, safe with WAL), a
+  larger page cache, memory-mapped reads and in-memory temp tables
+- starts transactions with BEGIN IMMEDIATE, so a transaction takes the
+  write lock up front instead of failing with "database is locked" when it
+  upgrades from reading to writing halfway through
+- retries BEGIN and autocommit statements that still hit a busy database
+  after the busy timeout, with exponential backoff and jitter
+
+OPTIONS accepts, besides sqlite3.connect() arguments ('timeout' is the busy
+timeout in seconds, 20 by default here):
+
+    'pragmas': {...}             overrides/extends PRAGMAS ({name: None} drops one)
+    'transaction_mode': 'IMMEDIATE' | 'DEFERRED' | 'EXCLUSIVE'
+    'lock_retries': 5, 'lock_backoff': 0.05   (seconds, doubled per attempt)
+
+Retries are counted in the sqlite_lock_retries_total metric.
+"""
+
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+from teacher.metrics import SQLITE_LOCK_RETRIES
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Negative cache_size is in KiB: 64MB of page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+DEFAULT_TIMEOUT = 20
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.05
+_OWN_OPTIONS = ('pragmas', 'transaction_mode', 'lock_retries', 'lock_backoff')
+
+
+def is_locked(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def with_retries(operation, retries, backoff):
+    """Run operation(), retrying on lock errors; the caller guarantees it is safe to repeat"""
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except (base.Database.OperationalError, OperationalError) as e:
+            if attempt == retries or not is_locked(e):
+                raise
+            SQLITE_LOCK_RETRIES.inc()
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+class Connection(base.Database.Connection):
+    """sqlite3 connection that carries its lock-retry policy for its cursors"""
+    lock_retry = (DEFAULT_RETRIES, DEFAULT_BACKOFF)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    def execute(self, query, params=None):
+        if self.connection.in_transaction:
+            # Inside BEGIN IMMEDIATE the write lock is already held; a repeat
+            # here could replay half a transaction, so errors propagate
+            return super().execute(query, params)
+        parent = super()
+        return with_retries(lambda: parent.execute(query, params), *self.connection.lock_retry)
+
+    def executemany(self, query, param_list):
+        if self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        param_list = list(param_list)
+        parent = super()
+        return with_retries(lambda: parent.executemany(query, param_list), *self.connection.lock_retry)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in _OWN_OPTIONS:
+            kwargs.pop(option, None)
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        kwargs['factory'] = Connection
+        return kwargs
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'IMMEDIATE').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f'transaction_mode must be one of {", ".join(TRANSACTION_MODES)}')
+        return mode
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        options = self.settings_dict['OPTIONS']
+        conn.lock_retry = (options.get('lock_retries', DEFAULT_RETRIES), options.get('lock_backoff', DEFAULT_BACKOFF))
+        pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        for name, value in pragmas.items():
+            if value is None:
+                continue
+            if name == 'journal_mode' and self.is_in_memory_db():
+                # In-memory databases (the test database) cannot use WAL
+                continue
+            # Switching to WAL needs a brief exclusive lock when other
+            # connections are busy, so it is retried like any write
+            with_retries(lambda: conn.execute(f'PRAGMA {name} = {value}'), *conn.lock_retry)
+        return conn
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=SQLiteCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        # BEGIN IMMEDIATE has done no work yet when it fails, so it is always safe to retry
+        begin = f'BEGIN {self.transaction_mode}'
+        with self.wrap_database_errors:
+            with_retries(lambda: self.connection.execute(begin), *self.connection.lock_retry)
@@ -0,0 +1,300 @@
+"""
+Streaming data export engine
+
+Rows are read with keyset pagination (WHERE id > last ORDER BY id LIMIT n)
+and encoded chunk by chunk, so an export of any size runs in constant memory
+whether it is streamed to a response or written to a file.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.utils.dateparse import parse_date
+
+from attendance.models import AttendanceRecord
+from feedback.models import FeedbackResponse
+from grades.models import Grade
+from users.models import CustomUser
+
+DEFAULT_CHUNK_SIZE = 2000
+# Rows handed to csv.writer.writerows at a time
+ENCODE_BATCH = 1000
+# Encoded output is handed to the response in blocks of roughly this size
+BLOCK_SIZE = 64 * 1024
+
+EXPORT_DATASETS = {
+    'attendance': {
+        'model': AttendanceRecord,
+        'fields': [
+            ('id', 'id'),
+            ('session_id', 'session_id'),
+            ('session', 'session__title'),
+            ('classroom', 'session__classroom__name'),
+            ('subject', 'session__subject__name'),
+            ('session_start', 'session__start_time'),
+            ('student_id', 'student_id'),
+            ('student_username', 'student__username'),
+            ('status', 'status'),
+            ('marked_at', 'marked_at'),
+            ('notes', 'notes'),
+        ],
+        'date_field': 'session__start_time__date',
+    },
+    'grades': {
+        'model': Grade,
+        'fields': [
+            ('id', 'id'),
+            ('student_id', 'student_id'),
+            ('student_username', 'student__username'),
+            ('subject', 'subject__name'),
+            ('title', 'title'),
+            ('grade_type', 'grade_type'),
+            ('points_earned', 'points_earned'),
+            ('points_possible', 'points_possible'),
+            ('percentage', 'percentage'),
+            ('date_assigned', 'date_assigned'),
+        ],
+        'date_field': 'date_assigned',
+    },
+    'feedback': {
+        'model': FeedbackResponse,
+        'fields': [
+            ('id', 'id'),
+            ('session_id', 'session_id'),
+            ('session', 'session__title'),
+            ('respondent_id', 'respondent_id'),
+            ('is_complete', 'is_complete'),
+            ('completion_time_seconds', 'completion_time_seconds'),
+            ('submitted_at', 'submitted_at'),
+            ('response_data', 'response_data'),
+        ],
+        'date_field': 'submitted_at__date',
+    },
+    'students': {
+        'model': CustomUser,
+        'filter': {'role': 'student'},
+        'fields': [
+            ('id', 'id'),
+            ('username', 'username'),
+            ('first_name', 'first_name'),
+            ('last_name', 'last_name'),
+            ('email', 'email'),
+            ('student_id', 'student_profile__student_id'),
+            ('classroom', 'student_profile__classroom__name'),
+            ('date_joined', 'date_joined'),
+        ],
+        'date_field': 'date_joined__date',
+    },
+    'teachers': {
+        'model': CustomUser,
+        'filter': {'role': 'teacher'},
+        'fields': [
+            ('id', 'id'),
+            ('username', 'username'),
+            ('first_name', 'first_name'),
+            ('last_name', 'last_name'),
+            ('email', 'email'),
+            ('department', 'teacher_profile__department'),
+            ('date_joined', 'date_joined'),
+        ],
+        'date_field': 'date_joined__date',
+    },
+}
+
+# What "All Data" exports, in order
+ALL_DATASETS = ['students', 'teachers', 'attendance', 'grades', 'feedback']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'json': ('application/json', 'json'),
+}
+
+
+def parse_date_range(start_date=None, end_date=None):
+    """(start, end) as dates from YYYY-MM-DD strings, None where blank; ValueError if either is malformed"""
+    parsed = []
+    for label, value in (('start_date', start_date), ('end_date', end_date)):
+        day = None
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                pass
+            if day is None:
+                raise ValueError(f'Invalid {label}: {value} (expected YYYY-MM-DD)')
+        parsed.append(day)
+    return tuple(parsed)
+
+
+def dataset_queryset(name, start_date=None, end_date=None):
+    """Unordered queryset for a dataset, restricted to a date range"""
+    spec = EXPORT_DATASETS[name]
+    queryset = spec['model'].objects.filter(**spec.get('filter', {}))
+    if start_date:
+        queryset = queryset.filter(**{f"{spec['date_field']}__gte": start_date})
+    if end_date:
+        queryset = queryset.filter(**{f"{spec['date_field']}__lte": end_date})
+    return queryset
+
+
+def keyset_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield value tuples page by page using the primary key as the cursor.
+    Unlike OFFSET pagination each page is an index range scan, so the last
+    page of a 10M-row table costs the same as the first.
+    """
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        rows = list(page.values_list('pk', *fields)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def dataset_rows(name, start_date=None, end_date=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Column names and a lazy row iterator for a dataset"""
+    spec = EXPORT_DATASETS[name]
+    columns = [column for column, _ in spec['fields']]
+    lookups = [lookup for _, lookup in spec['fields']]
+    queryset = dataset_queryset(name, start_date, end_date)
+    return columns, keyset_rows(queryset, lookups, chunk_size)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_cell(value):
+    """A cell as the JSON exports write it: ISO dates, and JSON for dicts and lists rather than a repr"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return _plain(value)
+
+
+def _blocks(pieces):
+    """Join small string pieces into BLOCK_SIZE byte blocks"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _batches(rows, size=ENCODE_BATCH):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def encode_csv(sections):
+    """sections: iterable of (name, columns, rows). Multiple sections get a title line each."""
+    sections = list(sections)
+    for name, columns, rows in sections:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if len(sections) > 1:
+            writer.writerow([f'# {name}'])
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for batch in _batches(rows):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in batch)
+            yield buffer.getvalue()
+
+
+def encode_jsonl(sections):
+    sections = list(sections)
+    for name, columns, rows in sections:
+        for row in rows:
+            record = {column: _plain(value) for column, value in zip(columns, row)}
+            if len(sections) > 1:
+                record = {'dataset': name, **record}
+            yield json.dumps(record, default=str) + '\n'
+
+
+def encode_json(sections):
+    """A JSON object of arrays, one per dataset, written incrementally"""
+    yield '{'
+    for index, (name, columns, rows) in enumerate(sections):
+        yield ('' if index == 0 else ',') + json.dumps(name) + ':['
+        first = True
+        for row in rows:
+            record = {column: _plain(value) for column, value in zip(columns, row)}
+            yield ('' if first else ',') + json.dumps(record, default=str)
+            first = False
+        yield ']'
+    yield '}\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+    'json': encode_json,
+}
+
+
+def gzip_blocks(blocks):
+    """Compress a stream of byte blocks into a gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_sections(sections, export_format='csv', compress=False):
+    """Byte blocks for (name, columns, rows) sections in the given format"""
+    blocks = _blocks(ENCODERS[export_format](sections))
+    return gzip_blocks(blocks) if compress else blocks
+
+
+def export_stream(datasets, export_format='csv', compress=False, start_date=None,
+                  end_date=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Byte blocks for an export of one or more datasets"""
+    sections = (
+        (name, *dataset_rows(name, start_date, end_date, chunk_size))
+        for name in datasets
+    )
+    return encode_sections(sections, export_format, compress)
+
+
+def export_filename(export_type, export_format, compress=False):
+    extension = EXPORT_FORMATS[export_format][1]
+    name = f"{export_type}_export_{date.today().isoformat()}.{extension}"
+    return name + '.gz' if compress else name
+
+
+def resolve_datasets(export_type):
+    if export_type == 'all':
+        return list(ALL_DATASETS)
+    if export_type not in EXPORT_DATASETS:
+        raise ValueError(f'Unknown export type: {export_type}')
+    return [export_type]
@@ -0,0 +1,99 @@
+"""
+Template fragment caching with dependency-based invalidation
+
+A fragment is declared once with the version groups its output depends on,
+written as templates over the tag's parameters:
+
+    fragment('attendance_row', ['attendance:{student}', 'user:{student}', ...])
+
+and rendered with {% fragment "attendance_row" student=data.student.id %}
+... {% endfragment %} (load fragment_cache). The cache key is built from the
+current stamps of those groups, e.g. "attendance:42@17", so a row is served
+from cache until something it depends on is written.
+
+Writes are mapped to groups by the dependency registry:
+
+    invalidated_by(AttendanceRecord, 'attendance:{student_id}')
+
+signals.py bumps the listed groups, formatted with the saved or deleted
+instance's field values, so only the fragments of the affected objects
+re-render. Bulk writes that send no signals call bump_for() themselves.
+"""
+
+import hashlib
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from assignments.models import Assignment as ClassAssignment, AssignmentSubmission
+from attendance.models import AttendanceRecord
+from feedback.models import FeedbackCategory, FeedbackResponse, FeedbackSession
+from grades.models import Grade
+from users.models import StudentProfile
+
+from . import caching
+from .models import Assignment
+
+DEFAULT_TIMEOUT = 60 * 60
+# Saves that only touch these fields never change rendered output
+IGNORED_FIELDS = frozenset({'last_login'})
+
+Fragment = namedtuple('Fragment', 'depends_on timeout daily')
+
+FRAGMENTS = {}
+DEPENDENCIES = {}
+
+
+def fragment(name, depends_on, timeout=DEFAULT_TIMEOUT, daily=False):
+    """Declare a cacheable fragment; daily fragments are also keyed on today's date"""
+    FRAGMENTS[name] = Fragment(tuple(depends_on), timeout, daily)
+
+
+def invalidated_by(model, *groups):
+    """Bump `groups` (formatted with the instance's fields) whenever a `model` row is written"""
+    DEPENDENCIES.setdefault(model, []).extend(groups)
+
+
+def groups_for(instance):
+    return [group.format_map(vars(instance)) for group in DEPENDENCIES.get(type(instance), ())]
+
+
+def bump_for(model, **values):
+    """Invalidate the groups a bulk write to `model` touched, e.g. bump_for(Grade, student_id=[1, 2])"""
+    names = list(values)
+    for row in zip(*values.values()):
+        params = dict(zip(names, row))
+        caching.bump(*(group.format_map(params) for group in DEPENDENCIES.get(model, ())))
+
+
+def cache_key(name, params, vary=()):
+    definition = FRAGMENTS[name]
+    groups = [group.format_map(params) for group in definition.depends_on]
+    stamps = caching.versions(groups)
+    parts = [f'{group}@{stamps[group]}' for group in groups] + [str(value) for value in vary]
+    if definition.daily:
+        parts.append(timezone.localdate().isoformat())
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'{caching.KEY_PREFIX}:fragment:{name}:{digest}'
+
+
+fragment('attendance_row', ['attendance:{student}', 'user:{student}', 'student:{student}', 'classrooms'])
+fragment('parent_child_card', [
+    'attendance:{student}', 'grades:{student}', 'user:{student}', 'student:{student}', 'classrooms', 'assignments',
+    'submissions:{student}', 'class_assignments', 'subjects',
+], daily=True)
+fragment('feedback_session_card', ['feedback_session:{session}', 'feedback_responses:{session}',
+                                   'feedback_categories'])
+
+invalidated_by(AttendanceRecord, 'attendance:{student_id}')
+invalidated_by(Grade, 'grades:{student_id}')
+invalidated_by(get_user_model(), 'user:{id}')
+invalidated_by(StudentProfile, 'student:{user_id}')
+invalidated_by(Assignment, 'assignments')
+invalidated_by(ClassAssignment, 'class_assignments')
+invalidated_by(AssignmentSubmission, 'submissions:{student_id}')
+invalidated_by(FeedbackSession, 'feedback_session:{id}', 'feedback_sessions')
+invalidated_by(FeedbackResponse, 'feedback_responses:{session_id}')
+invalidated_by(FeedbackCategory, 'feedback_categories')
+invalidated_by(FeedbackResponse, 'feedback_by:{respondent_id}')
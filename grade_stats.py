@@ -0,0 +1,328 @@
+"""
+Vectorized grade statistics for grades.Grade
+
+Grades are loaded once into columnar NumPy arrays and every statistic
+(averages, weighted percentages, GPA, percentile ranks, trends) is computed
+in bulk instead of looping over Grade rows in Python.
+"""
+
+import numpy as np
+
+from grades.models import Grade
+
+GRADE_TYPES = ['assignment', 'quiz', 'exam', 'project', 'participation', 'homework']
+
+# Relative weight of each grade_type in a weighted percentage. Weights are
+# re-normalised over the types a student actually has, so a student with no
+# projects yet is not penalised for the missing category.
+GRADE_TYPE_WEIGHTS = {
+    'exam': 0.30,
+    'project': 0.20,
+    'quiz': 0.15,
+    'assignment': 0.15,
+    'homework': 0.10,
+    'participation': 0.10,
+}
+
+# Same bands as the A/B/C/D letters in templates/grades/student_grades.html
+GPA_BANDS = [(90, 4.0), (80, 3.0), (70, 2.0), (60, 1.0)]
+
+
+class GradeFrame:
+    """Columnar view over a set of Grade rows"""
+
+    FIELDS = ('student_id', 'subject_id', 'grade_type', 'points_earned',
+              'points_possible', 'percentage', 'date_assigned')
+
+    def __init__(self, student_ids, subject_ids, type_codes, points_earned,
+                 points_possible, percentages, days):
+        self.student_ids = np.asarray(student_ids, dtype=np.int64)
+        self.subject_ids = np.asarray(subject_ids, dtype=np.int64)
+        self.type_codes = np.asarray(type_codes, dtype=np.int16)
+        self.points_earned = np.asarray(points_earned, dtype=np.float64)
+        self.points_possible = np.asarray(points_possible, dtype=np.float64)
+        self.percentages = np.asarray(percentages, dtype=np.float64)
+        self.days = np.asarray(days, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    @staticmethod
+    def type_code(grade_type):
+        """Index of a grade_type in GRADE_TYPES, -1 for unknown types"""
+        try:
+            return GRADE_TYPES.index(grade_type)
+        except ValueError:
+            return -1
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a frame from tuples ordered like GradeFrame.FIELDS"""
+        rows = list(rows)
+        if not rows:
+            return cls([], [], [], [], [], [], [])
+        student_ids, subject_ids, types, earned, possible, pct, dates = zip(*rows)
+        return cls(
+            student_ids,
+            subject_ids,
+            [cls.type_code(t) for t in types],
+            [float(v) for v in earned],
+            [float(v) for v in possible],
+            [float(v) for v in pct],
+            [d.toordinal() for d in dates],
+        )
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """Load a Grade queryset with a single query"""
+        rows = queryset.order_by('date_assigned', 'id').values_list(*cls.FIELDS)
+        return cls.from_rows(rows.iterator(chunk_size=10000))
+
+    @classmethod
+    def for_student(cls, student, subject=None):
+        grades = Grade.objects.filter(student=student)
+        if subject is not None:
+            grades = grades.filter(subject=subject)
+        return cls.from_queryset(grades)
+
+    @classmethod
+    def for_classroom(cls, classroom, subject=None):
+        grades = Grade.objects.filter(student__student_profile__classroom=classroom)
+        if subject is not None:
+            grades = grades.filter(subject=subject)
+        return cls.from_queryset(grades)
+
+    def select(self, mask):
+        """Return a new frame holding only the rows where mask is true"""
+        return GradeFrame(
+            self.student_ids[mask], self.subject_ids[mask], self.type_codes[mask],
+            self.points_earned[mask], self.points_possible[mask],
+            self.percentages[mask], self.days[mask],
+        )
+
+    def keys(self, by):
+        """Group key array for 'student', 'subject' or 'student_subject'"""
+        if by == 'student':
+            return self.student_ids
+        if by == 'subject':
+            return self.subject_ids
+        if by == 'student_subject':
+            # Pack both ids into one int64 so a single np.unique can group them
+            return (self.student_ids << 32) | self.subject_ids
+        raise ValueError(f'Unknown grouping: {by}')
+
+
+def _unpack_key(key, by):
+    if by == 'student_subject':
+        return (int(key >> 32), int(key & 0xFFFFFFFF))
+    return int(key)
+
+
+def _group(frame, by):
+    unique_keys, inverse = np.unique(frame.keys(by), return_inverse=True)
+    return unique_keys, inverse.reshape(-1)
+
+
+def _to_dict(unique_keys, values, by):
+    return {_unpack_key(k, by): float(v) for k, v in zip(unique_keys, values)}
+
+
+def average_percentages(frame, by='student'):
+    """Plain mean of Grade.percentage per group"""
+    if not len(frame):
+        return {}
+    unique_keys, inverse = _group(frame, by)
+    sums = np.bincount(inverse, weights=frame.percentages)
+    counts = np.bincount(inverse)
+    return _to_dict(unique_keys, sums / counts, by)
+
+
+def grade_counts(frame, by='student'):
+    if not len(frame):
+        return {}
+    unique_keys, inverse = _group(frame, by)
+    counts = np.bincount(inverse)
+    return {_unpack_key(k, by): int(c) for k, c in zip(unique_keys, counts)}
+
+
+def _weighted_array(frame, by, weights):
+    weights = GRADE_TYPE_WEIGHTS if weights is None else weights
+    type_weights = np.array([weights.get(t, 0.0) for t in GRADE_TYPES] + [0.0])
+    n_types = len(GRADE_TYPES) + 1
+
+    unique_keys, inverse = _group(frame, by)
+    n_groups = len(unique_keys)
+    # Unknown types (-1) land in the trailing zero-weight slot
+    type_slot = np.where(frame.type_codes < 0, n_types - 1, frame.type_codes)
+    cell = inverse * n_types + type_slot
+
+    cell_sums = np.bincount(cell, weights=frame.percentages, minlength=n_groups * n_types)
+    cell_counts = np.bincount(cell, minlength=n_groups * n_types)
+    present = cell_counts > 0
+    cell_means = np.divide(cell_sums, cell_counts, out=np.zeros_like(cell_sums), where=present)
+
+    cell_weights = np.tile(type_weights, n_groups) * present
+    weighted = (cell_means * cell_weights).reshape(n_groups, n_types).sum(axis=1)
+    total_weight = cell_weights.reshape(n_groups, n_types).sum(axis=1)
+
+    plain = np.bincount(inverse, weights=frame.percentages) / np.bincount(inverse)
+    result = np.where(total_weight > 0,
+                      weighted / np.where(total_weight > 0, total_weight, 1.0),
+                      plain)
+    return unique_keys, result
+
+
+def weighted_percentages(frame, by='student', weights=None):
+    """
+    Weighted percentage per group: the mean percentage of each grade_type,
+    combined with GRADE_TYPE_WEIGHTS re-normalised over the types present.
+    Groups whose grades all have unweighted types fall back to the plain mean.
+    """
+    if not len(frame):
+        return {}
+    unique_keys, result = _weighted_array(frame, by, weights)
+    return _to_dict(unique_keys, result, by)
+
+
+def grade_points(percentages):
+    """Map percentages onto the 4.0 scale using GPA_BANDS"""
+    percentages = np.asarray(percentages, dtype=np.float64)
+    conditions = [percentages >= cutoff for cutoff, _ in GPA_BANDS]
+    return np.select(conditions, [points for _, points in GPA_BANDS], default=0.0)
+
+
+def gpa(frame, weights=None):
+    """GPA per student: mean grade points of their weighted subject percentages"""
+    if not len(frame):
+        return {}
+    keys, per_subject = _weighted_array(frame, 'student_subject', weights)
+    unique_students, inverse = np.unique(keys >> 32, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    points = grade_points(per_subject)
+    means = np.bincount(inverse, weights=points) / np.bincount(inverse)
+    return {int(s): round(float(v), 2) for s, v in zip(unique_students, means)}
+
+
+def rank_scores(scores):
+    """
+    Competition rank (1 = best, ties share a rank) and percentile rank for a
+    {key: score} mapping. Percentile is the mid-rank definition: the share of
+    scores strictly below plus half of the ties, scaled to 0-100.
+    """
+    if not scores:
+        return {}
+    keys = list(scores)
+    values = np.fromiter((scores[k] for k in keys), dtype=np.float64, count=len(keys))
+    ordered = np.sort(values)
+    below = np.searchsorted(ordered, values, side='left')
+    below_or_equal = np.searchsorted(ordered, values, side='right')
+    n = len(values)
+    ranks = n - below_or_equal + 1
+    percentiles = (below + 0.5 * (below_or_equal - below)) / n * 100
+    return {
+        key: {'rank': int(rank), 'percentile': round(float(pct), 2)}
+        for key, rank, pct in zip(keys, ranks, percentiles)
+    }
+
+
+def percentile_ranks(frame, weights=None):
+    """Rank and percentile of every student's weighted percentage within the frame"""
+    return rank_scores(weighted_percentages(frame, by='student', weights=weights))
+
+
+def moving_average_trend(frame, window=3, by='student'):
+    """
+    Trailing moving average of percentages in date order per group.
+    Returns {key: [(date_ordinal, moving_average), ...]}.
+    """
+    if not len(frame):
+        return {}
+    keys = frame.keys(by)
+    order = np.lexsort((frame.days, keys))
+    keys, days, pct = keys[order], frame.days[order], frame.percentages[order]
+
+    # Start offset of each group within the sorted arrays
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    lengths = np.diff(np.r_[starts, len(keys)])
+    group_start = np.repeat(starts, lengths)
+
+    # Percentages carry two decimals; summing them as integer hundredths keeps
+    # the running sums exact however long the series is.
+    cumsum = np.r_[0, np.cumsum(np.rint(pct * 100).astype(np.int64))]
+    index = np.arange(len(keys))
+    lower = np.maximum(index + 1 - window, group_start)
+    span = index + 1 - lower
+    averages = (cumsum[index + 1] - cumsum[lower]) / (span * 100)
+
+    trends = {}
+    for start, length in zip(starts, lengths):
+        stop = start + length
+        trends[_unpack_key(keys[start], by)] = [
+            (int(d), round(float(a), 2)) for d, a in zip(days[start:stop], averages[start:stop])
+        ]
+    return trends
+
+
+def trend_slopes(frame, by='student'):
+    """Least-squares slope of percentage against time, in points per 30 days"""
+    if not len(frame):
+        return {}
+    unique_keys, inverse = _group(frame, by)
+    counts = np.bincount(inverse)
+    x = frame.days.astype(np.float64)
+    y = frame.percentages
+    mean_x = np.bincount(inverse, weights=x) / counts
+    mean_y = np.bincount(inverse, weights=y) / counts
+    dx = x - mean_x[inverse]
+    dy = y - mean_y[inverse]
+    sxx = np.bincount(inverse, weights=dx * dx)
+    sxy = np.bincount(inverse, weights=dx * dy)
+    slopes = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0) * 30
+    return _to_dict(unique_keys, slopes, by)
+
+
+def student_summary(student):
+    """Context-ready statistics for one student's grades page"""
+    frame = GradeFrame.for_student(student)
+    if not len(frame):
+        return {
+            'total_grades': 0,
+            'average_grade': 0,
+            'weighted_average': 0,
+            'gpa': 0,
+            'subjects_stats': {},
+        }
+    averages = average_percentages(frame, by='subject')
+    weighted = weighted_percentages(frame, by='subject')
+    counts = grade_counts(frame, by='subject')
+    return {
+        'total_grades': len(frame),
+        'average_grade': round(float(frame.percentages.mean()), 1),
+        'weighted_average': round(weighted_percentages(frame)[student.id], 1),
+        'gpa': gpa(frame)[student.id],
+        'subjects_stats': {
+            subject_id: {
+                'average': averages[subject_id],
+                'weighted': weighted[subject_id],
+                'count': counts[subject_id],
+            }
+            for subject_id in averages
+        },
+    }
+
+
+def classroom_summary(classroom, subject=None):
+    """Per-student weighted percentage, GPA, rank and percentile for a classroom"""
+    frame = GradeFrame.for_classroom(classroom, subject=subject)
+    weighted = weighted_percentages(frame)
+    ranks = rank_scores(weighted)
+    gpas = gpa(frame)
+    return {
+        student_id: {
+            'weighted_percentage': round(score, 2),
+            'gpa': gpas[student_id],
+            'rank': ranks[student_id]['rank'],
+            'percentile': ranks[student_id]['percentile'],
+        }
+        for student_id, score in weighted.items()
+    }
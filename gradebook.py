@@ -0,0 +1,120 @@
+"""
+Materialized classroom gradebook
+
+GradebookEntry holds each student's weighted percentage, rank and percentile
+per (classroom, subject). Rows are recomputed for a single classroom/subject
+whenever one of its grades changes, so ranking pages read pre-sorted rows
+with one indexed query instead of sorting every Grade on each request.
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+
+from grades.models import Grade
+from users.models import StudentProfile
+from .grade_stats import GradeFrame, grade_counts, rank_scores, weighted_percentages
+from .models import GradebookEntry
+from .routers import replica
+
+_pending = threading.local()
+
+
+def refresh_gradebook(classroom_id, subject_id):
+    """Recompute every GradebookEntry for one classroom and subject"""
+    frame = GradeFrame.from_queryset(Grade.objects.filter(
+        subject_id=subject_id,
+        student__student_profile__classroom_id=classroom_id,
+    ))
+    scores = weighted_percentages(frame)
+    counts = grade_counts(frame)
+    ranks = rank_scores(scores)
+
+    entries = [
+        GradebookEntry(
+            classroom_id=classroom_id,
+            subject_id=subject_id,
+            student_id=student_id,
+            weighted_percentage=Decimal(str(round(score, 2))),
+            grade_count=counts[student_id],
+            rank=ranks[student_id]['rank'],
+            percentile=Decimal(str(ranks[student_id]['percentile'])),
+        )
+        for student_id, score in scores.items()
+    ]
+
+    with transaction.atomic():
+        GradebookEntry.objects.filter(
+            classroom_id=classroom_id, subject_id=subject_id,
+        ).exclude(student_id__in=list(scores)).delete()
+        GradebookEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['classroom', 'subject', 'student'],
+            update_fields=['weighted_percentage', 'grade_count', 'rank', 'percentile', 'updated_at'],
+        )
+    return len(entries)
+
+
+def schedule_refresh(classroom_id, subject_id):
+    """
+    Refresh a classroom/subject after the current transaction commits.
+    Several grade writes to the same classroom/subject in one transaction
+    refresh it only once.
+    """
+    if classroom_id is None or subject_id is None:
+        return
+    key = (classroom_id, subject_id)
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    pending.add(key)
+
+    def run():
+        # Later callbacks for a key that was already refreshed are no-ops
+        if key in pending:
+            pending.discard(key)
+            refresh_gradebook(*key)
+
+    # Runs immediately when not inside a transaction
+    transaction.on_commit(run)
+
+
+def schedule_moves(moves):
+    """
+    Refresh the old and new classrooms of students who changed classroom,
+    {student_id: (old_classroom_id, new_classroom_id)}, for every subject
+    they have grades in
+    """
+    if not moves:
+        return
+    pairs = Grade.objects.filter(student_id__in=moves).values_list('student_id', 'subject_id').distinct()
+    for student_id, subject_id in pairs:
+        for classroom_id in moves[student_id]:
+            schedule_refresh(classroom_id, subject_id)
+
+
+def classroom_for_student(student_id):
+    return StudentProfile.objects.filter(user_id=student_id).values_list('classroom_id', flat=True).first()
+
+
+def class_rankings(classroom, subject):
+    """Ranked gradebook rows for a classroom and subject"""
+    return GradebookEntry.objects.filter(
+        classroom=classroom, subject=subject,
+    ).select_related('student').order_by('rank')
+
+
+def rebuild_gradebook():
+    """Refresh every classroom/subject that has grades; used for backfills"""
+    refreshed = 0
+    # Grades are read from the replica when one is configured; entries are written to the primary
+    with replica():
+        pairs = list(Grade.objects.filter(
+            student__student_profile__classroom__isnull=False,
+        ).values_list('student__student_profile__classroom_id', 'subject_id').distinct())
+        for classroom_id, subject_id in pairs:
+            refresh_gradebook(classroom_id, subject_id)
+            refreshed += 1
+    return refreshed
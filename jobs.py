@@ -0,0 +1,296 @@
+"""
+Background data jobs
+
+Exports and imports are queued as DataJob rows and executed by the
+run_data_jobs worker pool, never inside a web request. Workers claim jobs
+with a conditional UPDATE, report rows done/total as they go and write
+their artifacts under DATA_JOBS_ROOT. Every write a worker makes to a job
+is conditional on it still owning the row, so a worker whose job was
+requeued stops instead of overwriting the new run.
+"""
+
+import os
+import re
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import bulk_import, exports
+from .routers import replica
+from .metrics import DATA_JOB_DURATION
+from .models import DataJob
+
+# Progress is written at most this often per job
+PROGRESS_INTERVAL_SECONDS = 1.0
+# Running jobs without a heartbeat for this long are considered abandoned
+STALE_AFTER = timedelta(minutes=10)
+# Running jobs refresh their heartbeat this often, however slow their rows are
+HEARTBEAT_SECONDS = 60
+
+
+class JobLost(Exception):
+    """The job was requeued (or finished) under a worker that was still running it"""
+
+
+def jobs_root():
+    root = getattr(settings, 'DATA_JOBS_ROOT', None)
+    if not root:
+        base = getattr(settings, 'MEDIA_ROOT', '') or getattr(settings, 'BASE_DIR', '.')
+        root = os.path.join(base, 'data_jobs')
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def artifact_path(job):
+    return os.path.join(jobs_root(), job.artifact)
+
+
+def partial_path(job):
+    """Where an export is written until it is complete; per worker, so a requeued run never shares it"""
+    worker = re.sub(r'[^\w.-]', '_', job.worker)
+    return os.path.join(jobs_root(), f'job_{job.pk}.{worker}.part')
+
+
+def remove_partial(job):
+    try:
+        os.remove(partial_path(job))
+    except FileNotFoundError:
+        pass
+
+
+def enqueue_export(user, export_type, export_format='csv', compress=False, start_date=None, end_date=None):
+    """Queue an export; raises ValueError for unknown types or formats and malformed dates"""
+    exports.resolve_datasets(export_type)
+    if export_format not in exports.EXPORT_FORMATS:
+        raise ValueError(f'Unsupported format: {export_format}')
+    start_date, end_date = exports.parse_date_range(start_date, end_date)
+    return DataJob.objects.create(
+        kind='export',
+        job_type=export_type,
+        created_by=user,
+        params={
+            'format': export_format,
+            'compress': bool(compress),
+            'start_date': start_date and start_date.isoformat(),
+            'end_date': end_date and end_date.isoformat(),
+        },
+    )
+
+
+def owned(job):
+    """The job's row, as long as this worker is still the one running it"""
+    return DataJob.objects.filter(pk=job.pk, worker=job.worker, status='running')
+
+
+def update_owned(job, **fields):
+    if not owned(job).update(**fields):
+        raise JobLost(f'Job {job.pk} is no longer running on {job.worker}')
+
+
+class Heartbeat:
+    """
+    Refreshes heartbeat_at from a timer thread while a job runs, so a slow
+    query or import chunk does not make a live job look abandoned.
+    """
+
+    def __init__(self, job, interval=HEARTBEAT_SECONDS):
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f'data-job-{job.pk}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                # A requeued job stops beating; the worker finds out on its next write
+                if not owned(self.job).update(heartbeat_at=timezone.now()):
+                    return
+        finally:
+            connection.close()
+
+
+class Progress:
+    """Throttled writer for a job's rows_done counter and heartbeat"""
+
+    def __init__(self, job):
+        self.job = job
+        self.rows_done = 0
+        self.last_write = 0.0
+
+    def add(self, count=1):
+        self.rows_done += count
+        now = time.monotonic()
+        if now - self.last_write >= PROGRESS_INTERVAL_SECONDS:
+            self.flush(now)
+
+    def flush(self, now=None):
+        self.last_write = now or time.monotonic()
+        update_owned(self.job, rows_done=self.rows_done, heartbeat_at=timezone.now())
+
+    def count(self, rows):
+        """Pass rows through while counting them"""
+        for row in rows:
+            yield row
+            self.add()
+
+
+def run_export_job(job):
+    # Export reads go to the replica when one is configured
+    with replica():
+        _write_export(job)
+
+
+def _write_export(job):
+    params = job.params
+    datasets = exports.resolve_datasets(job.job_type)
+    start_date, end_date = params.get('start_date'), params.get('end_date')
+
+    total = sum(exports.dataset_queryset(name, start_date, end_date).count() for name in datasets)
+    update_owned(job, rows_total=total)
+
+    progress = Progress(job)
+    sections = (
+        (name, columns, progress.count(rows))
+        for name in datasets
+        for columns, rows in [exports.dataset_rows(name, start_date, end_date)]
+    )
+    blocks = exports.encode_sections(sections, params.get('format', 'csv'), params.get('compress', False))
+
+    job.artifact = f"job_{job.pk}_{exports.export_filename(job.job_type, params.get('format', 'csv'), params.get('compress', False))}"
+    final_path = artifact_path(job)
+    with open(partial_path(job), 'wb') as artifact:
+        for block in blocks:
+            artifact.write(block)
+    progress.flush()
+    os.replace(partial_path(job), final_path)
+
+    update_owned(job, artifact=job.artifact, artifact_size=os.path.getsize(final_path), rows_done=progress.rows_done)
+
+
+def enqueue_import(user, dataset, upload):
+    """Save an uploaded CSV under DATA_JOBS_ROOT and queue its import"""
+    if dataset not in bulk_import.IMPORTERS:
+        raise ValueError(f'Unknown import type: {dataset}')
+    uploads = os.path.join(jobs_root(), 'uploads')
+    os.makedirs(uploads, exist_ok=True)
+    path = os.path.join(uploads, f'{timezone.now():%Y%m%d%H%M%S%f}_{os.path.basename(upload.name)}')
+    with open(path, 'wb') as destination:
+        for chunk in upload.chunks():
+            destination.write(chunk)
+    return DataJob.objects.create(
+        kind='import', job_type=dataset, created_by=user,
+        params={'path': path, 'filename': upload.name},
+    )
+
+
+def run_import_job(job):
+    """Import the uploaded file; rows that fail validation end up in an error report artifact"""
+    path = job.params['path']
+    update_owned(job, rows_total=bulk_import.count_rows(path))
+    progress = Progress(job)
+    result = bulk_import.import_file(job.job_type, path, progress=progress.add)
+    progress.flush()
+
+    summary = result.as_dict()
+    del summary['errors']
+    fields = {'params': {**job.params, 'result': summary}, 'rows_done': result.rows}
+    if result.errors:
+        job.artifact = f'job_{job.pk}_{job.job_type}_import_errors.csv'
+        with open(artifact_path(job), 'w', newline='', encoding='utf-8') as report:
+            report.write(bulk_import.errors_csv(result))
+        fields.update(artifact=job.artifact, artifact_size=os.path.getsize(artifact_path(job)))
+    update_owned(job, **fields)
+
+
+# kind -> callable(job)
+JOB_HANDLERS = {
+    'export': run_export_job,
+    'import': run_import_job,
+}
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next_job(worker):
+    """
+    Atomically move the oldest queued job to running. The conditional UPDATE
+    means two workers racing for the same row cannot both win it.
+    """
+    for job_id in DataJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:5]:
+        now = timezone.now()
+        claimed = DataJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            return DataJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.kind)
+    start = time.perf_counter()
+    try:
+        if handler is None:
+            raise ValueError(f'No handler for {job.kind} jobs')
+        with Heartbeat(job):
+            handler(job)
+        update_owned(job, status='completed', finished_at=timezone.now())
+    except JobLost:
+        # Another worker owns the job now; leave its row and files alone
+        remove_partial(job)
+        DATA_JOB_DURATION.observe(time.perf_counter() - start, kind=job.kind, job_type=job.job_type, outcome='lost')
+        return False
+    except Exception as e:
+        remove_partial(job)
+        owned(job).update(
+            status='failed', error=f'{e}\n\n{traceback.format_exc()}', finished_at=timezone.now(),
+        )
+        DATA_JOB_DURATION.observe(time.perf_counter() - start, kind=job.kind, job_type=job.job_type, outcome='failed')
+        return False
+    DATA_JOB_DURATION.observe(time.perf_counter() - start, kind=job.kind, job_type=job.job_type, outcome='completed')
+    return True
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """Put running jobs whose worker died back on the queue, discarding their partial output"""
+    cutoff = timezone.now() - stale_after
+    requeued = 0
+    for job in DataJob.objects.filter(status='running', heartbeat_at__lt=cutoff):
+        # Conditional, so a job another worker requeued (or that just finished) is left alone
+        if DataJob.objects.filter(pk=job.pk, status='running', heartbeat_at__lt=cutoff).update(
+                status='queued', worker='', rows_done=0):
+            remove_partial(job)
+            requeued += 1
+    return requeued
+
+
+def work(poll_interval=2.0, once=False, stop=None):
+    """Claim and run jobs until stopped (or until the queue is empty with once=True)"""
+    name = worker_name()
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        # Every worker checks, so a job stranded by a dead worker is picked up without a restart
+        requeue_stale_jobs()
+        job = claim_next_job(name)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
@@ -0,0 +1,412 @@
+"""
+Synthetic load-test dataset generator
+
+Builds a district-sized dataset (teachers, students, parents, classrooms,
+attendance, grades and feedback) from a seeded random.Random, so the same
+seed and anchor date always produce the same rows. Rows are streamed into
+the database with cursor.executemany in batches, with explicit primary
+keys, instead of one ORM save per row; a 10M-row attendance table is a
+matter of minutes rather than days.
+
+Distributions default to the weights used by comprehensive_data_expansion.py
+(85/10/5 present/late/absent, grades ~ N(78, 12), ratings 3-5, 40-70% of a
+class answering a feedback session) and can be overridden per run.
+"""
+
+import json
+import random
+import time
+from bisect import bisect
+from datetime import date, datetime, time as dtime, timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from feedback.models import FeedbackCategory, FeedbackResponse, FeedbackSession
+from grades.models import Grade
+from subject.models import Subject
+from users.models import ParentProfile, StudentProfile, TeacherProfile
+
+from . import caching, rollups
+
+User = get_user_model()
+
+PRESETS = {
+    'small': {'students': 1_000, 'attendance_records': 100_000, 'grades': 50_000, 'feedback_responses': 10_000},
+    'school': {'students': 5_000, 'attendance_records': 1_000_000, 'grades': 500_000, 'feedback_responses': 100_000},
+    'district': {'students': 100_000, 'attendance_records': 10_000_000, 'grades': 5_000_000,
+                 'feedback_responses': 1_000_000},
+}
+
+DISTRIBUTIONS = {
+    'attendance_status': {'present': 0.85, 'late': 0.10, 'absent': 0.05},
+    'grade_mean': 78,
+    'grade_stdev': 12,
+    'grade_types': ['assignment', 'quiz', 'exam', 'project', 'participation', 'homework'],
+    'points_possible': [10, 20, 25, 50, 100],
+    'feedback_rating': (3, 5),
+    'feedback_response_rate': (0.4, 0.7),
+    'completion_seconds': (60, 300),
+    'students_per_classroom': 30,
+    'students_per_teacher': 20,
+    'parents_per_student': 0.75,
+    'children_per_parent': (1, 3),
+    # Sessions, grades and responses are spread over this many days before the anchor date
+    'days': 180,
+}
+
+SUBJECTS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'English Literature', 'History', 'Geography',
+    'Computer Science', 'Art', 'Music', 'Physical Education', 'Economics', 'Psychology',
+    'Environmental Science', 'Statistics',
+]
+FEEDBACK_CATEGORIES = ['Course Evaluation', 'Teacher Performance', 'Student Experience', 'Peer Review',
+                       'Self Assessment']
+GRADES_LIST = ['6th', '7th', '8th', '9th', '10th', '11th', '12th']
+DEPARTMENTS = ['Mathematics', 'Science', 'English', 'Social Studies', 'Arts', 'Physical Education', 'Technology']
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Aisha', 'Wei', 'Carlos', 'Priya', 'Kenji', 'Fatima', 'Omar', 'Sofia', 'Ivan', 'Amara']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson',
+              'Khan', 'Chen', 'Patel', 'Nguyen', 'Kim', 'Okafor', 'Silva', 'Novak']
+GRADE_COMMENTS = ['Excellent work!', 'Good effort, keep it up!', 'Needs improvement in some areas.',
+                  'Well done!', 'Outstanding performance!', 'Good understanding of concepts.',
+                  'Please see me for additional help.', 'Great improvement!']
+ATTENDANCE_NOTES = ['', '', '', 'Medical appointment', 'Family emergency', 'School event']
+FEEDBACK_COMMENTS = ['Great teaching methods!', 'Could use more examples.', 'Very helpful and clear.',
+                     'Enjoyed the interactive sessions.', 'Would like more practice problems.',
+                     'Excellent course content.', 'Good pace of teaching.']
+
+BATCH_SIZE = 10_000
+
+
+def _dt(value):
+    # Naive UTC text, the form Django itself stores datetimes in on SQLite
+    return str(value)
+
+
+class LoadGenerator:
+    """
+    Generate one dataset. Volumes come from a preset and can be overridden
+    (students, attendance_records, grades, feedback_responses); distribution
+    settings can be overridden through `distributions`.
+    """
+
+    def __init__(self, preset='small', seed=0, prefix='load', anchor=None, distributions=None,
+                 batch_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS, log=None, **volumes):
+        unknown = set(volumes) - set(PRESETS['small'])
+        if preset not in PRESETS or unknown:
+            raise ValueError(f"Unknown preset or volume: {preset if preset not in PRESETS else sorted(unknown)}")
+        self.volumes = {**PRESETS[preset], **{k: v for k, v in volumes.items() if v is not None}}
+        self.dist = {**DISTRIBUTIONS, **(distributions or {})}
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.anchor = anchor or date.today()
+        self.batch_size = batch_size
+        self.using = using
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+        statuses = self.dist['attendance_status']
+        self.statuses = list(statuses)
+        self.status_cumulative = list(accumulate(statuses.values()))
+
+    # -- helpers ----------------------------------------------------------
+
+    def _next_id(self, model):
+        last = model.objects.using(self.using).order_by('-pk').values_list('pk', flat=True).first()
+        return (last or 0) + 1
+
+    def _insert(self, model, fields, rows):
+        """
+        executemany rows of values for `fields` into the model's table. Model
+        fields the generator does not supply get their default (or now() for
+        auto_now fields); fields the model does not have are dropped, so the
+        generator works against older and newer schemas alike.
+        """
+        connection = connections[self.using]
+        concrete = {field.attname: field for field in model._meta.concrete_fields}
+        keep = [index for index, name in enumerate(fields) if name in concrete]
+        names = [fields[index] for index in keep]
+        now = _dt(timezone.now().replace(tzinfo=None, microsecond=0))
+        extra = []
+        for attname, field in concrete.items():
+            if attname in names or field.primary_key:
+                continue
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                extra.append((attname, now if field.get_internal_type() == 'DateTimeField' else now[:10]))
+            elif field.has_default() or not field.null:
+                extra.append((attname, field.get_db_prep_save(field.get_default(), connection)))
+        columns = names + [attname for attname, _ in extra]
+        defaults = tuple(value for _, value in extra)
+
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            table,
+            ', '.join(connection.ops.quote_name(concrete[name].column) for name in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        total = 0
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while True:
+                batch = [tuple(row[index] for index in keep) + defaults for row in islice(rows, self.batch_size)]
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        self.counts[model._meta.label] = self.counts.get(model._meta.label, 0) + total
+        self.log(f'{model._meta.label}: {total:,} rows')
+        return total
+
+    def _name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def _day(self):
+        return self.anchor - timedelta(days=self.rng.randint(0, self.dist['days'] - 1))
+
+    def _school_time(self):
+        """A weekday between 08:00 and 15:00 in the generated date range"""
+        day = self._day()
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        return datetime.combine(day, dtime(self.rng.randint(8, 14), self.rng.choice([0, 15, 30, 45])))
+
+    def _status(self):
+        return self.statuses[bisect(self.status_cumulative, self.rng.random() * self.status_cumulative[-1])]
+
+    # -- tables -----------------------------------------------------------
+
+    def generate(self):
+        """Generate the whole dataset in one transaction; returns row counts per model"""
+        username = f'{self.prefix}_'
+        if User.objects.using(self.using).filter(username__startswith=username).exists():
+            raise ValueError(f'Users prefixed {username!r} already exist; choose another prefix')
+
+        started = time.perf_counter()
+        with transaction.atomic(using=self.using):
+            self.subject_ids = self._reference_rows(Subject, SUBJECTS)
+            self.subject_names = dict(zip(self.subject_ids, SUBJECTS))
+            self.category_ids = self._reference_rows(FeedbackCategory, FEEDBACK_CATEGORIES)
+            self._users()
+            self._classrooms()
+            self._student_profiles()
+            self._parents()
+            self._attendance()
+            self._grades()
+            self._feedback()
+            self._reset_sequences()
+            # Raw inserts send no signals, so roll the generated attendance up here
+            rollups.rebuild(self.anchor - timedelta(days=self.dist['days']), self.anchor, using=self.using)
+        caching.bump(*caching.GROUPS)
+        self.log(f'Generated in {time.perf_counter() - started:.1f}s')
+        return self.counts
+
+    def _reference_rows(self, model, names):
+        return [
+            model.objects.using(self.using).get_or_create(name=name)[0].pk
+            for name in names
+        ]
+
+    def _users(self):
+        students = self.volumes['students']
+        teachers = max(1, students // self.dist['students_per_teacher'])
+        parents = int(students * self.dist['parents_per_student'])
+        joined = _dt(datetime.combine(self.anchor - timedelta(days=self.dist['days']), dtime(8)))
+        # One hash per role; hashing every generated account would dominate the run
+        passwords = {role: make_password(f'{role}123') for role in ('teacher', 'student', 'parent')}
+
+        first_id = self._next_id(User)
+        self.teacher_ids = list(range(first_id, first_id + teachers))
+        self.student_ids = list(range(self.teacher_ids[-1] + 1, self.teacher_ids[-1] + 1 + students))
+        self.parent_ids = list(range(first_id + teachers + students, first_id + teachers + students + parents))
+
+        def rows():
+            for role, ids in (('teacher', self.teacher_ids), ('student', self.student_ids),
+                              ('parent', self.parent_ids)):
+                for n, pk in enumerate(ids):
+                    first, last = self._name()
+                    username = f'{self.prefix}_{role}_{n}'
+                    yield (pk, username, first, last, f'{username}@smartclassroom.edu', role,
+                           passwords[role], True, False, False, joined)
+
+        self._insert(User, ['id', 'username', 'first_name', 'last_name', 'email', 'role', 'password',
+                            'is_active', 'is_staff', 'is_superuser', 'date_joined'], rows())
+
+        first_profile = self._next_id(TeacherProfile)
+        self._insert(
+            TeacherProfile,
+            ['id', 'user_id', 'teacher_id', 'employee_id', 'department', 'experience_years'],
+            ((first_profile + n, pk, f'{self.prefix}T{n}', f'{self.prefix}E{n}',
+              self.rng.choice(DEPARTMENTS), self.rng.randint(1, 30))
+             for n, pk in enumerate(self.teacher_ids)),
+        )
+
+    def _classrooms(self):
+        size = self.dist['students_per_classroom']
+        count = max(1, -(-len(self.student_ids) // size))
+        first_id = self._next_id(Classroom)
+        self.classroom_ids = list(range(first_id, first_id + count))
+        self.classroom_teacher = {}
+        self.classroom_students = {}
+        rows = []
+        for n, pk in enumerate(self.classroom_ids):
+            grade = GRADES_LIST[n % len(GRADES_LIST)]
+            teacher = self.teacher_ids[n % len(self.teacher_ids)]
+            self.classroom_teacher[pk] = teacher
+            self.classroom_students[pk] = self.student_ids[n * size:(n + 1) * size]
+            rows.append((pk, f'{self.prefix} Class {grade} - Section {n}', grade, teacher))
+        self._insert(Classroom, ['id', 'name', 'grade', 'teacher_id'], rows)
+
+    def _student_profiles(self):
+        first_id = self._next_id(StudentProfile)
+        self.student_profile_ids = {}
+        rows = []
+        for n, classroom in enumerate(self.classroom_ids):
+            grade = GRADES_LIST[n % len(GRADES_LIST)]
+            for roll, student in enumerate(self.classroom_students[classroom], start=1):
+                pk = first_id + len(rows)
+                self.student_profile_ids[student] = pk
+                rows.append((pk, student, f'{self.prefix}S{student}', str(roll), grade, classroom))
+        self._insert(StudentProfile, ['id', 'user_id', 'student_id', 'roll_number', 'grade', 'classroom_id'], rows)
+
+    def _parents(self):
+        first_id = self._next_id(ParentProfile)
+        profile_ids = list(self.student_profile_ids.values())
+        low, high = self.dist['children_per_parent']
+        links = []
+        profiles = []
+        for n, user_id in enumerate(self.parent_ids):
+            pk = first_id + n
+            profiles.append((pk, user_id, self.rng.choice(['Father', 'Mother', 'Guardian'])))
+            for student in self.rng.sample(profile_ids, min(len(profile_ids), self.rng.randint(low, high))):
+                links.append((pk, student))
+        self._insert(ParentProfile, ['id', 'user_id', 'relationship'], profiles)
+        self._insert(ParentProfile.students.through, ['parentprofile_id', 'studentprofile_id'], links)
+
+    def _attendance(self):
+        target = self.volumes['attendance_records']
+        first_session = self._next_id(AttendanceSession)
+        sessions = []
+
+        def session_rows():
+            produced = 0
+            n = 0
+            while produced < target:
+                classroom = self.classroom_ids[n % len(self.classroom_ids)]
+                start = self._school_time()
+                sessions.append((first_session + n, classroom, start))
+                subject = self.rng.choice(self.subject_ids)
+                yield (first_session + n, f'{self.subject_names[subject]} - Class {classroom}',
+                       classroom, subject, self.classroom_teacher[classroom], _dt(start),
+                       _dt(start + timedelta(hours=1)), 'completed', 'daily', 60, 15)
+                produced += len(self.classroom_students[classroom])
+                n += 1
+
+        self._insert(AttendanceSession, ['id', 'title', 'classroom_id', 'subject_id', 'teacher_id', 'start_time',
+                                         'end_time', 'status', 'attendance_type', 'duration_minutes',
+                                         'late_threshold_minutes'], session_rows())
+
+        def record_rows():
+            produced = 0
+            for session, classroom, start in sessions:
+                teacher = self.classroom_teacher[classroom]
+                for student in self.classroom_students[classroom]:
+                    if produced == target:
+                        return
+                    status = self._status()
+                    if status == 'late':
+                        marked_at = _dt(start + timedelta(minutes=self.rng.randint(16, 45)))
+                    elif status == 'absent':
+                        marked_at = _dt(start)
+                    else:
+                        marked_at = _dt(start + timedelta(minutes=self.rng.randint(0, 15)))
+                    produced += 1
+                    yield (session, student, status, marked_at, teacher, self.rng.choice(ATTENDANCE_NOTES))
+
+        self._insert(AttendanceRecord, ['session_id', 'student_id', 'status', 'marked_at', 'marked_by_id', 'notes'],
+                     record_rows())
+
+    def _grades(self):
+        mean, stdev = self.dist['grade_mean'], self.dist['grade_stdev']
+        types = self.dist['grade_types']
+        possible_choices = self.dist['points_possible']
+
+        def rows():
+            for _ in range(self.volumes['grades']):
+                student = self.rng.choice(self.student_ids)
+                subject = self.rng.choice(self.subject_ids)
+                grade_type = self.rng.choice(types)
+                possible = self.rng.choice(possible_choices)
+                percentage = round(max(0.0, min(100.0, self.rng.normalvariate(mean, stdev))), 2)
+                assigned = self._day()
+                graded = datetime.combine(assigned + timedelta(days=self.rng.randint(1, 7)), dtime(16))
+                yield (student, subject, self.rng.choice(self.teacher_ids),
+                       f'{self.subject_names[subject]} - {grade_type.title()} {self.rng.randint(1, 10)}', grade_type,
+                       f'{percentage * possible / 100:.2f}', f'{possible:.2f}', f'{percentage:.2f}',
+                       assigned.isoformat(), _dt(graded), self.rng.choice(GRADE_COMMENTS))
+
+        self._insert(Grade, ['student_id', 'subject_id', 'teacher_id', 'title', 'grade_type', 'points_earned',
+                             'points_possible', 'percentage', 'date_assigned', 'date_graded', 'comments'], rows())
+
+    def _feedback(self):
+        target = self.volumes['feedback_responses']
+        low_rate, high_rate = self.dist['feedback_response_rate']
+        low_rating, high_rating = self.dist['feedback_rating']
+        low_seconds, high_seconds = self.dist['completion_seconds']
+        first_session = self._next_id(FeedbackSession)
+        responses = []
+
+        def session_rows():
+            produced = 0
+            n = 0
+            while produced < target:
+                classroom = self.rng.choice(self.classroom_ids)
+                students = self.classroom_students[classroom]
+                count = max(1, int(len(students) * self.rng.uniform(low_rate, high_rate)))
+                responding = self.rng.sample(students, count)
+                responding = responding[:target - produced]
+                start = self._school_time()
+                subject = self.rng.choice(self.subject_ids)
+                pk = first_session + n
+                responses.append((pk, start, responding))
+                yield (pk, f'{self.subject_names[subject]} - Course Evaluation', '',
+                       self.rng.choice(self.category_ids), classroom, subject, self.classroom_teacher[classroom],
+                       'completed', 'public', _dt(start), _dt(start + timedelta(days=14)))
+                produced += len(responding)
+                n += 1
+
+        self._insert(FeedbackSession, ['id', 'title', 'description', 'category_id', 'classroom_id', 'subject_id',
+                                       'created_by_id', 'status', 'visibility', 'start_date', 'end_date'],
+                     session_rows())
+
+        def response_rows():
+            for session, start, students in responses:
+                for student in students:
+                    data = {
+                        'rating': self.rng.randint(low_rating, high_rating),
+                        'comment': self.rng.choice(FEEDBACK_COMMENTS),
+                        'recommendation': self.rng.choice(['Yes', 'Maybe', 'Yes', 'Yes']),
+                    }
+                    submitted = start + timedelta(minutes=self.rng.randint(5, 14 * 24 * 60))
+                    yield (session, student, json.dumps(data), True,
+                           self.rng.randint(low_seconds, high_seconds), _dt(submitted))
+
+        self._insert(FeedbackResponse, ['session_id', 'respondent_id', 'response_data', 'is_complete',
+                                        'completion_time_seconds', 'submitted_at'], response_rows())
+
+    def _reset_sequences(self):
+        # Rows were inserted with explicit ids; move sequences past them (a no-op on SQLite)
+        connection = connections[self.using]
+        models = [User, TeacherProfile, Classroom, StudentProfile, ParentProfile, AttendanceSession,
+                  FeedbackSession]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from attendance.models import AttendanceSession
+from teacher import rollups
+from teacher.routers import replica, replica_alias
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily and monthly attendance rollups from AttendanceRecord'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First month to rebuild (default: first session)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last month to rebuild (default: last session)')
+
+    def handle(self, *args, **options):
+        with replica():
+            span = AttendanceSession.objects.aggregate(first=Min('start_time'), last=Max('start_time'))
+        if span['first'] is None:
+            self.stdout.write('No attendance sessions to roll up')
+            return
+        start = options['start'] or rollups.session_day(span['first'])
+        end = options['end'] or rollups.session_day(span['last'])
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        # One month at a time keeps each transaction short on large schools
+        month = rollups.month_start(start)
+        while month <= end:
+            # Marks are aggregated on the replica when one is configured
+            rollups.rebuild(month, month, source=replica_alias())
+            month = rollups.month_end(month) + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt attendance rollups for {rollups.month_start(start):%B %Y} to {end:%B %Y}'))
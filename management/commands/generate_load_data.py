@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher.loadgen import PRESETS, LoadGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (up to district scale) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='load', help='Prefix for generated usernames and names')
+        parser.add_argument('--anchor-date', type=date.fromisoformat,
+                            help='Last day of generated activity (default: today); fix it for identical reruns')
+        parser.add_argument('--students', type=int)
+        parser.add_argument('--attendance', type=int, dest='attendance_records')
+        parser.add_argument('--grades', type=int)
+        parser.add_argument('--feedback', type=int, dest='feedback_responses')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        generator = LoadGenerator(
+            preset=options['preset'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            anchor=options['anchor_date'],
+            batch_size=options['batch_size'],
+            using=options['database'],
+            log=self.stdout.write,
+            students=options['students'],
+            attendance_records=options['attendance_records'],
+            grades=options['grades'],
+            feedback_responses=options['feedback_responses'],
+        )
+        try:
+            counts = generator.generate()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Inserted {sum(counts.values()):,} rows'))
+        self.stdout.write('Grades were bulk inserted; run rebuild_gradebook to refresh class rankings.')
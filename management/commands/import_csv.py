@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher.bulk_import import IMPORTERS, import_file
+
+
+class Command(BaseCommand):
+    help = 'Import students, grades or attendance from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            result = import_file(options['dataset'], options['path'], chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.rows} rows: {result.created} created, {result.updated} updated, {result.failed} failed'
+        ))
+        for error in result.errors[:20]:
+            self.stdout.write(self.style.WARNING(f"  line {error['line']}: {error['message']}"))
+        if len(result.errors) > 20:
+            self.stdout.write(f'  ... and {len(result.errors) - 20} more errors')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from teacher.gradebook import rebuild_gradebook
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized gradebook (ranks and percentiles) for every classroom and subject'
+
+    def handle(self, *args, **options):
+        refreshed = rebuild_gradebook()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} classroom/subject gradebooks'))
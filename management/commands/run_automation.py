@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from teacher import automation
+from teacher.models import AutomationRule
+
+
+class Command(BaseCommand):
+    help = 'Evaluate automation rules whose schedule is due (run from cron, or with --interval)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', type=int, help='Run only this rule, whether or not it is due')
+        parser.add_argument('--force', action='store_true', help='Run every active rule now')
+        parser.add_argument('--install-defaults', action='store_true', help='Create the default rules first')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep checking for due rules every N seconds instead of running once')
+
+    def handle(self, *args, **options):
+        if options['install_defaults']:
+            created = automation.install_default_rules()
+            self.stdout.write(self.style.SUCCESS(f'Installed {created} default rules'))
+
+        if options['rule']:
+            rule = AutomationRule.objects.filter(pk=options['rule']).first()
+            if rule is None:
+                raise CommandError(f'No automation rule {options["rule"]}')
+            self.report([automation.run_rule(rule)])
+            return
+
+        while True:
+            self.report(automation.run_due_rules(timezone.now(), force=options['force']))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def report(self, runs):
+        for run in runs:
+            if run.error:
+                self.stdout.write(self.style.ERROR(f'{run.rule}: failed ({run.error})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{run.rule}: {run.matched} matched, {run.alerts_created} new alerts, '
+                    f'{run.alerts_resolved} resolved in {run.duration_ms:.0f} ms'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from teacher import benchmarks
+from teacher.loadgen import PRESETS, LoadGenerator
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the major views and API endpoints against a generated dataset in a throwaway '
+            'test database and fail on regressions against the stored baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--students', type=int)
+        parser.add_argument('--attendance', type=int, dest='attendance_records')
+        parser.add_argument('--grades', type=int)
+        parser.add_argument('--feedback', type=int, dest='feedback_responses')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='*', help='Scenario names to run')
+        parser.add_argument('--baseline', default=benchmarks.DEFAULT_BASELINE)
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=benchmarks.LATENCY_TOLERANCE,
+                            help='Allowed p95 latency and memory growth, as a fraction')
+
+    def handle(self, *args, **options):
+        volumes = {key: options[key] for key in ('students', 'attendance_records', 'grades', 'feedback_responses')}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            generator = LoadGenerator(preset=options['preset'], seed=options['seed'], prefix='bench', **volumes)
+            generator.generate()
+            dataset = {'preset': options['preset'], 'seed': options['seed'], **generator.volumes}
+            self.stdout.write(f"Dataset: {', '.join(f'{k}={v:,}' for k, v in generator.volumes.items())}")
+
+            results = benchmarks.run_scenarios(
+                benchmarks.fixture_context('bench'),
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['only'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        if options['update_baseline']:
+            benchmarks.save_baseline(results, dataset, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {options['baseline']}, so nothing was compared. Record one with "
+                f"--update-baseline on the machine that runs the comparison and commit it."))
+            return
+        if baseline['dataset'] != dataset:
+            self.stdout.write(self.style.WARNING(f"Baseline was recorded on a different dataset: {baseline['dataset']}"))
+        regressions = benchmarks.compare(results, baseline, options['tolerance'], options['tolerance'])
+        errors = [f'{name}: {result["error"]}' for name, result in results.items() if 'error' in result]
+        if regressions or errors:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions + errors))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<28} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'peak KB':>9}")
+        for name, result in results.items():
+            if 'p95_ms' in result:
+                self.stdout.write(f"{name:<28} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+                                  f"{result['queries']:>8} {result['peak_kb']:>9}")
+            else:
+                self.stdout.write(f"{name:<28} {result.get('skipped') or result.get('error')}")
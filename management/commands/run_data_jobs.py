@@ -0,0 +1,53 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from teacher import jobs
+
+
+def _worker(poll_interval, once):
+    # Each process opens its own database connection on first use
+    connections.close_all()
+    jobs.work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Run background export/import jobs outside the web request cycle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} abandoned jobs'))
+
+        workers = max(1, options['workers'])
+        if workers == 1:
+            jobs.work(poll_interval=options['poll'], once=options['once'])
+            return
+
+        connections.close_all()
+        processes = [
+            # Not daemonic, so import jobs can start their own password hashing pool
+            multiprocessing.Process(target=_worker, args=(options['poll'], options['once']))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {workers} data job workers'))
+
+        def shutdown(signum, frame):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            shutdown(None, None)
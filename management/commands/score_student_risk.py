@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher import risk
+
+
+class Command(BaseCommand):
+    help = 'Nightly at-risk pipeline: retrain the risk model and rescore every active student'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-retrain', action='store_true', help='Score with the last trained model')
+
+    def handle(self, *args, **options):
+        try:
+            run = risk.run_pipeline(retrain=not options['no_retrain'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {run.students_scored} students ({run.summary["high"]} high risk); '
+            f'training {run.train_ms:.0f} ms on {run.training_rows} students, scoring {run.score_ms:.0f} ms'))
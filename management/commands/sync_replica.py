@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from teacher.routers import replica_alias
+
+
+def copy_database(source_alias, replica):
+    """Copy the primary SQLite database into the replica file with SQLite's online backup"""
+    source = connections[source_alias]
+    source.ensure_connection()
+    target = sqlite3.connect(connections.settings[replica]['NAME'], timeout=30)
+    try:
+        # Done in one step so readers of the replica never see a half-copied file
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = 'Refresh a SQLite read replica from the primary (a local stand-in for replication)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=DEFAULT_DB_ALIAS, help='Primary database alias')
+        parser.add_argument('--replica', help='Replica database alias (default: REPLICA_DATABASE)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep syncing every N seconds instead of copying once')
+
+    def handle(self, *args, **options):
+        replica = options['replica'] or replica_alias()
+        if not replica or replica not in connections.settings:
+            raise CommandError('No replica database configured; set REPLICA_DATABASE or pass --replica')
+        for alias in (options['source'], replica):
+            if connections.settings[alias]['ENGINE'].rsplit('.', 1)[-1] != 'sqlite3':
+                raise CommandError(f'{alias} is not a SQLite database; use the database\'s own replication')
+
+        while True:
+            start = time.perf_counter()
+            copy_database(options['source'], replica)
+            connections[options['source']].close()
+            self.stdout.write(f'Synced {replica} from {options["source"]} in {time.perf_counter() - start:.2f}s')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
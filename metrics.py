@@ -0,0 +1,243 @@
+"""
+Prometheus-style metrics
+
+Counters and histograms live in a per-process registry; recording one is a
+dict update under an uncontended lock. With the METRICS_DIR setting each
+process also writes its values to METRICS_DIR/metrics_<pid>.json (at most
+once per FLUSH_INTERVAL_SECONDS, atomically), and the metrics/ endpoint sums
+every process's file, so gunicorn/uwsgi workers and run_data_jobs workers
+all show up in one scrape. Without METRICS_DIR only the serving process's
+own values are exposed. No collector or client library is needed; the
+endpoint serves the plain text exposition format.
+
+Files of processes that have exited are kept, so totals never go backwards.
+Clear METRICS_DIR when the deployment restarts.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+FLUSH_INTERVAL_SECONDS = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+        self.dirty = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def inc(self, name, labels, amount):
+        with self.lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self.dirty = True
+        self.maybe_flush()
+
+    def observe(self, histogram, labels, value):
+        with self.lock:
+            key = (histogram.name, labels)
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [[0] * len(histogram.buckets), 0.0, 0]
+            for index, bound in enumerate(histogram.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+            self.dirty = True
+        self.maybe_flush()
+
+    def dump(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state[0]), state[1], state[2]]
+                               for (name, labels), state in self.histograms.items()],
+            }
+
+    def maybe_flush(self):
+        directory = metrics_dir()
+        if directory and time.monotonic() - self.last_flush >= FLUSH_INTERVAL_SECONDS:
+            self.flush(directory)
+
+    def flush(self, directory=None):
+        directory = directory or metrics_dir()
+        if not directory or not self.dirty:
+            return
+        self.last_flush = time.monotonic()
+        self.dirty = False
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        partial = f'{path}.{threading.get_ident()}.tmp'
+        with open(partial, 'w') as output:
+            json.dump(self.dump(), output)
+        os.replace(partial, path)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.dirty = False
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _labels(labelnames, labels):
+    return tuple((name, str(labels.get(name, ''))) for name in labelnames)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        registry.inc(self.name, _labels(self.labelnames, labels), amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        registry.observe(self, _labels(self.labelnames, labels), value)
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by URL name', ['view', 'method', 'status'])
+ATTENDANCE_MARKS = Counter('attendance_marks_total', 'Attendance records marked, by status', ['status'])
+DATA_JOB_DURATION = Histogram(
+    'data_job_duration_seconds', 'Background export/import job durations', ['kind', 'job_type', 'outcome'],
+    buckets=JOB_BUCKETS)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Application cache lookups by cache and result', ['cache', 'result'])
+DB_CONNECTION_WAIT = Histogram(
+    'db_connection_wait_seconds', 'Time spent opening a database connection for a request', ['database'])
+SQLITE_LOCK_RETRIES = Counter('sqlite_lock_retries_total', 'SQLite statements retried after "database is locked"')
+AUTOMATION_RULE_DURATION = Histogram(
+    'automation_rule_duration_seconds', 'Automation rule evaluation time', ['rule', 'rule_type', 'outcome'])
+AUTOMATION_ALERTS = Counter('automation_alerts_total', 'Alerts raised by automation rules', ['rule_type'])
+LOGIN_THROTTLED = Counter('login_throttled_total', 'Login attempts rejected before authentication, by limit', ['scope'])
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def collect():
+    """Values summed over every process's file (or just this process without METRICS_DIR)"""
+    directory = metrics_dir()
+    if not directory:
+        dumps = [registry.dump()]
+    else:
+        registry.flush(directory)
+        dumps = []
+        for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if filename.startswith('metrics_') and filename.endswith('.json'):
+                try:
+                    with open(os.path.join(directory, filename)) as data:
+                        dumps.append(json.load(data))
+                except (OSError, ValueError):
+                    # A file being replaced mid-read is picked up on the next scrape
+                    continue
+
+    counters = {}
+    histograms = {}
+    for dump in dumps:
+        for name, labels, value in dump['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in dump['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            state = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            state[0] = [a + b for a, b in zip(state[0], buckets)]
+            state[1] += total
+            state[2] += count
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """Text exposition format (version 0.0.4)"""
+    counters, histograms = collect()
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        if metric.kind == 'counter':
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+            continue
+        for (series, labels), (buckets, total, count) in sorted(histograms.items()):
+            if series != name:
+                continue
+            cumulative = 0
+            for bound, value in zip(metric.buckets, buckets):
+                cumulative += value
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", _number(float(bound)))])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
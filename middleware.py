@@ -0,0 +1,139 @@
+import math
+import random
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+
+from . import metrics, profiler, routers, sql_monitor, throttling
+
+
+class SQLInstrumentationMiddleware:
+    """Count queries and database time for a sample of requests; see sql_monitor"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = sql_monitor.config()
+        if not options['ENABLED'] or random.random() >= options['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        queries = sql_monitor.RequestQueries(options['SLOW_MS'], options['STACK_DEPTH'])
+        start = time.perf_counter()
+        with queries.instrument():
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response['Server-Timing'] = sql_monitor.server_timing(queries, total_ms)
+        summary = sql_monitor.summarize(request, response, queries, total_ms, options['REPEAT_THRESHOLD'])
+        sql_monitor.log_findings(summary)
+        sql_monitor.report.add(summary, queries, options)
+        return response
+
+
+class MetricsMiddleware:
+    """Request latency by URL name and database connection wait; see metrics"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.connection is None:
+            # Connect up front so the time spent waiting for the database
+            # (pool, server or file lock) is measured on its own
+            connection.ensure_connection()
+            metrics.DB_CONNECTION_WAIT.observe(time.perf_counter() - start, database=DEFAULT_DB_ALIAS)
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            # The URL name rather than the path keeps the label set bounded
+            view=match.view_name if match else 'unresolved',
+            method=request.method,
+            status=f'{response.status_code // 100}xx',
+        )
+        return response
+
+
+class ProfilerMiddleware:
+    """Sample the stacks of requests claimed by an armed ProfilingSession; see profiler
+
+    Place it after AuthenticationMiddleware so sessions can be limited to a user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = profiler.claim(request)
+        if session is None:
+            return self.get_response(request)
+
+        sampler = profiler.Sampler(threading.get_ident(), session.interval_ms / 1000)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        profiler.save_capture(session, request, response, sampler, (time.perf_counter() - start) * 1000)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Serve reads of REPLICA_VIEWS from the replica and keep writers on the primary; see routers"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if routers.replica_alias() is None:
+            return self.get_response(request)
+        with routers.request_routing() as routing:
+            response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if routing.wrote and user is not None and user.is_authenticated:
+            routers.stick(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = routers.current()
+        if routing is None or request.method not in ('GET', 'HEAD') or not routers.replica_view(request):
+            return None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and routers.is_sticky(user.pk):
+            return None
+        routing.enabled = True
+        return None
+
+
+class LoginThrottleMiddleware:
+    """Reject login attempts over the failure limits before any password is hashed; see throttling"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        throttling.finish(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        options = throttling.config()
+        if not options['ENABLED'] or request.method != 'POST':
+            return None
+        if request.resolver_match.view_name not in options['VIEWS']:
+            return None
+        rejected = throttling.check(request)
+        if rejected is None:
+            return None
+        _, retry_after = rejected
+        response = HttpResponse(
+            f'Too many failed login attempts. Try again in {math.ceil(retry_after / 60)} minutes.',
+            status=429, content_type='text/plain')
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subject', '0002_subject_subject_id'),
+        ('classroom', '0002_classroom_classroom_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('teacher', '0002_alter_teacherprofile_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weighted_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('grade_count', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveIntegerField()),
+                ('percentile', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to='classroom.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to='subject.subject')),
+            ],
+            options={
+                'verbose_name_plural': 'Gradebook entries',
+                'ordering': ['classroom', 'subject', 'rank'],
+                'indexes': [models.Index(fields=['classroom', 'subject', 'rank'], name='teacher_gra_classro_4c403a_idx')],
+                'unique_together': {('classroom', 'subject', 'student')},
+            },
+        ),
+    ]
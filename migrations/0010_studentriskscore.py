@@ -0,0 +1,53 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('teacher', '0009_automationrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskModelRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trained_at', models.DateTimeField()),
+                ('scored_at', models.DateTimeField()),
+                ('feature_names', models.JSONField(default=list)),
+                ('coefficients', models.JSONField(default=list)),
+                ('means', models.JSONField(default=list)),
+                ('scales', models.JSONField(default=list)),
+                ('training_rows', models.PositiveIntegerField(default=0)),
+                ('positive_rate', models.FloatField(default=0)),
+                ('students_scored', models.PositiveIntegerField(default=0)),
+                ('train_ms', models.FloatField(default=0)),
+                ('score_ms', models.FloatField(default=0)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'ordering': ['-scored_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('level', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=10)),
+                ('top_factor', models.CharField(blank=True, max_length=30)),
+                ('features', models.JSONField(default=dict)),
+                ('scored_at', models.DateTimeField()),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['level', '-score'], name='teacher_stu_level_289878_idx')],
+            },
+        ),
+    ]
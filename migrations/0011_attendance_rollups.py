@@ -0,0 +1,69 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subject', '0002_subject_subject_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('classroom', '0002_classroom_classroom_id'),
+        ('teacher', '0010_studentriskscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('date', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('late', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('excused', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['period', 'date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClassroomAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('date', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('late', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('excused', models.IntegerField(default=0)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='classroom.classroom')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='subject.subject')),
+            ],
+            options={
+                'ordering': ['period', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentattendancerollup',
+            constraint=models.UniqueConstraint(fields=('period', 'student', 'date'), name='unique_student_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='classroomattendancerollup',
+            index=models.Index(fields=['period', 'date'], name='teacher_cla_period_669e53_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='classroomattendancerollup',
+            constraint=models.UniqueConstraint(fields=('period', 'classroom', 'subject', 'date'), name='unique_classroom_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='classroomattendancerollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('period', 'classroom', 'date'), name='unique_classroom_rollup_no_subject'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('teacher', '0012_systemsetting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiTokenVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('revoked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-19 18:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0002_classroom_classroom_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('teacher', '0013_apitokenversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolAnnouncement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='classroom.classroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='announcementcursor',
+            constraint=models.UniqueConstraint(fields=('user', 'classroom'), name='unique_announcement_cursor'),
+        ),
+        migrations.AddConstraint(
+            model_name='announcementcursor',
+            constraint=models.UniqueConstraint(condition=models.Q(('classroom__isnull', True)), fields=('user',), name='unique_school_announcement_cursor'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-19 18:31
+
+import django.core.validators
+from django.db import migrations, models
+import teacher.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0014_announcements'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profilingsession',
+            name='interval_ms',
+            field=models.PositiveIntegerField(default=5, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AlterField(
+            model_name='profilingsession',
+            name='url_pattern',
+            field=models.CharField(blank=True, help_text='Regular expression matched against the request path', max_length=200, validators=[teacher.models.validate_regex]),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from classroom.models import Classroom
 from subject.models import Subject
 
@@ -26,3 +31,380 @@ class Quiz(models.Model):
 
     def __str__(self):
         return self.title
+
+class GradebookEntry(models.Model):
+    """Maintained per (classroom, subject, student) standing, refreshed when grades change"""
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='gradebook_entries')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='gradebook_entries')
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gradebook_entries')
+    weighted_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    grade_count = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField()
+    percentile = models.DecimalField(max_digits=5, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('classroom', 'subject', 'student')
+        indexes = [models.Index(fields=['classroom', 'subject', 'rank'])]
+        ordering = ['classroom', 'subject', 'rank']
+        verbose_name_plural = 'Gradebook entries'
+
+    def __str__(self):
+        return f"{self.student} - {self.subject.name} (#{self.rank})"
+
+class DataJob(models.Model):
+    """Background export/import job run by the run_data_jobs worker"""
+    KIND_CHOICES = [
+        ('export', 'Export'),
+        ('import', 'Import'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    job_type = models.CharField(max_length=30)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_total = models.PositiveIntegerField(default=0)
+    artifact = models.CharField(max_length=255, blank=True)
+    artifact_size = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='data_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.job_type} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == 'completed':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, int(self.rows_done * 100 / self.rows_total))
+
+
+class AccountInvite(models.Model):
+    """One-time token that lets a provisioned account set its first password"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='account_invites')
+    # SHA-256 of the token; the token itself is only ever handed out once
+    token_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Invite for {self.user}"
+
+    @property
+    def is_usable(self):
+        return self.used_at is None and self.expires_at > timezone.now()
+
+
+def validate_regex(value):
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise ValidationError(f'Invalid regular expression: {e}')
+
+
+class ProfilingSession(models.Model):
+    """Armed window for the sampling profiler: the next N matching requests are profiled"""
+    url_pattern = models.CharField(max_length=200, blank=True, validators=[validate_regex],
+                                   help_text='Regular expression matched against the request path')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='profiled_sessions', help_text='Only profile requests from this user')
+    requests_remaining = models.PositiveIntegerField()
+    interval_ms = models.PositiveIntegerField(default=5, validators=[MinValueValidator(1)])
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profiling_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Profiling {self.url_pattern or 'all requests'} ({self.requests_remaining} left)"
+
+    @property
+    def is_armed(self):
+        return self.requests_remaining > 0 and self.expires_at > timezone.now()
+
+
+class ProfilingCapture(models.Model):
+    """Collapsed stack samples from one profiled request"""
+    session = models.ForeignKey(ProfilingSession, on_delete=models.CASCADE, related_name='captures')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=100, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    # {"root;...;leaf": sample count}
+    stacks = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.samples} samples)"
+
+
+class AutomationRule(models.Model):
+    """Scheduled rule evaluated for the whole school at once by the run_automation command"""
+    RULE_TYPE_CHOICES = [
+        ('low_attendance', 'Low Attendance Alert'),
+        ('missing_attendance', 'Attendance Reminder'),
+        ('low_grades', 'Performance Monitoring'),
+    ]
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('inactive', 'Inactive'),
+    ]
+
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    rule_type = models.CharField(max_length=30, choices=RULE_TYPE_CHOICES)
+    # Rule-specific settings, e.g. {"days": 14, "threshold": 75}; see automation.RULE_TYPES
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    interval_minutes = models.PositiveIntegerField(default=60)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='automation_rules')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [models.Index(fields=['status', 'next_run_at'])]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def trigger(self):
+        if self.interval_minutes % 1440 == 0:
+            return f"Every {self.interval_minutes // 1440} day(s)"
+        if self.interval_minutes % 60 == 0:
+            return f"Every {self.interval_minutes // 60} hour(s)"
+        return f"Every {self.interval_minutes} minutes"
+
+
+class AutomationAlert(models.Model):
+    """A user matched by a rule; stays open (and is not repeated) until the user stops matching"""
+    rule = models.ForeignKey(AutomationRule, on_delete=models.CASCADE, related_name='alerts')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='automation_alerts')
+    value = models.FloatField(null=True, blank=True)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'user'], condition=models.Q(resolved_at__isnull=True),
+                                    name='unique_open_automation_alert'),
+        ]
+
+    def __str__(self):
+        return self.message
+
+
+class AutomationRun(models.Model):
+    """One evaluation of a rule, shown as the rule's activity log"""
+    rule = models.ForeignKey(AutomationRule, on_delete=models.CASCADE, related_name='runs')
+    started_at = models.DateTimeField()
+    duration_ms = models.FloatField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    alerts_created = models.PositiveIntegerField(default=0)
+    alerts_resolved = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.rule} at {self.started_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def succeeded(self):
+        return not self.error
+
+
+class RiskModelRun(models.Model):
+    """One nightly run of the at-risk pipeline: the model it scored with and how long each step took"""
+    trained_at = models.DateTimeField()
+    scored_at = models.DateTimeField()
+    feature_names = models.JSONField(default=list)
+    # Logistic regression over standardized features; the intercept comes first
+    coefficients = models.JSONField(default=list)
+    means = models.JSONField(default=list)
+    scales = models.JSONField(default=list)
+    training_rows = models.PositiveIntegerField(default=0)
+    positive_rate = models.FloatField(default=0)
+    students_scored = models.PositiveIntegerField(default=0)
+    train_ms = models.FloatField(default=0)
+    score_ms = models.FloatField(default=0)
+    # Counts per risk level and the mean recent attendance, for the analytics page
+    summary = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-scored_at']
+
+    def __str__(self):
+        return f"Risk scores at {self.scored_at:%Y-%m-%d %H:%M} ({self.students_scored} students)"
+
+
+class StudentRiskScore(models.Model):
+    """Latest predicted probability that a student falls behind, rewritten by each pipeline run"""
+    LEVEL_CHOICES = [
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High'),
+    ]
+
+    student = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='risk_score')
+    score = models.FloatField()
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    top_factor = models.CharField(max_length=30, blank=True)
+    features = models.JSONField(default=dict)
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['level', '-score'])]
+
+    def __str__(self):
+        return f"{self.student} - {self.level} ({self.score:.2f})"
+
+
+class AttendanceCounts(models.Model):
+    """Attendance record counts for one rollup bucket"""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # The day itself, or the first day of the month
+    date = models.DateField()
+    # Signed so a correction arriving before the backfill cannot violate a constraint
+    total = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    late = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    excused = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def attendance_rate(self):
+        return round(self.present / self.total * 100, 1) if self.total > 0 else 0
+
+
+class ClassroomAttendanceRollup(AttendanceCounts):
+    """Daily and monthly attendance counts per classroom and subject, maintained by teacher.rollups"""
+    classroom = models.ForeignKey('classroom.Classroom', on_delete=models.CASCADE, related_name='+')
+    subject = models.ForeignKey('subject.Subject', null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        ordering = ['period', 'date']
+        indexes = [models.Index(fields=['period', 'date'])]
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'classroom', 'subject', 'date'],
+                                    name='unique_classroom_rollup'),
+            # NULLs are distinct in a unique index, so sessions without a subject need their own
+            models.UniqueConstraint(fields=['period', 'classroom', 'date'], condition=models.Q(subject__isnull=True),
+                                    name='unique_classroom_rollup_no_subject'),
+        ]
+
+    def __str__(self):
+        return f"{self.classroom_id}/{self.subject_id} {self.period} {self.date}"
+
+
+class StudentAttendanceRollup(AttendanceCounts):
+    """Daily and monthly attendance counts per student, maintained by teacher.rollups"""
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        ordering = ['period', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'student', 'date'], name='unique_student_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} {self.period} {self.date}"
+
+
+class SystemSetting(models.Model):
+    """Administrator override of one setting declared in teacher.system_settings"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.JSONField()
+    updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['key']
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class ApiTokenVersion(models.Model):
+    """Revocation counter for a user's API tokens; tokens issued under an older version are rejected"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, primary_key=True, on_delete=models.CASCADE,
+                                related_name='+')
+    version = models.PositiveIntegerField(default=0)
+    revoked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class SchoolAnnouncement(models.Model):
+    """Announcement to everyone in the school; one row however large the audience (see teacher.announcements)"""
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                               related_name='+')
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return self.message[:50]
+
+
+class AnnouncementCursor(models.Model):
+    """The newest announcement a user has read in one stream: a classroom's, or the school's when classroom is null"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    classroom = models.ForeignKey(Classroom, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    last_read_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'classroom'], name='unique_announcement_cursor'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(classroom__isnull=True),
+                                    name='unique_school_announcement_cursor'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.classroom_id or 'school'} @{self.last_read_id}"
@@ -0,0 +1,93 @@
+"""
+Parent-scoped data access
+
+A parent may only see their own children. The user ids of a parent's
+children are loaded once with one query and kept in the cache under a
+'parent_students:{parent_user_id}' version stamp, which the signals bump when
+the parent's links change (either side of ParentProfile.students, or a
+deleted profile). Within a request the set is memoized on the request, so:
+
+- parent_access_required and can_access() are a set membership test
+- restrict() filters a queryset with `student__in=<ids>`, a plain IN list
+  instead of a join through users_parentprofile_students per query
+
+Other roles are not restricted here; their views keep their own checks.
+"""
+
+from functools import wraps
+
+from django.core.exceptions import PermissionDenied
+
+from users.models import ParentProfile, StudentProfile
+
+from . import caching
+
+STUDENT_KWARGS = ('student_id', 'child_id')
+
+
+def group(parent_user_id):
+    return f'parent_students:{parent_user_id}'
+
+
+def bump_parents(parent_user_ids):
+    caching.bump(*(group(user_id) for user_id in parent_user_ids))
+
+
+def parent_user_ids(profile_ids):
+    return list(ParentProfile.objects.filter(pk__in=profile_ids).values_list('user_id', flat=True))
+
+
+def is_parent(user):
+    return user.is_authenticated and getattr(user, 'role', None) == 'parent'
+
+
+def children_ids(user):
+    """frozenset of the user ids of a parent's children"""
+    return caching.cached(
+        'parent_student_ids', [group(user.pk)],
+        lambda: frozenset(StudentProfile.objects.filter(parents__user=user).values_list('user_id', flat=True)),
+    )
+
+
+def student_ids(request):
+    """The children of the request's parent, fetched at most once per request"""
+    ids = getattr(request, '_parent_student_ids', None)
+    if ids is None:
+        ids = request._parent_student_ids = children_ids(request.user)
+    return ids
+
+
+def can_access(request, student_id):
+    """Whether the request's user may see this student's data (always True for non-parents)"""
+    if not is_parent(request.user):
+        return True
+    try:
+        return int(student_id) in student_ids(request)
+    except (TypeError, ValueError):
+        return False
+
+
+def restrict(queryset, request, field='student'):
+    """Limit a queryset to the parent's children through `field` (a student user foreign key)"""
+    if not is_parent(request.user):
+        return queryset
+    return queryset.filter(**{f'{field}__in': student_ids(request)})
+
+
+def parent_access_required(view):
+    """Reject parents requesting a student_id/child_id that is not one of their children"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        for name in STUDENT_KWARGS:
+            if name in kwargs and not can_access(request, kwargs[name]):
+                raise PermissionDenied("You can only view your own children's records.")
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ParentDataFilterMixin:
+    """Restrict get_queryset() of a class-based view to the parent's children"""
+    student_field = 'student'
+
+    def get_queryset(self):
+        return restrict(super().get_queryset(), self.request, self.student_field)
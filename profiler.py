@@ -0,0 +1,211 @@
+"""
+On-demand sampling profiler
+
+An administrator arms a ProfilingSession for the next N requests whose path
+matches a regular expression (and optionally for one user only). For each
+claimed request ProfilerMiddleware starts a sampler thread that reads the
+request thread's stack from sys._current_frames() every interval_ms and
+counts identical stacks. The counts are stored as a ProfilingCapture and can
+be downloaded as flame-graph collapsed stacks (flamegraph.pl, speedscope)
+or as a top-functions table.
+
+Nothing is sampled unless a session is armed. Armed sessions are looked up
+at most once per ARMED_CHECK_SECONDS per process, so the cost for ordinary
+requests is a time check.
+"""
+
+import csv
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProfilingCapture, ProfilingSession
+
+ARMED_CHECK_SECONDS = 2.0
+MAX_REQUESTS = 1000
+MAX_DEPTH = 128
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_MINUTES = 30
+
+_armed = {'checked': None, 'sessions': []}
+_armed_lock = threading.Lock()
+
+
+def forget_armed():
+    """Re-read armed sessions on the next request in this process"""
+    with _armed_lock:
+        _armed['checked'] = None
+
+
+def armed_sessions():
+    now = time.monotonic()
+    with _armed_lock:
+        if _armed['checked'] is not None and now - _armed['checked'] < ARMED_CHECK_SECONDS:
+            return _armed['sessions']
+        _armed['checked'] = now
+    sessions = list(ProfilingSession.objects.filter(requests_remaining__gt=0, expires_at__gt=timezone.now()))
+    with _armed_lock:
+        _armed['sessions'] = sessions
+    return sessions
+
+
+def arm(created_by, url_pattern='', user=None, requests=10, interval_ms=DEFAULT_INTERVAL_MS,
+        minutes=DEFAULT_MINUTES):
+    """Arm a profiling session; raises ValueError for bad parameters"""
+    if not 1 <= requests <= MAX_REQUESTS:
+        raise ValueError(f'Requests must be between 1 and {MAX_REQUESTS}.')
+    if minutes < 1:
+        raise ValueError('The session must stay armed for at least a minute.')
+    session = ProfilingSession(
+        url_pattern=url_pattern, user=user, requests_remaining=requests, interval_ms=interval_ms,
+        created_by=created_by, expires_at=timezone.now() + timedelta(minutes=minutes),
+    )
+    try:
+        # The pattern and interval are validated by the model, so the admin enforces them too
+        session.clean_fields(exclude=['user', 'created_by'])
+    except ValidationError as e:
+        raise ValueError(' '.join(e.messages))
+    session.save()
+    forget_armed()
+    return session
+
+
+def disarm(session):
+    ProfilingSession.objects.filter(pk=session.pk).update(requests_remaining=0)
+    forget_armed()
+
+
+def matches(session, request):
+    user = getattr(request, 'user', None)
+    if session.user_id is not None and (user is None or session.user_id != user.pk):
+        return False
+    if not session.url_pattern:
+        return True
+    try:
+        return re.search(session.url_pattern, request.path) is not None
+    except re.error:
+        # Saved around validation (e.g. a raw update); never let it fail the request
+        return False
+
+
+def claim(request):
+    """The armed session this request should be profiled for, taking one of its requests"""
+    for session in armed_sessions():
+        if not matches(session, request):
+            continue
+        # Conditional decrement, so concurrent workers never exceed N requests
+        if ProfilingSession.objects.filter(pk=session.pk, requests_remaining__gt=0).update(
+                requests_remaining=F('requests_remaining') - 1):
+            return session
+        forget_armed()
+    return None
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code):
+    filename = code.co_filename
+    if 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[-1]
+    elif os.path.isabs(filename):
+        filename = os.path.relpath(filename)
+    # Semicolons separate frames in the collapsed format
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def collapse(frame):
+    """Root-first 'a;b;c' stack for a frame"""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's stack every `interval` seconds until stopped"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='teacher-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[collapse(frame)] += 1
+            self.samples += 1
+            del frame
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def save_capture(session, request, response, sampler, duration_ms):
+    match = getattr(request, 'resolver_match', None)
+    return ProfilingCapture.objects.create(
+        session=session, method=request.method, path=request.path[:255],
+        view_name=match.view_name[:100] if match else '', status_code=response.status_code,
+        duration_ms=round(duration_ms, 2), samples=sampler.samples, stacks=dict(sampler.stacks),
+    )
+
+
+def merged_stacks(captures):
+    stacks = Counter()
+    for capture in captures:
+        stacks.update(capture.stacks)
+    return stacks
+
+
+def collapsed_text(stacks):
+    """Collapsed stack format: one 'frame;frame;frame count' line per stack"""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+def top_functions(stacks, limit=50):
+    """[{function, self, total, self_pct, total_pct}] by self samples, then total"""
+    own = Counter()
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        # Recursive functions count once per sample
+        for label in set(frames):
+            inclusive[label] += count
+    samples = sum(stacks.values()) or 1
+    rows = sorted(inclusive, key=lambda label: (-own[label], -inclusive[label], label))[:limit]
+    return [
+        {
+            'function': label,
+            'self': own[label],
+            'total': inclusive[label],
+            'self_pct': round(own[label] * 100 / samples, 1),
+            'total_pct': round(inclusive[label] * 100 / samples, 1),
+        }
+        for label in rows
+    ]
+
+
+def top_functions_csv(stacks, limit=200):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['function', 'self', 'total', 'self_pct', 'total_pct'])
+    for row in top_functions(stacks, limit):
+        writer.writerow([row['function'], row['self'], row['total'], row['self_pct'], row['total_pct']])
+    return buffer.getvalue()
@@ -0,0 +1,232 @@
+"""
+Bulk account provisioning
+
+Password hashing dominates the cost of creating accounts: every PBKDF2 hash
+takes a few hundred milliseconds by design. hash_passwords spreads the work
+over a process pool, so throughput grows with the number of cores, and
+provision_accounts inserts users and their role profiles with bulk_create.
+Accounts created without a password get an unusable one and, optionally, a
+one-time invite token for setting it.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import ParentProfile, StudentProfile, TeacherProfile
+
+from . import caching, parent_access
+from .models import AccountInvite
+
+User = get_user_model()
+
+# Below this many passwords the pool costs more to start than it saves
+PARALLEL_THRESHOLD = 16
+INVITE_TTL = timedelta(days=7)
+BATCH_SIZE = 1000
+
+PROFILE_MODELS = {
+    'student': StudentProfile,
+    'teacher': TeacherProfile,
+    'parent': ParentProfile,
+}
+
+# Unique profile ids the profiles' save() would generate; bulk_create skips
+# save(), so provision_accounts fills in any that are not given
+PROFILE_ID_PREFIXES = {
+    'student': {'student_id': 'STU'},
+    'teacher': {'teacher_id': 'TCH', 'employee_id': 'EMP'},
+}
+
+
+def unusable_password():
+    # Same format as make_password(None), but token_hex is far cheaper than
+    # drawing 40 characters one at a time
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(20)
+
+
+class HashingPool:
+    """
+    A process pool shared by several hash_passwords calls (e.g. every chunk
+    of an import), so processes are started once rather than per call. The
+    pool only starts when a call actually needs it.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def map(self, function, items, chunksize=1):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self._executor.map(function, items, chunksize=chunksize))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def hash_passwords(passwords, workers=None, pool=None):
+    """
+    Hash a list of raw passwords, in order. Blank passwords become unusable
+    ones. With more than PARALLEL_THRESHOLD passwords the hashing runs in
+    `pool`, or in a pool of `workers` processes (default: one per core)
+    started for this call.
+    """
+    hashes = [None if password else unusable_password() for password in passwords]
+    pending = [(index, password) for index, password in enumerate(passwords) if password]
+    workers = pool.workers if pool else workers or os.cpu_count() or 1
+
+    # Daemonic processes (e.g. multiprocessing.Pool workers) cannot start a pool
+    if workers == 1 or len(pending) <= PARALLEL_THRESHOLD or multiprocessing.current_process().daemon:
+        results = [make_password(password) for _, password in pending]
+    else:
+        # make_password only needs settings, so workers never import models
+        chunksize = max(1, len(pending) // (workers * 4))
+        raw = [password for _, password in pending]
+        if pool is not None:
+            results = pool.map(make_password, raw, chunksize=chunksize)
+        else:
+            with HashingPool(workers) as own_pool:
+                results = own_pool.map(make_password, raw, chunksize=chunksize)
+
+    for (index, _), encoded in zip(pending, results):
+        hashes[index] = encoded
+    return hashes
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_invites(user_ids, ttl=INVITE_TTL):
+    """Create one invite per user; returns {user_id: token}"""
+    expires_at = timezone.now() + ttl
+    tokens = {user_id: secrets.token_urlsafe(32) for user_id in user_ids}
+    AccountInvite.objects.bulk_create(
+        [AccountInvite(user_id=user_id, token_hash=hash_token(token), expires_at=expires_at)
+         for user_id, token in tokens.items()],
+        batch_size=BATCH_SIZE,
+    )
+    return tokens
+
+
+def redeem_invite(token, password):
+    """Set the password for an invite's account; raises ValueError if the invite cannot be used"""
+    with transaction.atomic():
+        invite = AccountInvite.objects.select_for_update().select_related('user').filter(
+            token_hash=hash_token(token),
+        ).first()
+        if invite is None or not invite.is_usable:
+            raise ValueError('Invalid or expired invite')
+        invite.used_at = timezone.now()
+        invite.save(update_fields=['used_at'])
+        invite.user.set_password(password)
+        invite.user.save(update_fields=['password'])
+    return invite.user
+
+
+def profile_fields(role, user_id, fields):
+    """Profile fields with generated ids (derived from the user id, so unique) for those left blank"""
+    generated = {
+        field: f'{prefix}{user_id:06d}'
+        for field, prefix in PROFILE_ID_PREFIXES.get(role, {}).items()
+        if not fields.get(field)
+    }
+    return {**fields, **generated}
+
+
+def provision_accounts(accounts, role, invite=False, workers=None):
+    """
+    Create accounts and their role profiles in bulk.
+
+    accounts is a list of dicts of CustomUser fields (username required,
+    password optional) with an optional 'profile' dict of profile fields
+    (ids such as student_id are generated when not given) and,
+    for parents, 'students' listing StudentProfile ids to link. Usernames
+    that already exist are skipped, as get_or_create would.
+
+    Returns (users, invites) where invites maps username to a one-time
+    token for accounts created without a password when invite=True.
+    """
+    if role not in PROFILE_MODELS:
+        raise ValueError(f'Unknown role: {role}')
+    accounts = list(accounts)
+    existing = set(User.objects.filter(
+        username__in=[account['username'] for account in accounts],
+    ).values_list('username', flat=True))
+    new_accounts = []
+    for account in accounts:
+        if account['username'] not in existing:
+            existing.add(account['username'])
+            new_accounts.append(account)
+    if not new_accounts:
+        return [], {}
+
+    # Hash outside the transaction so no locks are held while the pool works
+    hashes = hash_passwords([account.get('password') for account in new_accounts], workers=workers)
+    user_fields = {
+        account['username']: {k: v for k, v in account.items() if k not in ('password', 'profile', 'students')}
+        for account in new_accounts
+    }
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(role=role, password=encoded, **user_fields[account['username']])
+             for account, encoded in zip(new_accounts, hashes)],
+            batch_size=BATCH_SIZE,
+        )
+        users = list(User.objects.filter(username__in=list(user_fields)).order_by('pk'))
+        user_ids = {user.username: user.pk for user in users}
+
+        Profile = PROFILE_MODELS[role]
+        Profile.objects.bulk_create(
+            [Profile(user_id=user_ids[account['username']],
+                     **profile_fields(role, user_ids[account['username']], account.get('profile', {})))
+             for account in new_accounts],
+            batch_size=BATCH_SIZE,
+        )
+        if role == 'parent':
+            _link_students(new_accounts, user_ids)
+
+        invites = {}
+        if invite:
+            invited = [user_ids[account['username']] for account in new_accounts if not account.get('password')]
+            usernames = {pk: username for username, pk in user_ids.items()}
+            invites = {usernames[pk]: token for pk, token in create_invites(invited).items()}
+    if role in ('student', 'parent'):
+        caching.bump('students', 'family')
+    return users, invites
+
+
+def _link_students(accounts, user_ids):
+    links = [(account['username'], student) for account in accounts for student in account.get('students', ())]
+    if not links:
+        return
+    profile_ids = dict(ParentProfile.objects.filter(
+        user_id__in=[user_ids[username] for username, _ in links],
+    ).values_list('user_id', 'pk'))
+    Through = ParentProfile.students.through
+    Through.objects.bulk_create(
+        [Through(parentprofile_id=profile_ids[user_ids[username]], studentprofile_id=student)
+         for username, student in links],
+        ignore_conflicts=True,
+        batch_size=BATCH_SIZE,
+    )
+    # bulk_create sends no m2m_changed, so retire the parents' cached children here
+    parent_access.bump_parents({user_ids[username] for username, _ in links})
@@ -0,0 +1,297 @@
+"""
+Student term reports
+
+student_report() assembles a child's report for one term (attendance, grades,
+assignments, feedback and a recent-activity timeline) with a fixed set of
+queries however much history the student has: one aggregate per domain,
+monthly attendance from the rollups, and a single UNION for the timeline.
+
+Reports are cached per (student, term, day) under the version groups of
+everything they read, so a conference night of parents opening the same
+reports costs the queries once per student until a mark, grade, submission
+or response changes it.
+
+render_html() streams the report as a self-contained printable HTML page,
+section by section; browsers print or save it as PDF (@media print rules keep
+sections on their own pages), so no PDF library is needed on the server.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db.models import Avg, Count, Exists, F, FloatField, OuterRef, Sum, Value
+from django.db.models.functions import TruncDate
+from django.http import Http404
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.text import slugify
+
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord
+from feedback.models import FeedbackResponse, FeedbackSession
+from grades.models import Grade
+from users.models import CustomUser
+
+from . import caching, rollups
+from .models import StudentAttendanceRollup
+
+Term = namedtuple('Term', 'name start end')
+TIMELINE_DAYS = 14
+TIMELINE_SIZE = 10
+
+
+def term_for(day=None):
+    """The term containing `day`: fall runs September to January, spring February to August"""
+    day = day or timezone.localdate()
+    start, end = rollups.academic_year(day)
+    if day.month >= 9 or day.month == 1:
+        return Term(f'{start.year}-fall', start, date(start.year + 1, 1, 31))
+    return Term(f'{start.year}-spring', date(start.year + 1, 2, 1), end)
+
+
+def term_named(name):
+    """Term from its name, e.g. '2025-fall'; ValueError if it is not one"""
+    year, _, half = name.partition('-')
+    if not year.isdigit() or half not in ('fall', 'spring'):
+        raise ValueError(f'Unknown term: {name}')
+    return term_for(date(int(year), 9, 1) if half == 'fall' else date(int(year) + 1, 2, 1))
+
+
+def report_groups(student_id):
+    return [
+        f'user:{student_id}', f'student:{student_id}', f'attendance:{student_id}', f'grades:{student_id}',
+        f'submissions:{student_id}', f'feedback_by:{student_id}', 'classrooms', 'class_assignments',
+        'feedback_sessions', 'feedback_categories',
+    ]
+
+
+def student_report(student_id, term=None):
+    """The student's report for the term (the current one by default); Http404 for unknown students"""
+    term = term or term_for()
+    today = timezone.localdate()
+    return caching.cached('student_report', report_groups(student_id),
+                          lambda: build_report(student_id, term, today), key=[student_id, term.name, today])
+
+
+def build_report(student_id, term, today):
+    student = (CustomUser.objects.filter(pk=student_id, role='student')
+               .select_related('student_profile__classroom').first())
+    if student is None:
+        raise Http404('No such student')
+    profile = getattr(student, 'student_profile', None)
+    classroom = profile.classroom if profile else None
+    return {
+        'student': {
+            'id': student.pk,
+            'name': student.get_full_name() or student.username,
+            'student_id': profile.student_id if profile else '',
+            'classroom': classroom.name if classroom else '',
+        },
+        'term': term._asdict(),
+        'generated_on': today,
+        'attendance': attendance_section(student.pk, term),
+        'grades': grades_section(student.pk, term),
+        'assignments': assignments_section(student.pk, classroom, term, today),
+        'feedback': feedback_section(student.pk, classroom, term),
+        'timeline': timeline(student.pk, min(today, term.end)),
+    }
+
+
+def _rate(part, total):
+    return round(part / total * 100, 1) if total else None
+
+
+def attendance_section(student_id, term):
+    """Totals and monthly rates from the student's month rollups"""
+    months = list(
+        StudentAttendanceRollup.objects
+        .filter(student_id=student_id, period='month', date__range=(rollups.month_start(term.start), term.end))
+        .order_by('date')
+        .values('date', *rollups.COUNT_FIELDS)
+    )
+    totals = {field: sum(month[field] for month in months) for field in rollups.COUNT_FIELDS}
+    return {
+        **totals,
+        'attendance_rate': _rate(totals['present'], totals['total']),
+        'months': [{'month': month['date'], 'total': month['total'],
+                    'attendance_rate': _rate(month['present'], month['total'])} for month in months],
+    }
+
+
+def grades_section(student_id, term):
+    """Average and count per subject, and the term average over all grades"""
+    subjects = list(
+        Grade.objects
+        .filter(student_id=student_id, date_assigned__range=(term.start, term.end))
+        .values('subject__name')
+        .annotate(count=Count('id'), total=Sum('percentage'), average=Avg('percentage'))
+        .order_by('subject__name')
+    )
+    count = sum(subject['count'] for subject in subjects)
+    total = sum(float(subject['total']) for subject in subjects)
+    return {
+        'count': count,
+        'average': round(total / count, 1) if count else None,
+        'subjects': [{'subject': subject['subject__name'], 'count': subject['count'],
+                      'average': round(float(subject['average']), 1)} for subject in subjects],
+    }
+
+
+def assignments_section(student_id, classroom, term, today):
+    """The classroom's assignments due in the term and whether the student submitted each"""
+    if classroom is None:
+        return {'total': 0, 'submitted': 0, 'overdue': 0, 'completion_rate': None, 'items': []}
+    items = list(
+        Assignment.objects
+        .filter(classroom=classroom, due_date__date__range=(term.start, term.end))
+        .annotate(submitted=Exists(AssignmentSubmission.objects.filter(assignment=OuterRef('pk'),
+                                                                       student_id=student_id)))
+        .order_by('due_date')
+        .values('title', 'subject__name', 'due_date', 'submitted')
+    )
+    submitted = sum(item['submitted'] for item in items)
+    overdue = sum(1 for item in items if not item['submitted'] and timezone.localdate(item['due_date']) < today)
+    return {
+        'total': len(items),
+        'submitted': submitted,
+        'overdue': overdue,
+        'completion_rate': _rate(submitted, len(items)),
+        'items': [{'title': item['title'], 'subject': item['subject__name'], 'due_date': item['due_date'],
+                   'submitted': item['submitted']} for item in items],
+    }
+
+
+def feedback_section(student_id, classroom, term):
+    """Feedback sessions of the student's classroom in the term and which ones they answered"""
+    if classroom is None:
+        return {'sessions': 0, 'responded': 0, 'items': []}
+    items = list(
+        FeedbackSession.objects
+        .filter(classroom=classroom, start_date__date__range=(term.start, term.end))
+        .annotate(responded=Exists(FeedbackResponse.objects.filter(session=OuterRef('pk'),
+                                                                   respondent_id=student_id)))
+        .order_by('start_date')
+        .values('title', 'category__name', 'start_date', 'responded')
+    )
+    return {
+        'sessions': len(items),
+        'responded': sum(item['responded'] for item in items),
+        'items': [{'title': item['title'], 'category': item['category__name'], 'date': item['start_date'],
+                   'responded': item['responded']} for item in items],
+    }
+
+
+def timeline(student_id, until):
+    """The latest marks, grades and submissions up to `until`, newest first, in one UNION query"""
+    since = until - timedelta(days=TIMELINE_DAYS)
+    fields = ('kind', 'label', 'day', 'detail', 'score')
+    no_score = Value(None, output_field=FloatField())
+    marks = (AttendanceRecord.objects
+             .filter(student_id=student_id, session__start_time__date__range=(since, until))
+             .annotate(kind=Value('attendance'), label=F('session__title'), day=TruncDate('session__start_time'),
+                       detail=F('status'), score=no_score)
+             .values_list(*fields))
+    grades = (Grade.objects
+              .filter(student_id=student_id, date_assigned__range=(since, until))
+              .annotate(kind=Value('grade'), label=F('title'), day=F('date_assigned'), detail=F('grade_type'),
+                        score=F('percentage'))
+              .values_list(*fields))
+    submissions = (AssignmentSubmission.objects
+                   .filter(student_id=student_id, submitted_at__date__range=(since, until))
+                   .annotate(kind=Value('submission'), label=F('assignment__title'), day=TruncDate('submitted_at'),
+                             detail=F('status'), score=no_score)
+                   .values_list(*fields))
+    rows = marks.union(grades, submissions, all=True).order_by('-day')[:TIMELINE_SIZE]
+    return [
+        {'kind': kind, 'title': title, 'date': day, 'detail': detail,
+         'score': float(score) if score is not None else None}
+        for kind, title, day, detail, score in rows
+    ]
+
+
+STYLE = """
+body { font-family: sans-serif; margin: 2rem; color: #222; }
+h1 { margin-bottom: 0; } .meta { color: #666; margin-top: .25rem; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1rem; }
+th, td { border-bottom: 1px solid #ddd; padding: .35rem .5rem; text-align: left; }
+.stats span { display: inline-block; margin-right: 2rem; }
+@media print { section { page-break-inside: avoid; } }
+"""
+
+
+def _percent(value):
+    return '–' if value is None else f'{value}%'
+
+
+def _table(headers, rows):
+    yield '<table><tr>' + ''.join(format_html('<th>{}</th>', header) for header in headers) + '</tr>'
+    for row in rows:
+        yield '<tr>' + ''.join(format_html('<td>{}</td>', cell) for cell in row) + '</tr>'
+    yield '</table>'
+
+
+def render_html(report):
+    """The report as a printable HTML page, yielded section by section"""
+    student, term = report['student'], report['term']
+    yield format_html(
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>{} – {}</title><style>{}</style></head><body>'
+        '<h1>{}</h1><p class="meta">{} · {} · {} to {} · generated {}</p>',
+        student['name'], term['name'], STYLE, student['name'], student['classroom'] or 'No classroom',
+        student['student_id'], term['start'], term['end'], report['generated_on'],
+    )
+
+    attendance = report['attendance']
+    yield format_html(
+        '<section><h2>Attendance</h2><p class="stats"><span>Rate: {}</span><span>Present: {}</span>'
+        '<span>Late: {}</span><span>Absent: {}</span><span>Excused: {}</span></p>',
+        _percent(attendance['attendance_rate']), attendance['present'], attendance['late'],
+        attendance['absent'], attendance['excused'],
+    )
+    yield from _table(['Month', 'Sessions', 'Rate'], [
+        (f"{month['month']:%B %Y}", month['total'], _percent(month['attendance_rate']))
+        for month in attendance['months']
+    ])
+    yield '</section>'
+
+    grades = report['grades']
+    yield format_html('<section><h2>Grades</h2><p class="stats"><span>Average: {}</span><span>Grades: {}</span></p>',
+                      _percent(grades['average']), grades['count'])
+    yield from _table(['Subject', 'Grades', 'Average'], [
+        (subject['subject'], subject['count'], _percent(subject['average'])) for subject in grades['subjects']
+    ])
+    yield '</section>'
+
+    assignments = report['assignments']
+    yield format_html(
+        '<section><h2>Assignments</h2><p class="stats"><span>Completed: {} of {}</span><span>Overdue: {}</span></p>',
+        assignments['submitted'], assignments['total'], assignments['overdue'],
+    )
+    yield from _table(['Assignment', 'Subject', 'Due', 'Submitted'], [
+        (item['title'], item['subject'], f"{timezone.localtime(item['due_date']):%Y-%m-%d}",
+         'Yes' if item['submitted'] else 'No')
+        for item in assignments['items']
+    ])
+    yield '</section>'
+
+    feedback = report['feedback']
+    yield format_html('<section><h2>Feedback</h2><p class="stats"><span>Answered: {} of {}</span></p>',
+                      feedback['responded'], feedback['sessions'])
+    yield from _table(['Session', 'Category', 'Date', 'Answered'], [
+        (item['title'], item['category'], f"{timezone.localtime(item['date']):%Y-%m-%d}",
+         'Yes' if item['responded'] else 'No')
+        for item in feedback['items']
+    ])
+    yield '</section>'
+
+    yield '<section><h2>Recent activity</h2>'
+    yield from _table(['Date', 'Type', 'Item', 'Detail'], [
+        (entry['date'], entry['kind'].title(), entry['title'],
+         f"{entry['detail']} ({entry['score']:.0f}%)" if entry['score'] is not None else entry['detail'])
+        for entry in report['timeline']
+    ])
+    yield '</section></body></html>'
+
+
+def report_filename(report):
+    name = slugify(report['student']['student_id'] or report['student']['id'])
+    return f"report_{name}_{report['term']['name']}.html"
@@ -0,0 +1,354 @@
+"""
+At-risk student prediction
+
+A nightly batch builds one feature vector per active student from columnar
+NumPy arrays (loaded with one query per source table):
+
+- attendance rates over the last 14 and 60 days, the late rate and the
+  change between the two windows (AttendanceRecord)
+- average grade and grade trend over the last 60 days (Grade)
+- missing and late submission rates for assignments due in the student's
+  classroom (Assignment, AssignmentSubmission)
+
+The model is a pure NumPy logistic regression. It is retrained each night
+on the same features taken HORIZON_DAYS ago, labelled by whether the student
+then fell behind (attendance below 75% or average grade below 60% over the
+following HORIZON_DAYS). Scores are written to StudentRiskScore, so pages
+read them with one indexed query.
+"""
+
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord
+from grades.models import Grade
+from users.models import CustomUser
+
+from . import system_settings
+from .grade_stats import GradeFrame, average_percentages, trend_slopes
+from .models import RiskModelRun, StudentRiskScore
+from .routers import replica
+
+FEATURES = [
+    'attendance_14d',
+    'attendance_60d',
+    'late_rate_60d',
+    'attendance_change',
+    'grade_average',
+    'grade_trend',
+    'missing_rate',
+    'late_submission_rate',
+]
+WINDOW_DAYS = 60
+RECENT_DAYS = 14
+HORIZON_DAYS = 30
+
+# Outcome that counts as "fell behind" when labelling training rows; the
+# attendance rate comes from the attendance_threshold system setting
+AT_RISK_GRADE = 60.0
+
+# Probability cutoffs for StudentRiskScore.level
+LEVELS = [(0.6, 'high'), (0.3, 'medium')]
+
+STATUS_CODES = {'present': 0, 'late': 1, 'absent': 2}
+
+
+def _rows(students, ids):
+    """Row of each id in the sorted students array, -1 for ids that are not scored students"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(students) or not len(ids):
+        return np.full(len(ids), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(students, ids), len(students) - 1)
+    return np.where(students[positions] == ids, positions, -1)
+
+
+def _rate(numerator, denominator):
+    """numerator / denominator, NaN where there is nothing to divide"""
+    out = np.full(len(denominator), np.nan)
+    return np.divide(numerator, denominator, out=out, where=denominator > 0)
+
+
+def _count(rows, mask, n):
+    return np.bincount(rows[mask & (rows >= 0)], minlength=n)
+
+
+class RiskInputs:
+    """Columnar attendance, grade and submission data for the scored students"""
+
+    def __init__(self, students, classrooms, attendance, grades, assignments, submissions):
+        # students: sorted ids; classrooms: each student's classroom id (-1 for none)
+        self.students = np.asarray(students, dtype=np.int64)
+        self.classrooms = np.asarray(classrooms, dtype=np.int64)
+        # attendance: (student ids, session start timestamps, STATUS_CODES, -1 for others)
+        student_ids, self.attendance_times, self.attendance_status = (np.asarray(a) for a in attendance)
+        self.attendance_rows = _rows(self.students, student_ids)
+        self.grades = grades
+        # assignments: (classroom ids, due timestamps)
+        self.assignment_classrooms, self.assignment_due = (np.asarray(a) for a in assignments)
+        # submissions: (student ids, due timestamps, submitted timestamps)
+        student_ids, self.submission_due, self.submitted = (np.asarray(a) for a in submissions)
+        self.submission_rows = _rows(self.students, student_ids)
+
+    def __len__(self):
+        return len(self.students)
+
+    @classmethod
+    def load(cls, start, end):
+        """Every active student and their data between start and end, one query per table"""
+        students = list(CustomUser.objects.filter(role='student', is_active=True)
+                        .order_by('id').values_list('id', 'student_profile__classroom_id'))
+        records = (AttendanceRecord.objects
+                   .filter(session__start_time__gte=start, session__start_time__lte=end)
+                   .values_list('student_id', 'session__start_time', 'status'))
+        assignments = (Assignment.objects.filter(due_date__gte=start, due_date__lte=end)
+                       .values_list('classroom_id', 'due_date'))
+        submissions = (AssignmentSubmission.objects
+                       .filter(assignment__due_date__gte=start, assignment__due_date__lte=end)
+                       .values_list('student_id', 'assignment__due_date', 'submitted_at'))
+        return cls(
+            [student for student, _ in students],
+            [classroom if classroom is not None else -1 for _, classroom in students],
+            _columns(((student, started.timestamp(), STATUS_CODES.get(status, -1))
+                      for student, started, status in records.iterator(chunk_size=10000)), 3),
+            GradeFrame.from_queryset(Grade.objects.filter(date_assigned__gte=start.date(),
+                                                          date_assigned__lte=end.date())),
+            _columns(((classroom, due.timestamp()) for classroom, due in assignments.iterator(chunk_size=10000)), 2),
+            _columns(((student, due.timestamp(), submitted.timestamp())
+                      for student, due, submitted in submissions.iterator(chunk_size=10000)), 3),
+        )
+
+
+def _columns(rows, width):
+    rows = list(rows)
+    if not rows:
+        return tuple(np.array([]) for _ in range(width))
+    return tuple(np.array(column) for column in zip(*rows))
+
+
+def _from_dict(students, values):
+    """Array aligned with students from a {student_id: value} mapping, NaN for missing students"""
+    out = np.full(len(students), np.nan)
+    if values:
+        ids = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        rows = _rows(students, ids)
+        found = rows >= 0
+        out[rows[found]] = np.fromiter(values.values(), dtype=np.float64, count=len(values))[found]
+    return out
+
+
+def _attendance(inputs, start, end):
+    """(sessions, present, late) per student for sessions starting in (start, end]"""
+    n = len(inputs)
+    window = (inputs.attendance_times > start) & (inputs.attendance_times <= end)
+    rows, status = inputs.attendance_rows, inputs.attendance_status
+    return (_count(rows, window, n), _count(rows, window & (status == 0), n),
+            _count(rows, window & (status == 1), n))
+
+
+def _grades(inputs, start, end):
+    day_start, day_end = start.date().toordinal(), end.date().toordinal()
+    frame = inputs.grades
+    return frame.select((frame.days > day_start) & (frame.days <= day_end))
+
+
+def build_features(inputs, as_of):
+    """Feature matrix (students x FEATURES) using only data up to as_of; NaN where a student has no data"""
+    n = len(inputs)
+    end = as_of.timestamp()
+    recent_sessions, recent_present, _ = _attendance(inputs, end - RECENT_DAYS * 86400, end)
+    sessions, present, late = _attendance(inputs, end - WINDOW_DAYS * 86400, end)
+    attendance_14d = _rate(recent_present, recent_sessions)
+    attendance_60d = _rate(present, sessions)
+
+    grades = _grades(inputs, as_of - timedelta(days=WINDOW_DAYS), as_of)
+    grade_average = _from_dict(inputs.students, average_percentages(grades)) / 100
+    grade_trend = _from_dict(inputs.students, trend_slopes(grades)) / 100
+
+    start = end - WINDOW_DAYS * 86400
+    due = (inputs.assignment_due > start) & (inputs.assignment_due <= end)
+    classrooms, due_counts = np.unique(inputs.assignment_classrooms[due].astype(np.int64), return_counts=True)
+    expected = np.zeros(n)
+    if len(classrooms):
+        positions = np.minimum(np.searchsorted(classrooms, inputs.classrooms), len(classrooms) - 1)
+        expected = np.where(classrooms[positions] == inputs.classrooms, due_counts[positions], 0)
+    window = (inputs.submission_due > start) & (inputs.submission_due <= end) & (inputs.submitted <= end)
+    submitted = _count(inputs.submission_rows, window, n)
+    late_submissions = _count(inputs.submission_rows, window & (inputs.submitted > inputs.submission_due), n)
+    missing_rate = _rate(np.clip(expected - submitted, 0, None), expected)
+
+    return np.column_stack([
+        attendance_14d,
+        attendance_60d,
+        _rate(late, sessions),
+        attendance_14d - attendance_60d,
+        grade_average,
+        grade_trend,
+        missing_rate,
+        _rate(late_submissions, submitted),
+    ])
+
+
+def at_risk_attendance():
+    return system_settings.get('attendance_threshold') / 100
+
+
+def outcomes(inputs, as_of, until):
+    """(labels, labelled): whether each student fell behind between as_of and until, and who had data"""
+    sessions, present, _ = _attendance(inputs, as_of.timestamp(), until.timestamp())
+    attendance = _rate(present, sessions)
+    grades = _from_dict(inputs.students, average_percentages(_grades(inputs, as_of, until)))
+    with np.errstate(invalid='ignore'):
+        labels = (attendance < at_risk_attendance()) | (grades < AT_RISK_GRADE)
+    return labels.astype(np.float64), ~(np.isnan(attendance) & np.isnan(grades))
+
+
+def _sigmoid(z):
+    # tanh form does not overflow for large |z|
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+
+class LogisticModel:
+    """L2-regularized logistic regression on standardized features, fitted with Newton's method"""
+
+    def __init__(self, coefficients, means, scales):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, X, y, l2=1.0, iterations=50, tolerance=1e-8):
+        # Mean and spread of each column over the students that have it
+        present = ~np.isnan(X)
+        counts = present.sum(axis=0)
+        means = np.divide(np.where(present, X, 0).sum(axis=0), counts, out=np.zeros(X.shape[1]), where=counts > 0)
+        variances = np.divide((np.where(present, X - means, 0) ** 2).sum(axis=0), counts,
+                              out=np.zeros(X.shape[1]), where=counts > 0)
+        scales = np.where(variances > 0, np.sqrt(variances), 1.0)
+        model = cls(np.zeros(X.shape[1] + 1), means, scales)
+
+        A = np.column_stack([np.ones(len(X)), model.standardize(X)])
+        penalty = np.eye(A.shape[1]) * l2
+        penalty[0, 0] = 0  # the intercept is not regularized
+        w = model.coefficients
+        for _ in range(iterations):
+            p = _sigmoid(A @ w)
+            gradient = A.T @ (p - y) + penalty @ w
+            hessian = (A * (p * (1 - p))[:, None]).T @ A + penalty
+            step = np.linalg.solve(hessian, gradient)
+            w = w - step
+            if np.abs(step).max() < tolerance:
+                break
+        model.coefficients = w
+        return model
+
+    @classmethod
+    def from_run(cls, run):
+        return cls(run.coefficients, run.means, run.scales)
+
+    def standardize(self, X):
+        # Missing features count as the training mean
+        return np.nan_to_num((X - self.means) / self.scales)
+
+    def predict_proba(self, X):
+        return _sigmoid(self.coefficients[0] + self.standardize(X) @ self.coefficients[1:])
+
+    def top_factors(self, X):
+        """Index of the feature pushing each student's risk up the most, -1 if none does"""
+        contributions = self.standardize(X) * self.coefficients[1:]
+        top = contributions.argmax(axis=1)
+        return np.where(contributions[np.arange(len(X)), top] > 0, top, -1)
+
+
+def train(inputs, now, horizon_days=HORIZON_DAYS):
+    as_of = now - timedelta(days=horizon_days)
+    labels, labelled = outcomes(inputs, as_of, now)
+    if not labelled.any() or labels[labelled].min() == labels[labelled].max():
+        raise ValueError('Training needs both students who fell behind and students who did not')
+    X = build_features(inputs, as_of)[labelled]
+    return LogisticModel.fit(X, labels[labelled]), labels[labelled]
+
+
+def risk_levels(scores):
+    conditions = [scores >= cutoff for cutoff, _ in LEVELS]
+    return np.select(conditions, [level for _, level in LEVELS], default='low')
+
+
+def save_scores(inputs, X, scores, factors, now):
+    levels = risk_levels(scores)
+    rounded = np.round(X, 4)
+    entries = [
+        StudentRiskScore(
+            student_id=int(student_id),
+            score=round(float(score), 4),
+            level=level,
+            top_factor=FEATURES[factor] if factor >= 0 else '',
+            features={name: (None if np.isnan(value) else float(value)) for name, value in zip(FEATURES, row)},
+            scored_at=now,
+        )
+        for student_id, score, level, factor, row in zip(inputs.students, scores, levels, factors, rounded)
+    ]
+    with transaction.atomic():
+        StudentRiskScore.objects.bulk_create(
+            entries, batch_size=2000, update_conflicts=True, unique_fields=['student'],
+            update_fields=['score', 'level', 'top_factor', 'features', 'scored_at'],
+        )
+        # Students who left since the last run
+        StudentRiskScore.objects.filter(scored_at__lt=now).delete()
+    return levels
+
+
+def run_pipeline(now=None, retrain=True):
+    """Train (or reuse the last model), score every active student and store the scores"""
+    now = now or timezone.now()
+    # The inputs are read from the replica when one is configured
+    with replica():
+        inputs = RiskInputs.load(now - timedelta(days=WINDOW_DAYS + HORIZON_DAYS), now)
+
+    start = time.perf_counter()
+    previous = RiskModelRun.objects.first()
+    model = None
+    if retrain or previous is None:
+        try:
+            model, labels = train(inputs, now)
+        except ValueError:
+            # Keep scoring with the last model until there is enough history to retrain
+            if previous is None:
+                raise
+        else:
+            trained_at, training_rows, positive_rate = now, len(labels), float(labels.mean())
+    if model is None:
+        model = LogisticModel.from_run(previous)
+        trained_at, training_rows, positive_rate = (previous.trained_at, previous.training_rows,
+                                                    previous.positive_rate)
+    train_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    X = build_features(inputs, now)
+    scores = model.predict_proba(X)
+    factors = model.top_factors(X)
+    score_ms = (time.perf_counter() - start) * 1000
+
+    levels = save_scores(inputs, X, scores, factors, now)
+    recent = X[:, FEATURES.index('attendance_14d')]
+    return RiskModelRun.objects.create(
+        trained_at=trained_at,
+        scored_at=now,
+        feature_names=FEATURES,
+        coefficients=model.coefficients.tolist(),
+        means=model.means.tolist(),
+        scales=model.scales.tolist(),
+        training_rows=training_rows,
+        positive_rate=positive_rate,
+        students_scored=len(inputs),
+        train_ms=train_ms,
+        score_ms=score_ms,
+        summary={
+            **{level: int((levels == level).sum()) for _, level in LEVELS + [(0, 'low')]},
+            'attendance_14d': None if np.isnan(recent).all() else round(float(np.nanmean(recent)) * 100, 1),
+        },
+    )
@@ -0,0 +1,211 @@
+"""
+Attendance rollups
+
+ClassroomAttendanceRollup (per classroom and subject) and
+StudentAttendanceRollup (per student) hold attendance counts per day and
+per month, so trend charts read a few hundred pre-aggregated rows instead of
+scanning AttendanceRecord by date. The day of a record is the local date of
+its session's start_time.
+
+Rollups are kept current incrementally: the AttendanceRecord signals pass
+each create, status change and delete to record_changes(), which adds or
+subtracts it from the affected day and month rows in the same transaction.
+Bulk writes that send no signals (CSV imports) call rebuild() for the dates
+and classrooms they touched instead, and the backfill_rollups command
+rebuilds any date range from scratch.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+
+from .models import ClassroomAttendanceRollup, StudentAttendanceRollup
+
+STATUSES = ('present', 'late', 'absent', 'excused')
+COUNT_FIELDS = ('total',) + STATUSES
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_end(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def session_day(start_time):
+    return timezone.localdate(start_time) if timezone.is_aware(start_time) else start_time.date()
+
+
+def record_changes(changes):
+    """
+    Apply (session_id, student_id, status, sign) changes: sign is +1 for a
+    record that now counts and -1 for one that no longer does.
+    """
+    changes = [change for change in changes if change[0] is not None and change[1] is not None]
+    if not changes:
+        return
+    sessions = {
+        pk: (classroom_id, subject_id, session_day(start_time))
+        for pk, classroom_id, subject_id, start_time in AttendanceSession.objects.filter(
+            pk__in={change[0] for change in changes},
+        ).values_list('pk', 'classroom_id', 'subject_id', 'start_time')
+    }
+    deltas = defaultdict(Counter)
+    for session_id, student_id, status, sign in changes:
+        if session_id not in sessions:
+            continue
+        classroom_id, subject_id, day = sessions[session_id]
+        for period, bucket in (('day', day), ('month', month_start(day))):
+            keys = [
+                (ClassroomAttendanceRollup, (('classroom_id', classroom_id), ('subject_id', subject_id),
+                                             ('period', period), ('date', bucket))),
+                (StudentAttendanceRollup, (('student_id', student_id), ('period', period), ('date', bucket))),
+            ]
+            for key in keys:
+                deltas[key]['total'] += sign
+                if status in STATUSES:
+                    deltas[key][status] += sign
+    _apply(deltas)
+
+
+def _apply(deltas):
+    for (model, lookup), counts in deltas.items():
+        counts = {field: amount for field, amount in counts.items() if amount}
+        if not counts:
+            continue
+        lookup = dict(lookup)
+        changes = {field: F(field) + amount for field, amount in counts.items()}
+        with transaction.atomic():
+            if model.objects.filter(**lookup).update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    model.objects.create(**lookup, **counts)
+            except IntegrityError:
+                # Another writer created the bucket first
+                model.objects.filter(**lookup).update(**changes)
+
+
+def _counts():
+    return {
+        'total': Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status in STATUSES},
+    }
+
+
+def rebuild(start, end, classroom_ids=None, student_ids=None, using=DEFAULT_DB_ALIAS, source=None):
+    """
+    Recompute the rollups for sessions starting between the start and end
+    dates (inclusive), optionally only for some classrooms and students.
+    Month rows are recomputed for every month the range touches. Marks are
+    aggregated from the `source` alias (e.g. a read replica; by default
+    `using`), and the rollups are written to and summed in `using`.
+    """
+    first, last = month_start(start), month_end(end)
+    records = AttendanceRecord.objects.using(source or using).annotate(day=TruncDate('session__start_time'))
+    targets = [
+        (ClassroomAttendanceRollup, ('classroom', 'subject'), ('session__classroom', 'session__subject'),
+         classroom_ids, 'session__classroom__in', 'classroom__in'),
+        (StudentAttendanceRollup, ('student',), ('student',), student_ids, 'student__in', 'student__in'),
+    ]
+    with transaction.atomic(using=using):
+        for model, fields, sources, ids, record_filter, rollup_filter in targets:
+            rollups = model.objects.using(using)
+            scoped = records
+            if ids is not None:
+                rollups = rollups.filter(**{rollup_filter: ids})
+                scoped = scoped.filter(**{record_filter: ids})
+            rollups.filter(period='day', date__range=(first, last)).delete()
+            rows = (scoped.filter(day__range=(first, last))
+                    .values('day', *sources).annotate(**_counts()).order_by())
+            model.objects.using(using).bulk_create([
+                model(period='day', date=row['day'],
+                      **{f'{field}_id': row[source] for field, source in zip(fields, sources)},
+                      **{field: row[field] for field in COUNT_FIELDS})
+                for row in rows
+            ], batch_size=2000)
+
+            # Months are summed from the day rows just written
+            rollups.filter(period='month', date__range=(first, last)).delete()
+            months = (rollups.filter(period='day', date__range=(first, last))
+                      .annotate(month=TruncMonth('date'))
+                      .values('month', *fields).annotate(**{field: Sum(field) for field in COUNT_FIELDS})
+                      .order_by())
+            model.objects.using(using).bulk_create([
+                model(period='month', date=row['month'],
+                      **{f'{field}_id': row[field] for field in fields},
+                      **{field: row[field] for field in COUNT_FIELDS})
+                for row in months
+            ], batch_size=2000)
+
+
+def rebuild_sessions(session_ids, student_ids):
+    """Rebuild the days of these sessions after a bulk write that sent no signals"""
+    sessions = list(AttendanceSession.objects.filter(pk__in=session_ids).values_list('classroom_id', 'start_time'))
+    if not sessions:
+        return
+    days = [session_day(start_time) for _, start_time in sessions]
+    rebuild(min(days), max(days), classroom_ids={classroom for classroom, _ in sessions},
+            student_ids=set(student_ids))
+
+
+def _rate(row):
+    return round(row['present'] / row['total'] * 100, 1) if row['total'] else 0
+
+
+def monthly_trend(start, end, classroom_id=None, subject_id=None):
+    """[{month, total, present, late, absent, excused, attendance_rate}] from the month rollups"""
+    rows = ClassroomAttendanceRollup.objects.filter(period='month', date__range=(month_start(start), end))
+    if classroom_id is not None:
+        rows = rows.filter(classroom_id=classroom_id)
+    if subject_id is not None:
+        rows = rows.filter(subject_id=subject_id)
+    months = rows.values('date').annotate(**{field: Sum(field) for field in COUNT_FIELDS}).order_by('date')
+    return [{'month': row.pop('date'), **row, 'attendance_rate': _rate(row)} for row in months]
+
+
+def class_comparison(start, end):
+    """[{classroom_id, classroom, total, present, ..., attendance_rate}] over whole months, best first"""
+    rows = (ClassroomAttendanceRollup.objects
+            .filter(period='month', date__range=(month_start(start), end))
+            .values('classroom_id', 'classroom__name')
+            .annotate(**{field: Sum(field) for field in COUNT_FIELDS})
+            .order_by())
+    result = [{**row, 'classroom': row.pop('classroom__name'), 'attendance_rate': _rate(row)} for row in rows]
+    return sorted(result, key=lambda row: row['attendance_rate'], reverse=True)
+
+
+def student_days(student_id, days=7, today=None):
+    """
+    The last `days` days of a student's attendance for a calendar strip:
+    [{date, day, status}] where status is the worst mark that day, or 'none'.
+    """
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = {
+        row.date: row for row in StudentAttendanceRollup.objects.filter(
+            student_id=student_id, period='day', date__range=(first, today))
+    }
+    strip = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = rows.get(day)
+        status = 'none'
+        if row is not None:
+            status = next((s for s in ('absent', 'late', 'present', 'excused') if getattr(row, s) > 0), 'none')
+        strip.append({'date': day, 'day': day.strftime('%a'), 'status': status})
+    return strip
+
+
+def academic_year(today=None):
+    """(start, end) of the academic year containing today, starting in September"""
+    today = today or timezone.localdate()
+    year = today.year if today.month >= 9 else today.year - 1
+    return date(year, 9, 1), date(year + 1, 8, 31)
@@ -0,0 +1,154 @@
+"""
+Read replica routing
+
+ReplicaRouter sends reads to the REPLICA_DATABASE alias only inside a
+replica context, and sends every write to the primary:
+
+- ReplicaRoutingMiddleware opens one for GET/HEAD requests to the read-heavy
+  views listed in REPLICA_VIEWS (reports, analytics, parent dashboards,
+  exports), unless the user is inside their sticky window
+- export jobs and the rebuild_gradebook and score_student_risk commands read
+  their inputs inside `with replica():`; backfill_rollups passes the replica
+  to rollups.rebuild() as the alias to aggregate marks from
+- streamed responses keep their request's routing through keep_routing()
+
+Read-after-write: once a request writes, its remaining reads (streamed ones
+included) go to the primary, and the user's reads stay on the primary for
+REPLICA_STICKY_SECONDS so they never see a replica that has not caught up
+with their own change.
+
+Settings:
+
+    DATABASES['replica'] = {..., 'TEST': {'MIRROR': 'default'}}
+    DATABASE_ROUTERS = ['teacher.routers.ReplicaRouter']
+    REPLICA_DATABASE = 'replica'
+
+Without a configured replica alias everything stays on the primary. For
+local development the replica can be a second SQLite file refreshed by the
+sync_replica command.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_STICKY_SECONDS = 15
+DEFAULT_REPLICA_VIEWS = (
+    'attendance:attendance_reports',
+    'attendance:attendance_dashboard',
+    'feedback:feedback_analytics',
+    'users:parent_dashboard',
+    'users:parent_student_report',
+    'export_data',
+    'student_report',
+    'risk_students',
+    'attendance_trends',
+)
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class Routing:
+    """Routing state of the current request or replica() block"""
+
+    def __init__(self, enabled, pin_on_write):
+        self.enabled = enabled
+        self.pin_on_write = pin_on_write
+        self.wrote = False
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias and alias in connections.settings else None
+
+
+@contextmanager
+def replica(pin_on_write=False):
+    """
+    Route reads in this block to the replica. With pin_on_write, a write
+    sends the rest of the block's reads back to the primary (requests do
+    this; background jobs that only write progress rows do not).
+    """
+    with _routed(Routing(enabled=True, pin_on_write=pin_on_write)):
+        yield
+
+
+@contextmanager
+def _routed(routing):
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+def request_routing():
+    """Routing for one request: primary until enabled, and pinned by writes"""
+    return _routed(Routing(enabled=False, pin_on_write=True))
+
+
+def current():
+    return _routing.get()
+
+
+def replica_iterator(iterable):
+    """Iterate lazily (e.g. a streamed response) with reads on the replica"""
+    iterator = iter(iterable)
+    while True:
+        with replica():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def keep_routing(iterable):
+    """Let a streamed response read from the replica if its request does and has not written"""
+    routing = current()
+    if routing is not None and routing.enabled and not (routing.pin_on_write and routing.wrote):
+        return replica_iterator(iterable)
+    return iterable
+
+
+def _sticky_key(user_id):
+    return f'teacher:replica:sticky:{user_id}'
+
+
+def stick(user_id):
+    """Keep this user's reads on the primary for the sticky window"""
+    cache.set(_sticky_key(user_id), True, getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS))
+
+
+def is_sticky(user_id):
+    return bool(cache.get(_sticky_key(user_id)))
+
+
+def replica_view(request):
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and match.view_name in getattr(settings, 'REPLICA_VIEWS', DEFAULT_REPLICA_VIEWS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.enabled or (routing.pin_on_write and routing.wrote):
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return False if db == replica_alias() else None
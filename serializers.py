@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import TeacherProfile, Assignment, Quiz
+from .models import TeacherProfile, Assignment, Quiz, GradebookEntry
 
 class TeacherProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,3 +15,11 @@ class QuizSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
         fields = ['id', 'title', 'subject', 'classroom', 'questions']
+
+class GradebookEntrySerializer(serializers.ModelSerializer):
+    student_name = serializers.CharField(source='student.get_full_name', read_only=True)
+
+    class Meta:
+        model = GradebookEntry
+        fields = ['id', 'classroom', 'subject', 'student', 'student_name', 'weighted_percentage',
+                  'grade_count', 'rank', 'percentile', 'updated_at']
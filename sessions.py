@@ -0,0 +1,72 @@
+"""
+Session storage modes and expired session pruning
+
+With Django's default database sessions every authenticated request reads
+its django_session row (and writes it back whenever the session changes),
+and rows of sessions that simply expire are never deleted. Each deployment
+picks a mode with SESSION_MODE, applied in the project settings with:
+
+    from teacher.sessions import session_settings
+    globals().update(session_settings())
+
+- 'db': django_session only (the default)
+- 'cached_db': reads come from the cache and fall back to the table, writes
+  go to both; safe with any cache, fastest with one shared by all workers
+- 'cache': the cache only; needs a shared persistent cache (Redis,
+  Memcached), since sessions are lost when an entry is evicted
+- 'signed_cookies': the session travels in a signed cookie, so no storage is
+  touched at all; the data is readable by the client and a stolen cookie
+  stays valid until it expires, so only small non-secret data belongs in it
+
+The prune_sessions command deletes expired rows in small batches, each in
+its own short transaction, so it never holds the write lock for long.
+"""
+
+import os
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+SESSION_MODES = {
+    'db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.db'},
+    'cached_db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db'},
+    'cache': {'SESSION_ENGINE': 'django.contrib.sessions.backends.cache'},
+    'signed_cookies': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+        'SESSION_COOKIE_HTTPONLY': True,
+    },
+}
+DEFAULT_MODE = 'db'
+DEFAULT_BATCH_SIZE = 1000
+
+
+def session_settings(mode=None):
+    """Settings for a session mode (SESSION_MODE from the environment by default)"""
+    mode = mode or os.environ.get('SESSION_MODE', DEFAULT_MODE)
+    if mode not in SESSION_MODES:
+        raise ImproperlyConfigured(f'Unknown SESSION_MODE {mode!r}; use one of {", ".join(SESSION_MODES)}')
+    return dict(SESSION_MODES[mode])
+
+
+def prune_expired(batch_size=DEFAULT_BATCH_SIZE, pause=0, now=None, using=DEFAULT_DB_ALIAS):
+    """
+    Delete sessions that expired before now, batch_size rows per transaction
+    with `pause` seconds between batches; returns how many were deleted.
+    """
+    now = now or timezone.now()
+    expired = Session.objects.using(using).filter(expire_date__lt=now)
+    deleted = 0
+    while True:
+        keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        with transaction.atomic(using=using):
+            # Filtering on expire_date again spares a session renewed since the select
+            deleted += expired.filter(session_key__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,242 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from attendance.models import AttendanceRecord
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import ParentProfile, StudentProfile
+
+from . import api_auth, caching, fragments, parent_access, rollups, system_settings, throttling
+from .gradebook import classroom_for_student, schedule_moves, schedule_refresh
+from .metrics import ATTENDANCE_MARKS
+
+# Stands in for values that were deferred when an instance was loaded
+UNKNOWN = object()
+
+
+def _loaded(instance, *attnames):
+    """
+    The instance's values for these fields as loaded, or UNKNOWN if any was
+    deferred. Reads __dict__ so post_init receivers never load a deferred
+    field, which would build another instance and recurse.
+    """
+    if any(attname not in instance.__dict__ for attname in attnames):
+        return UNKNOWN
+    return tuple(instance.__dict__[attname] for attname in attnames)
+
+
+@receiver(post_init, sender=Grade)
+def remember_grade_key(sender, instance, **kwargs):
+    # Keep the original student/subject so moving a grade refreshes both sides
+    instance._gradebook_key = _loaded(instance, 'student_id', 'subject_id')
+
+
+@receiver(pre_save, sender=Grade)
+def load_grade_key(sender, instance, **kwargs):
+    if instance._gradebook_key is UNKNOWN:
+        # Loaded with them deferred: read the saved student/subject before they are overwritten
+        instance._gradebook_key = (sender.objects.filter(pk=instance.pk).values_list('student_id', 'subject_id')
+                                   .first() or (None, None))
+
+
+@receiver(post_save, sender=Grade)
+def grade_saved(sender, instance, created, **kwargs):
+    keys = {(instance.student_id, instance.subject_id), instance._gradebook_key}
+    for student_id, subject_id in keys:
+        if student_id is not None:
+            schedule_refresh(classroom_for_student(student_id), subject_id)
+    instance._gradebook_key = (instance.student_id, instance.subject_id)
+
+
+@receiver(pre_delete, sender=Grade)
+def grade_deleting(sender, instance, **kwargs):
+    if instance._gradebook_key is UNKNOWN:
+        # Deferred fields can still be loaded while the row exists
+        instance._gradebook_key = (instance.student_id, instance.subject_id)
+
+
+@receiver(post_delete, sender=Grade)
+def grade_deleted(sender, instance, **kwargs):
+    schedule_refresh(classroom_for_student(instance.student_id), instance.subject_id)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def attendance_marked(sender, instance, created, **kwargs):
+    # Count new marks and status changes, not re-saves or note edits
+    # (a record loaded with its status deferred is not counted: its old status is unknown)
+    previous = instance._rollup_key
+    if created or previous is None or (previous is not UNKNOWN and previous[2] != instance.status):
+        ATTENDANCE_MARKS.inc(status=instance.status)
+
+
+ROLLUP_FIELDS = ('session_id', 'student_id', 'status')
+
+
+def _rollup_key(record):
+    return tuple(getattr(record, attname) for attname in ROLLUP_FIELDS)
+
+
+@receiver(post_init, sender=AttendanceRecord)
+def remember_attendance_key(sender, instance, **kwargs):
+    # The saved session/student/status, so a correction moves the count between buckets
+    instance._rollup_key = _loaded(instance, *ROLLUP_FIELDS) if instance.pk else None
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def attendance_rollup_saved(sender, instance, **kwargs):
+    key = _rollup_key(instance)
+    if instance._rollup_key is UNKNOWN:
+        # Loaded with deferred fields, so the bucket it was counted in is unknown: recount its day
+        rollups.rebuild_sessions({instance.session_id}, {instance.student_id})
+    elif key != instance._rollup_key:
+        changes = [(*key, 1)]
+        if instance._rollup_key is not None:
+            changes.append((*instance._rollup_key, -1))
+        rollups.record_changes(changes)
+    instance._rollup_key = key
+
+
+@receiver(pre_delete, sender=AttendanceRecord)
+def attendance_deleting(sender, instance, **kwargs):
+    if instance._rollup_key is UNKNOWN:
+        # Deferred fields can still be loaded while the row exists
+        instance._rollup_key = _rollup_key(instance)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def attendance_rollup_deleted(sender, instance, **kwargs):
+    rollups.record_changes([(*(instance._rollup_key or _rollup_key(instance)), -1)])
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def classroom_changed(sender, **kwargs):
+    caching.bump('classrooms')
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_changed(sender, **kwargs):
+    caching.bump('subjects')
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def student_profile_changed(sender, **kwargs):
+    caching.bump('students', 'family')
+
+
+@receiver(post_init, sender=StudentProfile)
+def remember_classroom(sender, instance, **kwargs):
+    # The saved classroom, so moving a student re-ranks both classrooms
+    instance._classroom_key = _loaded(instance, 'classroom_id') if instance.pk else (None,)
+
+
+@receiver(pre_save, sender=StudentProfile)
+def load_classroom(sender, instance, **kwargs):
+    if instance._classroom_key is UNKNOWN:
+        # Loaded with it deferred: read the saved classroom before it is overwritten
+        instance._classroom_key = (sender.objects.filter(pk=instance.pk).values_list('classroom_id', flat=True)
+                                   .first(),)
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_classroom_saved(sender, instance, **kwargs):
+    (previous,) = instance._classroom_key
+    if previous != instance.classroom_id:
+        schedule_moves({instance.user_id: (previous, instance.classroom_id)})
+    instance._classroom_key = (instance.classroom_id,)
+
+
+@receiver(m2m_changed, sender=ParentProfile.students.through)
+def parent_children_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The parents are only known before a student's links are cleared
+        instance._cleared_parents = list(instance.parents.values_list('user_id', flat=True))
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        caching.bump('family')
+        if not reverse:
+            parent_access.bump_parents([instance.user_id])
+        elif action == 'post_clear':
+            parent_access.bump_parents(getattr(instance, '_cleared_parents', []))
+        else:
+            parent_access.bump_parents(parent_access.parent_user_ids(pk_set))
+
+
+@receiver(pre_delete, sender=StudentProfile)
+def student_profile_deleting(sender, instance, **kwargs):
+    # Deleting the profile drops its parent links without an m2m_changed signal
+    parent_access.bump_parents(instance.parents.values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=ParentProfile)
+def parent_profile_deleted(sender, instance, **kwargs):
+    parent_access.bump_parents([instance.user_id])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login; any other save may rename a child
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        caching.bump('family')
+
+
+TOKEN_FIELDS = ('password', 'is_active', 'role', 'is_staff', 'is_superuser')
+
+
+def _token_key(user):
+    return tuple(getattr(user, attname) for attname in TOKEN_FIELDS)
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_token_key(sender, instance, **kwargs):
+    # The saved credentials, so changing them revokes the user's API tokens
+    instance._token_key = _loaded(instance, *TOKEN_FIELDS) if instance.pk else None
+
+
+@receiver(pre_save, sender=get_user_model())
+def load_token_key(sender, instance, **kwargs):
+    if instance._token_key is UNKNOWN:
+        # Loaded with deferred credentials: read the saved ones before they are overwritten
+        instance._token_key = sender.objects.filter(pk=instance.pk).values_list(*TOKEN_FIELDS).first()
+
+
+@receiver(post_save, sender=get_user_model())
+def user_credentials_saved(sender, instance, created, **kwargs):
+    key = _token_key(instance)
+    if not created and key != instance._token_key:
+        api_auth.revoke_tokens(instance.pk)
+    instance._token_key = key
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    api_auth.publish_version(instance.pk, api_auth.token_version(instance.pk) + 1)
+
+
+@receiver(user_login_failed)
+def login_failed(sender, credentials, request=None, **kwargs):
+    if request is not None:
+        throttling.record_failure(request, credentials.get('username'))
+
+
+@receiver(user_logged_in)
+def logged_in(sender, request, user, **kwargs):
+    if request is not None:
+        throttling.record_success(request)
+        # Sessions expire after the configured timeout instead of SESSION_COOKIE_AGE
+        request.session.set_expiry(system_settings.get('session_timeout_minutes') * 60)
+
+
+def fragment_dependency_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= fragments.IGNORED_FIELDS:
+        return
+    caching.bump(*fragments.groups_for(instance))
+
+
+for model in fragments.DEPENDENCIES:
+    post_save.connect(fragment_dependency_changed, sender=model, dispatch_uid=f'fragments_save_{model._meta.label}')
+    post_delete.connect(fragment_dependency_changed, sender=model, dispatch_uid=f'fragments_delete_{model._meta.label}')
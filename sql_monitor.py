@@ -0,0 +1,201 @@
+"""
+Per-request SQL instrumentation
+
+SQLInstrumentationMiddleware wraps every database connection with an
+execute_wrapper for a sampled fraction of requests and records, per request:
+
+- query count and total database time
+- repeated statements with the same shape (fingerprint), the usual N+1 sign
+- statements slower than a threshold, with the application frames that ran them
+
+Sampled requests get a Server-Timing header, and a summary is kept in a
+bounded in-memory report that admins can read at monitoring/sql/. Requests
+that are not sampled are not wrapped at all, so the cost with a low sample
+rate is one random() call per request.
+
+Enable it with 'teacher.middleware.SQLInstrumentationMiddleware' in
+MIDDLEWARE and tune it with the SQL_MONITOR setting (see DEFAULTS).
+"""
+
+import logging
+import os
+import re
+import sysconfig
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger('teacher.sql')
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Fraction of requests to instrument
+    'SAMPLE_RATE': 0.05,
+    'SLOW_MS': 100,
+    # The same statement shape this many times in one request is reported as N+1
+    'REPEAT_THRESHOLD': 10,
+    # Requests kept in the rolling report, and distinct fingerprints aggregated
+    'REPORT_SIZE': 200,
+    'MAX_FINGERPRINTS': 500,
+    'STACK_DEPTH': 4,
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+# Frames from the standard library, installed packages (Django included) and
+# the instrumentation itself are never reported as a query's origin
+_IGNORED_PATHS = tuple({sysconfig.get_paths()[key] for key in ('stdlib', 'purelib', 'platlib')}) + (
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'middleware.py'),
+)
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'SQL_MONITOR', {})}
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Statement shape with literals and IN-list lengths removed"""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(...)', shape.replace('%s', '?'))
+    return _SPACE.sub(' ', shape).strip()
+
+
+def query_origin(depth=DEFAULTS['STACK_DEPTH']):
+    """The innermost application frames on the current stack, innermost last"""
+    frames = [
+        f'{os.path.relpath(frame.filename)}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if not frame.filename.startswith(_IGNORED_PATHS) and not frame.filename.startswith('<')
+    ]
+    return frames[-depth:]
+
+
+class RequestQueries:
+    """execute_wrapper that accumulates one request's queries"""
+
+    def __init__(self, slow_ms, stack_depth):
+        self.slow_ms = slow_ms
+        self.stack_depth = stack_depth
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            shape = fingerprint(sql)
+            entry = self.fingerprints.get(shape)
+            if entry is None:
+                self.fingerprints[shape] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+            if elapsed >= self.slow_ms:
+                self.slow.append({'sql': sql, 'ms': round(elapsed, 2), 'origin': query_origin(self.stack_depth)})
+
+    def repeated(self, threshold):
+        """[(fingerprint, count, total_ms)] for shapes run at least `threshold` times, worst first"""
+        return sorted(
+            ((shape, count, round(total, 2)) for shape, (count, total) in self.fingerprints.items()
+             if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def instrument(self):
+        """Context manager wrapping every configured connection"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class Report:
+    """Rolling in-memory report shared by the threads of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, size=DEFAULTS['REPORT_SIZE']):
+        with self.lock:
+            self.requests = deque(maxlen=size)
+            self.fingerprints = {}
+            self.since = timezone.now()
+
+    def add(self, summary, queries, options):
+        max_fingerprints = options['MAX_FINGERPRINTS']
+        with self.lock:
+            if self.requests.maxlen != options['REPORT_SIZE']:
+                self.requests = deque(self.requests, maxlen=options['REPORT_SIZE'])
+            self.requests.append(summary)
+            for shape, (count, total) in queries.fingerprints.items():
+                entry = self.fingerprints.get(shape)
+                if entry is None:
+                    if len(self.fingerprints) >= max_fingerprints:
+                        continue
+                    entry = self.fingerprints[shape] = {'fingerprint': shape, 'count': 0, 'total_ms': 0.0,
+                                                        'requests': 0, 'max_per_request': 0}
+                entry['count'] += count
+                entry['total_ms'] += total
+                entry['requests'] += 1
+                entry['max_per_request'] = max(entry['max_per_request'], count)
+
+    def snapshot(self, limit=50):
+        with self.lock:
+            fingerprints = sorted(self.fingerprints.values(), key=lambda entry: -entry['total_ms'])[:limit]
+            fingerprints = [{**entry, 'total_ms': round(entry['total_ms'], 2)} for entry in fingerprints]
+        requests = list(self.requests)
+        requests.reverse()
+        return {'since': self.since, 'requests': requests, 'fingerprints': fingerprints}
+
+
+report = Report()
+
+
+def summarize(request, response, queries, total_ms, repeat_threshold):
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'at': timezone.now(),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else '',
+        'status': response.status_code,
+        'queries': queries.count,
+        'db_ms': round(queries.total_ms, 2),
+        'total_ms': round(total_ms, 2),
+        'repeated': queries.repeated(repeat_threshold)[:5],
+        'slow': queries.slow[:5],
+    }
+
+
+def log_findings(summary):
+    for shape, count, total in summary['repeated']:
+        logger.warning('Possible N+1 in %s %s: %d x %s (%.1fms)', summary['method'], summary['path'],
+                       count, shape, total)
+    for query in summary['slow']:
+        logger.warning('Slow query (%.1fms) in %s %s: %s\n  %s', query['ms'], summary['method'],
+                       summary['path'], query['sql'], '\n  '.join(query['origin']))
+
+
+def server_timing(queries, total_ms):
+    return (f'db;dur={queries.total_ms:.2f};desc="{queries.count} queries", '
+            f'app;dur={max(0.0, total_ms - queries.total_ms):.2f}')
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Load test for login throttling: one legitimate user logs in repeatedly while
+attacker threads post credential-stuffing attempts (many usernames, a few
+addresses) at a fixed total rate to the same login view, hashed with PBKDF2
+as in production. The attack is paced because the clients share this
+process: unpaced, their own request building would take the CPU the server
+is being measured on.
+It runs without an attack, under attack without throttling, and under attack
+with LoginThrottleMiddleware, and reports the legitimate login latency and
+how many attempts reached password hashing in each run.
+
+The limits are scaled down (LIMITS) so the attack uses up its allowance in
+seconds rather than after a full window of hashing; the throttled run
+measures the legitimate user once the attacker addresses are being rejected.
+"""
+
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, override_settings
+from django.urls import path
+
+ATTACKERS = int(os.environ.get('STRESS_LOGIN_ATTACKERS', 8))
+ATTACKER_IPS = 4
+ATTACK_RATE = float(os.environ.get('STRESS_LOGIN_RATE', 100))
+SECONDS = float(os.environ.get('STRESS_LOGIN_SECONDS', 5))
+LEGIT_PAUSE = 0.2
+LIMITS = {'ip': 5, 'user_ip': 5, 'user': 50}
+WARMUP_TIMEOUT = 120
+USERNAME = 'stress_login_user'
+PASSWORD = 'correct horse battery staple'
+BASE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+
+def login_view(request):
+    # Only checks the password: a session login would add the same cost to every run
+    user = authenticate(request, username=request.POST.get('username'), password=request.POST.get('password'))
+    return HttpResponse(status=200 if user is not None else 401)
+
+
+urlpatterns = [path('login/', login_view, name='login')]
+
+
+def legit(stop, latencies, failures):
+    client = Client(REMOTE_ADDR='192.168.1.10')
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = client.post('/login/', {'username': USERNAME, 'password': PASSWORD})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            failures.append(response.status_code)
+        time.sleep(LEGIT_PAUSE)
+
+
+def attacker(index, stop, outcomes, rejected):
+    client = Client(REMOTE_ADDR=f'203.0.113.{index % ATTACKER_IPS + 1}')
+    interval = ATTACKERS / ATTACK_RATE
+    attempt = 0
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        attempt += 1
+        response = client.post('/login/', {'username': f'victim{index}_{attempt}', 'password': 'hunter2'})
+        outcomes.append(response.status_code)
+        if response.status_code == 429:
+            rejected.add(index)
+        next_at += interval
+        stop.wait(max(0, next_at - time.perf_counter()))
+
+
+def run(label, attackers, throttle):
+    cache.clear()
+    middleware = BASE_MIDDLEWARE + (['teacher.middleware.LoginThrottleMiddleware'] if throttle else [])
+    latencies, failures, outcomes, rejected = [], [], [], set()
+    stop = threading.Event()
+    with override_settings(MIDDLEWARE=middleware):
+        threads = [threading.Thread(target=attacker, args=(i, stop, outcomes, rejected)) for i in range(attackers)]
+        for thread in threads:
+            thread.start()
+        if throttle and attackers:
+            # Let the attack use up its allowance: once every attacker has been
+            # rejected none of them is still hashing
+            deadline = time.monotonic() + WARMUP_TIMEOUT
+            while len(rejected) < attackers and time.monotonic() < deadline:
+                time.sleep(0.1)
+        threads.append(threading.Thread(target=legit, args=(stop, latencies, failures)))
+        threads[-1].start()
+        time.sleep(SECONDS)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    p50 = statistics.median(latencies) * 1000
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else p50
+    hashed, rejected = outcomes.count(401), outcomes.count(429)
+    print(f"  {label:<22} legit p50 {p50:>7.1f} ms  p95 {p95:>7.1f} ms  logins {len(latencies):>3}  "
+          f"attack hashed {hashed:>4}  rejected {rejected:>6}")
+    return p50, p95, hashed, failures
+
+
+def run_benchmark():
+    # Every failed attempt would log a 401 warning
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    print("🛡️ Login throttling load test")
+    print("=" * 50)
+    print(f"Attackers: {ATTACKERS} threads from {ATTACKER_IPS} addresses at {ATTACK_RATE:.0f} attempts/s  "
+          f"Duration: {SECONDS:.0f}s per run")
+
+    User = get_user_model()
+    with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher'],
+                           SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+                           ROOT_URLCONF=__name__, LOGIN_THROTTLE={'LIMITS': LIMITS}):
+        User.objects.filter(username=USERNAME).delete()
+        User.objects.create_user(username=USERNAME, password=PASSWORD, role='teacher')
+        try:
+            baseline, _, _, _ = run('no attack', 0, throttle=True)
+            unthrottled, _, _, _ = run('attack, no throttle', ATTACKERS, throttle=False)
+            throttled, throttled_p95, hashed, failures = run('attack, throttled', ATTACKERS, throttle=True)
+        finally:
+            User.objects.filter(username=USERNAME).delete()
+
+    allowed = LIMITS['ip'] * ATTACKER_IPS
+    if failures:
+        print(f"❌ The legitimate user was rejected {len(failures)} times")
+        sys.exit(1)
+    if hashed > allowed:
+        print(f"❌ {hashed} attack attempts were hashed; the limit allows {allowed}")
+        sys.exit(1)
+    # Rejected attempts are cheap but not free, and the clients run in this process too
+    if throttled > 2 * baseline:
+        print(f"❌ Legitimate p50 under attack {throttled:.0f} ms vs {baseline:.0f} ms without")
+        sys.exit(1)
+    print(f"✅ Legitimate logins hold their latency under attack (p50 {throttled:.0f} ms, p95 {throttled_p95:.0f} ms "
+          f"vs p50 {unthrottled:.0f} ms unthrottled)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
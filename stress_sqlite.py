@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Concurrency stress test for the SQLite backend: several processes write to
+one database file at a target total rate with the project's write mix
+(single attendance marks in autocommit, read-then-write transactions and
+occasional bulk updates). Django's stock backend is run first for
+comparison, then teacher.db_backends.sqlite3, which must finish with no
+"database is locked" errors and reach the target rate.
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Setup Django environment
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_classroom.settings')
+
+import django
+django.setup()
+
+from django.db import OperationalError, connections, transaction
+
+from teacher import metrics
+
+WORKERS = int(os.environ.get('STRESS_WORKERS', 16))
+RATE = int(os.environ.get('STRESS_RATE', 1000))
+SECONDS = float(os.environ.get('STRESS_SECONDS', 10))
+STUDENTS = 500
+SESSIONS = 50
+ALIAS = 'stress'
+
+SCHEMA = [
+    'CREATE TABLE marks (student INTEGER, session INTEGER, status TEXT, PRIMARY KEY (student, session))',
+    'CREATE TABLE totals (student INTEGER PRIMARY KEY, marks INTEGER)',
+]
+
+
+def use_database(engine, path):
+    databases = connections.configure_settings({'default': {}, ALIAS: {'ENGINE': engine, 'NAME': path}})
+    connections.settings[ALIAS] = databases[ALIAS]
+    # Drop any wrapper left from the previous engine
+    try:
+        del connections[ALIAS]
+    except AttributeError:
+        pass
+
+
+def mark(cursor, rng):
+    cursor.execute(
+        'INSERT INTO marks (student, session, status) VALUES (%s, %s, %s) '
+        'ON CONFLICT (student, session) DO UPDATE SET status = excluded.status',
+        [rng.randrange(STUDENTS), rng.randrange(SESSIONS), rng.choice(['present', 'late', 'absent'])],
+    )
+
+
+def recount(cursor, rng):
+    # Reads first and then writes: under a deferred BEGIN two of these
+    # deadlock on the lock upgrade and one fails immediately
+    student = rng.randrange(STUDENTS)
+    with transaction.atomic(using=ALIAS):
+        cursor.execute('SELECT COUNT(*) FROM marks WHERE student = %s', [student])
+        count = cursor.fetchone()[0]
+        cursor.execute('INSERT INTO totals (student, marks) VALUES (%s, %s) '
+                       'ON CONFLICT (student) DO UPDATE SET marks = excluded.marks', [student, count])
+
+
+def bulk_update(cursor, rng):
+    with transaction.atomic(using=ALIAS):
+        cursor.execute("UPDATE marks SET status = 'present' WHERE session = %s", [rng.randrange(SESSIONS)])
+
+
+OPERATIONS = [(mark, 0.70), (recount, 0.25), (bulk_update, 0.05)]
+
+
+def worker(args):
+    engine, path, seed = args
+    use_database(engine, path)
+    rng = random.Random(seed)
+    interval = WORKERS / RATE
+    done = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+    next_at = time.perf_counter()
+    with connections[ALIAS].cursor() as cursor:
+        while time.perf_counter() < deadline:
+            operation = rng.choices([op for op, _ in OPERATIONS], [w for _, w in OPERATIONS])[0]
+            start = time.perf_counter()
+            try:
+                operation(cursor, rng)
+                done += 1
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+    connections[ALIAS].close()
+    retries = sum(value for (name, _), value in metrics.registry.counters.items()
+                  if name == 'sqlite_lock_retries_total')
+    return done, errors, retries, latencies
+
+
+def run(engine):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stress.sqlite3')
+        use_database(engine, path)
+        with connections[ALIAS].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        connections[ALIAS].close()
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(WORKERS) as pool:
+            results = pool.map(worker, [(engine, path, seed) for seed in range(WORKERS)])
+        elapsed = time.perf_counter() - start
+
+    done = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    retries = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    rate = done / elapsed
+    print(f"  {engine:<32} {rate:>7.1f} writes/s  p95 {p95:>7.1f} ms  "
+          f"{errors:>5} lock errors  {retries:>5} retries")
+    return rate, errors
+
+
+def run_stress():
+    print("🗄️  SQLite write concurrency stress test")
+    print("=" * 50)
+    print(f"Workers: {WORKERS}  Target: {RATE} writes/s  Duration: {SECONDS:.0f}s")
+
+    run('django.db.backends.sqlite3')
+    rate, errors = run('teacher.db_backends.sqlite3')
+
+    if errors:
+        print(f"❌ {errors} writes failed with 'database is locked'")
+        sys.exit(1)
+    if rate < RATE * 0.9:
+        print(f"❌ Reached {rate:.0f} writes/s, below the {RATE} writes/s target")
+        sys.exit(1)
+    print("✅ No lock errors at the target write rate")
+
+
+if __name__ == '__main__':
+    run_stress()
@@ -0,0 +1,151 @@
+"""
+Typed system settings
+
+The values edited on the system configuration page are declared here with
+their type, default and allowed range, and stored as SystemSetting rows
+only when an administrator overrides the default.
+
+Reads never hit the database per request: each process keeps every value
+in memory together with a version stamp of the table (latest updated_at and
+row count). The stamp is re-checked at most every SYSTEM_SETTINGS_CHECK_SECONDS
+(one small aggregate query), and the values are reloaded only when it has
+changed, so a change made by any worker is seen by every other worker within
+that delay. Writes through update() and reset() refresh the writing process
+immediately.
+
+Besides the attendance views, attendance_threshold is the default of the
+low_attendance automation rule and the risk model's at-risk attendance,
+session_timeout_minutes is the expiry given to sessions at login (signals),
+and cache_timeout_minutes is caching.timeout().
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import SystemSetting
+
+DEFAULT_CHECK_SECONDS = 5
+
+
+class Setting:
+    """One setting: its type, default and the values it accepts"""
+
+    def __init__(self, key, kind, default, label, minimum=None, maximum=None, choices=None):
+        self.key = key
+        self.kind = kind
+        self.default = default
+        self.label = label
+        self.minimum = minimum
+        self.maximum = maximum
+        self.choices = choices
+
+    def clean(self, value):
+        """The value converted to the setting's type; ValueError if it is not allowed"""
+        try:
+            value = self.kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{self.label} must be a {self.kind.__name__}')
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f'{self.label} must be one of {", ".join(str(c) for c in self.choices)}')
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f'{self.label} must be at least {self.minimum}')
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f'{self.label} must be at most {self.maximum}')
+        return value
+
+
+SETTINGS = {setting.key: setting for setting in [
+    Setting('attendance_threshold', int, 75, 'Attendance threshold', minimum=50, maximum=100),
+    Setting('late_threshold_minutes', int, 15, 'Late threshold', minimum=1, maximum=60),
+    Setting('session_timeout_minutes', int, 30, 'Session timeout', minimum=5, maximum=480),
+    Setting('cache_timeout_minutes', int, 15, 'Cache timeout', minimum=1, maximum=60),
+    Setting('page_size', int, 25, 'Page size', choices=(10, 25, 50, 100)),
+]}
+
+
+class SettingsCache:
+    """Process-local copy of the settings, revalidated against the table's version stamp"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.values = None
+        self.stamp = None
+        self.checked_at = 0.0
+
+    def check_seconds(self):
+        return getattr(settings, 'SYSTEM_SETTINGS_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+
+    def get(self):
+        values = self.values
+        if values is not None and time.monotonic() - self.checked_at < self.check_seconds():
+            return values
+        with self._lock:
+            if self.values is None or time.monotonic() - self.checked_at >= self.check_seconds():
+                self._revalidate()
+            return self.values
+
+    def _revalidate(self):
+        stamp = SystemSetting.objects.aggregate(updated=Max('updated_at'), rows=Count('id'))
+        stamp = (stamp['updated'], stamp['rows'])
+        if self.values is None or stamp != self.stamp:
+            stored = dict(SystemSetting.objects.values_list('key', 'value'))
+            self.values = {key: _stored_value(setting, stored) for key, setting in SETTINGS.items()}
+            self.stamp = stamp
+        self.checked_at = time.monotonic()
+
+
+def _stored_value(setting, stored):
+    if setting.key not in stored:
+        return setting.default
+    try:
+        return setting.clean(stored[setting.key])
+    except ValueError:
+        # A row written before the allowed range changed
+        return setting.default
+
+
+_cache = SettingsCache()
+
+
+def get(key):
+    """The current value of one setting"""
+    if key not in SETTINGS:
+        raise KeyError(f'Unknown setting: {key}')
+    return _cache.get()[key]
+
+
+def values():
+    """{key: value} for every setting"""
+    return dict(_cache.get())
+
+
+def update(changes, user=None):
+    """
+    Validate and store {key: value} changes; returns the cleaned values.
+    Nothing is stored if any key or value is invalid (ValueError).
+    """
+    unknown = [key for key in changes if key not in SETTINGS]
+    if unknown:
+        raise ValueError(f'Unknown setting: {", ".join(sorted(unknown))}')
+    cleaned = {key: SETTINGS[key].clean(value) for key, value in changes.items()}
+    with transaction.atomic():
+        for key, value in cleaned.items():
+            SystemSetting.objects.update_or_create(key=key, defaults={'value': value, 'updated_by': user})
+    _cache.clear()
+    return cleaned
+
+
+def reset(*keys):
+    """Return settings (all of them without keys) to their defaults"""
+    rows = SystemSetting.objects.all()
+    if keys:
+        rows = rows.filter(key__in=keys)
+    rows.delete()
+    _cache.clear()
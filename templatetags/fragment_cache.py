@@ -0,0 +1,53 @@
+from django import template
+from django.core.cache import cache
+
+from teacher import fragments
+from teacher.metrics import record_cache
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, params, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.params = params
+        self.vary = vary
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        if name not in fragments.FRAGMENTS:
+            raise template.TemplateSyntaxError(f'Unknown fragment {name!r}; declare it in teacher.fragments')
+        params = {key: value.resolve(context) for key, value in self.params.items()}
+        key = fragments.cache_key(name, params, [value.resolve(context) for value in self.vary])
+        content = cache.get(key)
+        record_cache(f'fragment:{name}', content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, fragments.FRAGMENTS[name].timeout)
+        return content
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    """
+    {% fragment "name" param=value ... [vary ...] %} ... {% endfragment %}
+
+    Caches the enclosed output under the versions of the groups the named
+    fragment depends on (see teacher.fragments). Positional arguments after
+    the name are added to the key as they are.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    params = {}
+    vary = []
+    for bit in bits[2:]:
+        key, sep, value = bit.partition('=')
+        if sep:
+            params[key] = parser.compile_filter(value)
+        else:
+            vary.append(parser.compile_filter(bit))
+    return FragmentNode(nodelist, parser.compile_filter(bits[1]), params, vary)
@@ -0,0 +1,29 @@
+from django import template
+
+from teacher import caching
+
+register = template.Library()
+
+
+def _user(context):
+    request = context.get('request')
+    user = getattr(request, 'user', None) or context.get('user')
+    return user if user is not None and user.is_authenticated else None
+
+
+@register.simple_tag(takes_context=True)
+def nav_children(context):
+    """The parent's children menu, from the navigation context processor when it is enabled"""
+    if 'nav_children' in context:
+        return context['nav_children']
+    user = _user(context)
+    return caching.parent_children(user) if user is not None and getattr(user, 'role', None) == 'parent' else []
+
+
+@register.simple_tag(takes_context=True)
+def nav_student(context):
+    """The student's profile and classroom, from the navigation context processor when it is enabled"""
+    if 'nav_student' in context:
+        return context['nav_student']
+    user = _user(context)
+    return caching.student_profile(user) if user is not None and getattr(user, 'role', None) == 'student' else None
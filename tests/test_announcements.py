@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from classroom.models import Announcement, Classroom
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher import announcements
+from teacher.models import AnnouncementCursor
+
+
+@override_settings(ROOT_URLCONF='teacher.urls')
+class AnnouncementTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classes = [Classroom.objects.create(name=f'9{c}', grade='9th', teacher=self.teacher) for c in 'AB']
+        self.student = CustomUser.objects.create_user(username='ada', password='x', role='student')
+        StudentProfile.objects.create(user=self.student, student_id='S1', classroom=self.classes[0])
+        self.parent = CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        ParentProfile.objects.create(user=self.parent).students.add(self.student.student_profile)
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+
+    def test_unread_counts_follow_cursors(self):
+        for i in range(3):
+            announcements.post(f'Class news {i}', self.classes[0])
+        announcements.post('Other class', self.classes[1])
+        announcements.post('School closed Friday')
+        announcements.classroom_ids(self.student)
+        with self.assertNumQueries(1):
+            self.assertEqual(announcements.unread_counts(self.student), {self.classes[0].pk: 3, None: 1})
+        self.assertEqual(announcements.unread_counts(self.parent), {self.classes[0].pk: 3, None: 1})
+        self.assertEqual(announcements.unread_total(self.teacher), 5)
+
+        first = Announcement.objects.filter(classroom=self.classes[0]).order_by('pk').first()
+        announcements.mark_read(self.student, self.classes[0].pk, up_to=first.pk)
+        self.assertEqual(announcements.unread_counts(self.student), {self.classes[0].pk: 2, None: 1})
+        announcements.mark_read(self.student, self.classes[0].pk)
+        announcements.mark_read(self.student)
+        self.assertEqual(announcements.unread_counts(self.student), {})
+        # Cursors never move back, and there is one per stream
+        announcements.mark_read(self.student, self.classes[0].pk, up_to=first.pk)
+        self.assertEqual(announcements.unread_counts(self.student), {})
+        self.assertEqual(AnnouncementCursor.objects.filter(user=self.student).count(), 2)
+        # The parent reads on their own cursors
+        self.assertEqual(announcements.unread_total(self.parent), 4)
+
+    def test_cursor_stops_at_the_newest_announcement(self):
+        first = announcements.post('Class news', self.classes[0])
+        self.assertEqual(announcements.mark_read(self.student, self.classes[0].pk, up_to=first.pk + 1000), first.pk)
+        later = announcements.post('More class news', self.classes[0])
+        self.assertEqual(announcements.unread_counts(self.student), {self.classes[0].pk: 1})
+        # Marking an older id reports where the cursor already is
+        self.assertEqual(announcements.mark_read(self.student, self.classes[0].pk, up_to=first.pk), first.pk)
+        self.assertEqual(announcements.mark_read(self.student, self.classes[0].pk), later.pk)
+        self.assertEqual(announcements.mark_read(self.student, self.classes[0].pk, up_to=first.pk), later.pk)
+
+    def test_school_post_is_one_write_for_any_audience(self):
+        for i in range(20):
+            CustomUser.objects.create_user(username=f'student{i}', password='x', role='student')
+        with self.assertNumQueries(1):
+            announcements.post('Assembly at nine')
+
+    def test_audience_follows_classroom_changes(self):
+        announcements.post('B news', self.classes[1])
+        self.assertEqual(announcements.unread_counts(self.student), {})
+        profile = self.student.student_profile
+        profile.classroom = self.classes[1]
+        profile.save()
+        self.assertEqual(announcements.unread_counts(self.student), {self.classes[1].pk: 1})
+
+    def test_inbox(self):
+        announcements.post('Class news', self.classes[0])
+        school = announcements.post('School news')
+        announcements.mark_read(self.student)
+        self.client.force_login(self.student)
+        data = self.client.get('/announcements/').json()
+        self.assertEqual(data['unread'], {str(self.classes[0].pk): 1})
+        self.assertEqual([(item['stream'], item['unread']) for item in data['announcements']],
+                         [('School', False), ('9A', True)])
+        self.assertEqual(data['announcements'][0]['id'], school.pk)
+
+    def test_views(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.post('/announcements/school/', {'message': 'Hi'}).status_code, 403)
+        self.assertEqual(self.client.post('/announcements/read/', {'classroom': self.classes[1].pk}).status_code, 403)
+        self.assertEqual(self.client.post('/announcements/read/', {'up_to': 'x'}).status_code, 400)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.post('/announcements/school/', {'message': ' '}).status_code, 400)
+        self.assertEqual(self.client.post('/announcements/school/', {'message': 'Hi'}).status_code, 201)
+
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get('/announcements/').json()['total_unread'], 1)
+        self.assertEqual(self.client.post('/announcements/read/').json()['stream'], 'school')
+        self.assertEqual(self.client.get('/announcements/').json()['total_unread'], 0)
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from users.models import CustomUser
+from teacher import api_auth
+
+
+class CachedJWTTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        api_auth.users.clear()
+        self.addCleanup(api_auth.users.clear)
+        self.user = CustomUser.objects.create_user(username='teacher', password='secret', role='teacher')
+
+    def token(self, user=None):
+        return str(api_auth.VersionedTokenObtainPairSerializer.get_token(user or self.user).access_token)
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return api_auth.CachedJWTAuthentication().authenticate(request)[0]
+
+
+class CachedJWTAuthenticationTest(CachedJWTTestCase):
+    def test_repeat_requests_skip_the_user_query(self):
+        token = self.token()
+        self.assertEqual(self.authenticate(token), self.user)
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                user = self.authenticate(token)
+        self.assertEqual(user.role, 'teacher')
+        self.assertIsNot(user, self.authenticate(token))
+
+    def test_revoked_tokens_are_rejected(self):
+        token = self.token()
+        self.authenticate(token)
+        self.assertEqual(api_auth.revoke_tokens(self.user.pk), 1)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        self.assertEqual(self.authenticate(self.token()), self.user)
+
+    def test_revocation_survives_cache_loss(self):
+        token = self.token()
+        api_auth.revoke_tokens(self.user.pk)
+        cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_credential_changes_revoke_tokens(self):
+        token = self.token()
+        self.authenticate(token)
+        self.user.set_password('changed')
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+        for flag in ('is_staff', 'is_superuser'):
+            token = self.token()
+            setattr(self.user, flag, True)
+            self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+
+        token = self.token()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_other_saves_keep_tokens(self):
+        token = self.token()
+        self.authenticate(token)
+        self.user.first_name = 'Ada'
+        self.user.save()
+        self.assertEqual(self.authenticate(token), self.user)
+
+    def test_users_loaded_with_deferred_credentials(self):
+        self.assertEqual([user.pk for user in CustomUser.objects.only('id')], [self.user.pk])
+        token = self.token()
+        user = CustomUser.objects.only('id', 'first_name').get(pk=self.user.pk)
+        user.first_name = 'Ada'
+        user.save()
+        self.assertEqual(self.authenticate(token), self.user)
+
+        user = CustomUser.objects.only('id').get(pk=self.user.pk)
+        user.set_password('changed')
+        user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_deleted_users_are_not_served_from_the_cache(self):
+        token = self.token()
+        self.authenticate(token)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_lru_is_bounded(self):
+        lru = api_auth.UserCache(max_size=2)
+        for user_id in (1, 2, 3):
+            lru.put(user_id, f'user{user_id}', 0, expires_at=2 ** 40)
+        self.assertEqual(len(lru), 2)
+        self.assertIsNone(lru.get(1, 0))
+        self.assertEqual(lru.get(3, 0), 'user3')
+        self.assertIsNone(lru.get(3, 1))
+        lru.put(4, 'user4', 0, expires_at=0)
+        self.assertIsNone(lru.get(4, 0))
+
+
+class ApiViewTest(CachedJWTTestCase):
+    def test_polling_costs_only_the_list_query(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token()}')
+        url = reverse('assignment-list')
+        self.assertEqual(client.get(url).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get(url).status_code, 200)
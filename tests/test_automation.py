@@ -0,0 +1,165 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser
+from teacher import automation, metrics, system_settings
+from teacher.models import AutomationAlert, AutomationRule, AutomationRun
+
+
+class AutomationTestCase(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.now = timezone.now()
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.students = [CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+                         for i in range(3)]
+        self.sessions = [
+            AttendanceSession.objects.create(title=f'Day {i}', classroom=self.classroom, teacher=self.teacher,
+                                             start_time=self.now - timedelta(days=i + 1))
+            for i in range(4)
+        ]
+
+    def mark(self, student, statuses):
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status=status)
+            for session, status in zip(self.sessions, statuses)
+        ])
+
+
+class LowAttendanceRuleTest(AutomationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rule = AutomationRule.objects.create(name='Low attendance', rule_type='low_attendance',
+                                                  params={'threshold': 75})
+        self.mark(self.students[0], ['present'] * 4)
+        self.mark(self.students[1], ['present', 'absent', 'absent', 'late'])
+        self.mark(self.students[2], ['absent', 'present'])
+
+    def test_matches_students_below_threshold_in_one_query(self):
+        with self.assertNumQueries(1):
+            matched = automation.evaluate(self.rule, self.now)
+        self.assertEqual(list(matched), [self.students[1].pk])
+        self.assertEqual(matched[self.students[1].pk][0], 25.0)
+
+    def test_old_sessions_are_ignored(self):
+        self.rule.params = {'days': 2, 'min_sessions': 1}
+        matched = automation.evaluate(self.rule, self.now)
+        self.assertEqual(sorted(matched), [self.students[1].pk, self.students[2].pk])
+
+    def test_threshold_defaults_to_the_system_setting(self):
+        self.addCleanup(system_settings.reset)
+        self.rule.params = {}
+        AttendanceRecord.objects.filter(student=self.students[0], session=self.sessions[0]).update(status='absent')
+        self.assertEqual(list(automation.evaluate(self.rule, self.now)), [self.students[1].pk])
+        system_settings.update({'attendance_threshold': 80})
+        self.assertEqual(sorted(automation.evaluate(self.rule, self.now)), [self.students[0].pk, self.students[1].pk])
+        self.rule.params = {'threshold': 30}
+        self.assertEqual(list(automation.evaluate(self.rule, self.now)), [self.students[1].pk])
+
+    def test_repeat_runs_do_not_repeat_alerts(self):
+        first = automation.run_rule(self.rule, self.now)
+        second = automation.run_rule(self.rule, self.now)
+        self.assertEqual((first.alerts_created, second.alerts_created), (1, 0))
+        self.assertEqual(second.matched, 1)
+        self.assertEqual(AutomationAlert.objects.count(), 1)
+
+    def test_recovered_students_are_resolved_and_can_alert_again(self):
+        automation.run_rule(self.rule, self.now)
+        AttendanceRecord.objects.filter(student=self.students[1]).update(status='present')
+        run = automation.run_rule(self.rule, self.now)
+        self.assertEqual(run.alerts_resolved, 1)
+        AttendanceRecord.objects.filter(student=self.students[1]).update(status='absent')
+        automation.run_rule(self.rule, self.now)
+        self.assertEqual(AutomationAlert.objects.filter(user=self.students[1]).count(), 2)
+        self.assertEqual(AutomationAlert.objects.filter(resolved_at__isnull=True).count(), 1)
+
+    def test_runs_are_timed(self):
+        run = automation.run_rule(self.rule, self.now)
+        self.assertGreater(run.duration_ms, 0)
+        self.assertIn(f'automation_rule_duration_seconds_count{{rule="{self.rule.pk}",rule_type="low_attendance",'
+                      'outcome="completed"} 1',
+                      metrics.exposition())
+
+
+class RuleTypesTest(AutomationTestCase):
+    def test_missing_attendance_matches_teachers(self):
+        self.mark(self.students[0], ['present', 'present'])
+        rule = AutomationRule(rule_type='missing_attendance', params={'hours': 72})
+        self.assertEqual(automation.evaluate(rule, self.now), {
+            self.teacher.pk: (1, '1 session(s) without attendance in the last 72 hours'),
+        })
+
+    def test_low_grades(self):
+        subject = Subject.objects.create(name='Maths')
+        for student, percentages in ((self.students[0], [90, 80]), (self.students[1], [50, 40]),
+                                     (self.students[2], [10])):
+            for percentage in percentages:
+                Grade.objects.create(student=student, subject=subject, teacher=self.teacher, title='Quiz',
+                                     grade_type='quiz', points_earned=percentage, points_possible=100,
+                                     percentage=percentage, date_assigned=date.today())
+        rule = AutomationRule(rule_type='low_grades')
+        self.assertEqual(list(automation.evaluate(rule, self.now)), [self.students[1].pk])
+
+    def test_failed_rules_are_logged(self):
+        rule = AutomationRule.objects.create(name='Broken', rule_type='nope')
+        with self.assertLogs('teacher.automation', 'ERROR'):
+            run = automation.run_rule(rule, self.now)
+        self.assertFalse(run.succeeded)
+        self.assertIn('Unknown rule type', run.error)
+
+
+class ScheduleTest(AutomationTestCase):
+    def test_only_due_rules_run(self):
+        automation.install_default_rules()
+        self.assertEqual(len(automation.run_due_rules(self.now)), 3)
+        self.assertEqual(automation.run_due_rules(self.now + timedelta(minutes=5)), [])
+        runs = automation.run_due_rules(self.now + timedelta(minutes=61))
+        self.assertEqual([run.rule.rule_type for run in runs], ['missing_attendance'])
+
+    def test_inactive_rules_are_skipped(self):
+        AutomationRule.objects.create(name='Off', rule_type='low_attendance', status='inactive')
+        self.assertEqual(automation.run_due_rules(self.now, force=True), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('run_automation', install_defaults=True, stdout=out)
+        self.assertIn('Installed 3 default rules', out.getvalue())
+        self.assertEqual(AutomationRun.objects.count(), 3)
+
+
+class AutomationViewTest(AutomationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.rule = AutomationRule.objects.create(name='Low attendance', rule_type='low_attendance')
+
+    def test_admins_only(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.post(reverse('automation_rules')).status_code, 403)
+
+    def test_run_all_and_toggle(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('automation_rules'), {'action': 'run'})
+        self.assertRedirects(response, reverse('automation_rules'), fetch_redirect_response=False)
+        self.assertEqual(AutomationRun.objects.filter(rule=self.rule).count(), 1)
+
+        response = self.client.post(reverse('automation_rules'), {'action': 'toggle', 'rule_id': self.rule.pk})
+        self.assertEqual(response.json()['status'], 'inactive')
+
+    def test_toggle_rejects_malformed_rule_ids(self):
+        self.client.force_login(self.admin)
+        for rule_id in ('', 'abc', '1.5'):
+            response = self.client.post(reverse('automation_rules'), {'action': 'toggle', 'rule_id': rule_id})
+            self.assertEqual(response.status_code, 400)
+        self.rule.refresh_from_db()
+        self.assertEqual(self.rule.status, 'active')
@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase, TestCase
+
+from teacher import benchmarks
+from teacher.loadgen import LoadGenerator
+
+
+class RunScenariosTest(TestCase):
+    def test_measures_installed_endpoints_and_skips_the_rest(self):
+        LoadGenerator(prefix='bench', students=40, attendance_records=200, grades=50,
+                      feedback_responses=20).generate()
+        scenarios = [
+            ('api_gradebook', 'gradebook-list', 'teacher', ()),
+            ('missing', 'no-such-url', 'teacher', ()),
+            ('no_data', 'gradebook-list', 'admin', ()),
+        ]
+        results = benchmarks.run_scenarios(benchmarks.fixture_context('bench'), iterations=3, warmup=1,
+                                           scenarios=scenarios)
+
+        self.assertEqual(set(results['api_gradebook']), {'p50_ms', 'p95_ms', 'queries', 'peak_kb'})
+        self.assertGreater(results['api_gradebook']['queries'], 0)
+        self.assertIn('not installed', results['missing']['skipped'])
+        self.assertIn('skipped', results['no_data'])
+
+
+class CompareTest(SimpleTestCase):
+    baseline = {'dataset': {}, 'results': {'view': {'p50_ms': 10, 'p95_ms': 20, 'queries': 5, 'peak_kb': 100}}}
+
+    def result(self, **changes):
+        return {'view': {**self.baseline['results']['view'], **changes}}
+
+    def test_within_budget(self):
+        self.assertEqual(benchmarks.compare(self.result(p95_ms=29, peak_kb=180), self.baseline), [])
+
+    def test_any_extra_query_is_a_regression(self):
+        self.assertEqual(len(benchmarks.compare(self.result(queries=6), self.baseline)), 1)
+
+    def test_latency_and_memory_regressions(self):
+        regressions = benchmarks.compare(self.result(p95_ms=31, peak_kb=200), self.baseline)
+        self.assertEqual(len(regressions), 2)
@@ -0,0 +1,181 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher import jobs, parent_access
+from teacher.bulk_import import import_csv
+from teacher.models import DataJob, GradebookEntry
+
+STUDENTS_CSV = """username,first_name,last_name,email,student_id,classroom,parent_username,password
+amy,Amy,Adams,amy@example.com,S001,9A,parent,secret123
+ben,Ben,Brown,,S002,,,
+"""
+
+
+class BulkImportTest(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.subject = Subject.objects.create(name='Maths', description='')
+        parent = CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        self.parent = ParentProfile.objects.create(user=parent)
+
+    def import_text(self, dataset, text, **kwargs):
+        return import_csv(dataset, io.StringIO(text), **kwargs)
+
+    def test_students_created_with_profile_classroom_and_parent(self):
+        result = self.import_text('students', STUDENTS_CSV)
+
+        self.assertEqual((result.created, result.updated, result.errors), (2, 0, []))
+        amy = CustomUser.objects.get(username='amy')
+        self.assertEqual(amy.role, 'student')
+        self.assertTrue(amy.check_password('secret123'))
+        self.assertEqual(amy.student_profile.classroom, self.classroom)
+        self.assertEqual(list(self.parent.students.all()), [amy.student_profile])
+        self.assertFalse(CustomUser.objects.get(username='ben').has_usable_password())
+
+    def test_parent_links_retire_cached_children(self):
+        cache.clear()
+        self.assertEqual(parent_access.children_ids(self.parent.user), frozenset())
+        self.import_text('students', STUDENTS_CSV)
+        amy = CustomUser.objects.get(username='amy')
+        self.assertEqual(parent_access.children_ids(self.parent.user), {amy.pk})
+
+    def test_reimport_updates_without_resetting_passwords(self):
+        self.import_text('students', STUDENTS_CSV)
+        result = self.import_text('students', STUDENTS_CSV.replace('Adams', 'Archer').replace('secret123', 'other'))
+
+        self.assertEqual((result.created, result.updated), (0, 2))
+        amy = CustomUser.objects.get(username='amy')
+        self.assertEqual(amy.last_name, 'Archer')
+        self.assertTrue(amy.check_password('secret123'))
+        self.assertEqual(StudentProfile.objects.count(), 2)
+        self.assertEqual(self.parent.students.count(), 1)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        text = STUDENTS_CSV + (
+            'teacher,T,T,,S003,,,\n'
+            'cat,Cat,Cole,,S001,,,\n'
+            'dan,Dan,Dunn,,S004,10B,nobody,\n'
+            ',Eve,Evans,,S005,,,\n'
+        )
+        result = self.import_text('students', text)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.failed, 4)
+        self.assertEqual(sorted({error['line'] for error in result.errors}), [4, 5, 6, 7])
+        self.assertIn('Unknown classroom: 10B', [error['message'] for error in result.errors])
+        self.assertEqual(CustomUser.objects.get(username='teacher').role, 'teacher')
+
+    def test_classroom_moves_rerank_both_gradebooks(self):
+        self.import_text('students', STUDENTS_CSV)
+        amy = CustomUser.objects.get(username='amy')
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=amy, subject=self.subject, teacher=self.teacher, title='Quiz',
+                                 grade_type='quiz', points_earned=8, points_possible=10, percentage=80,
+                                 date_assigned=timezone.localdate())
+        other = Classroom.objects.create(name='9B', grade='9th', teacher=self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_text('students', STUDENTS_CSV.replace(',9A,', ',9B,'))
+        self.assertEqual(list(GradebookEntry.objects.values_list('classroom', 'student')), [(other.pk, amy.pk)])
+
+    def test_missing_columns_rejects_the_file(self):
+        result = self.import_text('grades', 'student,subject\namy,Maths\n')
+        self.assertEqual(result.rows, 0)
+        self.assertIn('Missing columns', result.errors[0]['message'])
+
+    def test_grades_upsert_in_bulk(self):
+        self.import_text('students', STUDENTS_CSV)
+        header = 'student,subject,teacher,title,grade_type,points_earned,points_possible,date_assigned\n'
+        rows = ''.join(f'amy,Maths,teacher,Quiz {i},quiz,{i},10,2025-03-01\n' for i in range(1, 11))
+
+        with self.assertNumQueries(8):
+            result = self.import_text('grades', header + rows)
+        self.assertEqual(result.created, 10)
+
+        result = self.import_text('grades', header + 'amy,Maths,teacher,Quiz 1,quiz,9,10,2025-03-01\n'
+                                  'amy,Maths,teacher,Quiz 99,test,x,10,2025-13-01\n')
+        self.assertEqual((result.created, result.updated, result.failed), (0, 1, 1))
+        self.assertEqual(len(result.errors), 3)
+        grade = Grade.objects.get(title='Quiz 1')
+        self.assertEqual((grade.points_earned, grade.percentage), (9, 90))
+        self.assertEqual(Grade.objects.count(), 10)
+
+    def test_unstorable_points_are_row_errors(self):
+        self.import_text('students', STUDENTS_CSV)
+        header = 'student,subject,teacher,title,grade_type,points_earned,points_possible,date_assigned\n'
+        cases = {
+            'NaN,10': 'points_earned must be a number',
+            '5,Infinity': 'points_possible must be a number',
+            '1e40,10': 'points_earned is too large',
+            '-50,10': 'points_earned must not be negative',
+            '5,NaN': 'points_possible must be a number',
+            '500,1': 'points_earned of 500 out of 1 is not a storable percentage',
+        }
+        rows = ''.join(f'amy,Maths,teacher,Quiz {i},quiz,{points},2025-03-01\n' for i, points in enumerate(cases))
+        result = self.import_text('grades', header + rows + 'amy,Maths,teacher,Extra,quiz,11,10,2025-03-01\n')
+        self.assertEqual((result.created, result.failed), (1, len(cases)))
+        self.assertEqual([error['message'] for error in result.errors], list(cases.values()))
+        self.assertEqual(Grade.objects.get().percentage, 110)
+
+    def test_attendance_upserts_by_session_and_student(self):
+        self.import_text('students', STUDENTS_CSV)
+        session = AttendanceSession.objects.create(
+            title='Maths', classroom=self.classroom, teacher=self.teacher, start_time=timezone.now())
+        header = 'session_id,student,status\n'
+
+        self.import_text('attendance', header + f'{session.pk},amy,present\n{session.pk},ben,absent\n')
+        result = self.import_text('attendance', header + f'{session.pk},ben,late\n{session.pk},amy,gone\n')
+
+        self.assertEqual((result.created, result.updated, result.failed), (0, 1, 1))
+        self.assertEqual(
+            dict(AttendanceRecord.objects.values_list('student__username', 'status')),
+            {'amy': 'present', 'ben': 'late'},
+        )
+
+
+class ImportJobTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(DATA_JOBS_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.client.force_login(self.admin)
+
+    def test_upload_is_imported_by_worker_with_error_report(self):
+        upload = SimpleUploadedFile('students.csv', (STUDENTS_CSV + 'cat,Cat,Cole,,S009,10B,,\n').encode())
+        response = self.client.post(reverse('data_job_import'), {'type': 'students', 'file': upload})
+        self.assertEqual(response.status_code, 202)
+        job = DataJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual((job.kind, job.status), ('import', 'queued'))
+
+        jobs.work(once=True)
+
+        status = self.client.get(reverse('data_job_status', args=[job.id])).json()
+        self.assertEqual(status['status'], 'completed')
+        # No parent profile exists, so amy is rejected along with cat
+        self.assertEqual(status['result'], {'rows': 3, 'created': 1, 'updated': 0, 'failed': 2})
+        report = b''.join(self.client.get(status['download_url']).streaming_content).decode()
+        self.assertIn('Unknown classroom: 10B', report)
+
+    def test_unknown_type_is_rejected(self):
+        upload = SimpleUploadedFile('x.csv', b'a\n1\n')
+        response = self.client.post(reverse('data_job_import'), {'type': 'teachers', 'file': upload})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,101 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+
+from classroom.models import Classroom
+from subject.models import Subject
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher import caching
+
+
+class ReferenceListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        Subject.objects.create(name='Maths', description='')
+
+    def test_warm_lists_cost_no_queries(self):
+        caching.classrooms()
+        caching.subjects()
+        with self.assertNumQueries(0):
+            self.assertEqual(caching.classrooms(), [{'id': self.classroom.pk, 'name': '9A'}])
+            self.assertEqual([subject['name'] for subject in caching.subjects()], ['Maths'])
+
+    def test_save_and_delete_invalidate(self):
+        caching.classrooms()
+        self.classroom.name = '9B'
+        self.classroom.save()
+        self.assertEqual(caching.classrooms()[0]['name'], '9B')
+        self.classroom.delete()
+        self.assertEqual(caching.classrooms(), [])
+
+    def test_other_groups_stay_cached(self):
+        caching.subjects()
+        Classroom.objects.create(name='9C', grade='9th', teacher=self.teacher)
+        with self.assertNumQueries(0):
+            caching.subjects()
+
+
+class NavigationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.parent = CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        self.profile = ParentProfile.objects.create(user=self.parent)
+        self.child = CustomUser.objects.create_user(username='kid', password='x', role='student',
+                                                    first_name='Ada', last_name='L')
+        self.student = StudentProfile.objects.create(user=self.child, student_id='S1')
+        self.profile.students.add(self.student)
+        self.factory = RequestFactory()
+
+    def context(self, user):
+        request = self.factory.get('/')
+        request.user = user
+        return caching.navigation(request)
+
+    def test_parent_children_are_cached(self):
+        self.assertEqual(list(self.context(self.parent)['nav_children']), [{'id': self.child.pk, 'name': 'Ada L'}])
+        with self.assertNumQueries(0):
+            list(self.context(self.parent)['nav_children'])
+
+    def test_linking_and_renaming_invalidate(self):
+        caching.parent_children(self.parent)
+        self.profile.students.remove(self.student)
+        self.assertEqual(caching.parent_children(self.parent), [])
+        self.profile.students.add(self.student)
+        self.child.first_name = 'Grace'
+        self.child.save()
+        self.assertEqual(caching.parent_children(self.parent)[0]['name'], 'Grace L')
+
+    def test_logins_do_not_invalidate(self):
+        caching.parent_children(self.parent)
+        self.child.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            caching.parent_children(self.parent)
+
+    def test_student_profile(self):
+        profile = self.context(self.child)['nav_student']
+        self.assertEqual(profile.student_id, 'S1')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.context(self.child)['nav_student'].student_id, 'S1')
+
+    def test_context_is_lazy_and_role_specific(self):
+        with self.assertNumQueries(0):
+            self.context(self.parent)
+        self.assertEqual(self.context(AnonymousUser()), {})
+        self.assertEqual(self.context(CustomUser(role='teacher')), {})
+
+    def test_template_tags_work_without_the_context_processor(self):
+        template = Template('{% load navigation %}{% nav_children as children %}{% nav_student as student %}'
+                            '{% for child in children %}{{ child.name }}{% endfor %}|{{ student.student_id }}')
+        request = self.factory.get('/')
+        request.user = self.parent
+        self.assertEqual(template.render(Context({'request': request})), 'Ada L|')
+        request.user = self.child
+        self.assertEqual(template.render(Context({'request': request})), '|S1')
+        request.user = AnonymousUser()
+        self.assertEqual(template.render(Context({'request': request})), '|')
+        # The context processor's values are used when it is enabled
+        self.assertEqual(template.render(Context({'request': request, 'nav_children': [{'name': 'Lazy'}]})),
+                         'Lazy|')
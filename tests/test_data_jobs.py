@@ -0,0 +1,112 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from users.models import CustomUser
+from teacher import jobs
+from teacher.models import DataJob
+
+
+class DataJobTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(DATA_JOBS_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        session = AttendanceSession.objects.create(
+            title='Maths', classroom=classroom, teacher=teacher, start_time=timezone.now())
+        students = [CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+                    for i in range(40)]
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status='present') for student in students
+        ])
+        self.client.force_login(self.admin)
+
+    def create_job(self, **data):
+        response = self.client.post(reverse('data_job_create'), {'type': 'attendance', 'format': 'csv', **data})
+        self.assertEqual(response.status_code, 202)
+        return DataJob.objects.get(pk=response.json()['job']['id'])
+
+    def test_request_only_queues_the_job(self):
+        job = self.create_job()
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(self.client.get(reverse('data_job_status', args=[job.id])).json()['percent'], 0)
+
+    def test_worker_runs_job_and_reports_progress(self):
+        job = self.create_job(compress='1')
+        jobs.work(once=True)
+
+        status = self.client.get(reverse('data_job_status', args=[job.id])).json()
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual((status['rows_done'], status['rows_total'], status['percent']), (40, 40, 100))
+
+        response = self.client.get(status['download_url'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(body.splitlines()), 41)
+
+    def test_download_resumes_from_range(self):
+        job = self.create_job()
+        jobs.work(once=True)
+        url = reverse('data_job_download', args=[job.id])
+        full = b''.join(self.client.get(url).streaming_content)
+
+        partial = self.client.get(url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 100-{len(full) - 1}/{len(full)}')
+        self.assertEqual(b''.join(partial.streaming_content), full[100:])
+
+        # A changed file (different ETag) must restart from the beginning
+        stale = self.client.get(url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(full)}-').status_code, 416)
+
+    def test_failed_job_records_error(self):
+        job = DataJob.objects.create(kind='export', job_type='unknown', created_by=self.admin)
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unknown export type', job.error)
+
+    def test_jobs_are_private_to_their_creator(self):
+        job = self.create_job()
+        self.client.force_login(CustomUser.objects.get(username='s0'))
+        self.assertEqual(self.client.get(reverse('data_job_status', args=[job.id])).status_code, 404)
+
+    def test_worker_loop_requeues_abandoned_jobs(self):
+        job = self.create_job()
+        stale = timezone.now() - jobs.STALE_AFTER * 2
+        DataJob.objects.filter(pk=job.pk).update(status='running', worker='dead:1', heartbeat_at=stale)
+        job.refresh_from_db()
+        with open(jobs.partial_path(job), 'wb') as part:
+            part.write(b'half an export')
+
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.rows_done, 40)
+        self.assertEqual(os.listdir(self.root), [job.artifact])
+
+    def test_requeued_job_is_not_overwritten_by_its_old_worker(self):
+        job = self.create_job()
+        job = jobs.claim_next_job('slow:1')
+        # The job looked abandoned and another worker has claimed it since
+        DataJob.objects.filter(pk=job.pk).update(status='queued', worker='')
+        jobs.claim_next_job('fresh:2')
+
+        self.assertFalse(jobs.run_job(job))
+        current = DataJob.objects.get(pk=job.pk)
+        self.assertEqual((current.status, current.worker, current.rows_done), ('running', 'fresh:2', 0))
+        self.assertEqual(current.artifact, '')
+        self.assertEqual(os.listdir(self.root), [])
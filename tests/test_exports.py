@@ -0,0 +1,86 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from users.models import CustomUser
+from teacher import exports
+
+
+class ExportStreamTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        now = timezone.now()
+        self.sessions = [
+            AttendanceSession.objects.create(
+                title=f'Session {day}', classroom=classroom, teacher=teacher,
+                start_time=now - timedelta(days=day),
+            )
+            for day in range(5)
+        ]
+        students = [CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+                    for i in range(5)]
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status='present')
+            for session in self.sessions for student in students
+        ])
+
+    def test_keyset_rows_pages_by_primary_key(self):
+        # 25 rows in pages of 10: three page queries, the last one short
+        with self.assertNumQueries(3):
+            rows = list(exports.keyset_rows(AttendanceRecord.objects.all(), ['id', 'status'], chunk_size=10))
+        self.assertEqual([r[0] for r in rows], sorted(AttendanceRecord.objects.values_list('id', flat=True)))
+
+    def test_csv_export(self):
+        body = b''.join(exports.export_stream(['attendance'], 'csv', chunk_size=7)).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], [c for c, _ in exports.EXPORT_DATASETS['attendance']['fields']])
+        self.assertEqual(len(rows), 26)
+
+    def test_csv_cells_match_the_json_formats(self):
+        when = timezone.now()
+        body = ''.join(exports.encode_csv([('rows', ['when', 'answers', 'tags'], [(when, {'q1': 'yes'}, ['a', 'b'])])]))
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[1], [when.isoformat(), '{"q1": "yes"}', '["a", "b"]'])
+
+    def test_gzip_jsonl_export_with_date_range(self):
+        start = self.sessions[1].start_time.date()
+        blocks = exports.export_stream(['attendance'], 'jsonl', compress=True, start_date=start)
+        lines = gzip.decompress(b''.join(blocks)).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])['status'], 'present')
+
+    def test_json_export_all_sections(self):
+        body = b''.join(exports.export_stream(exports.ALL_DATASETS, 'json'))
+        data = json.loads(body)
+        self.assertEqual(list(data), exports.ALL_DATASETS)
+        self.assertEqual(len(data['attendance']), 25)
+
+    def test_view_streams_for_admins_only(self):
+        url = reverse('export_data') + '?type=attendance&format=csv&compress=1'
+        self.client.force_login(CustomUser.objects.get(username='s0'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(body.splitlines()), 26)
+
+    def test_view_rejects_malformed_dates_before_streaming(self):
+        self.client.force_login(self.admin)
+        for dates in ('start_date=yesterday', 'end_date=2025-02-30'):
+            response = self.client.get(reverse('export_data') + f'?type=attendance&{dates}')
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.streaming)
+        self.assertEqual(self.client.get(reverse('export_data') + '?type=attendance&start_date=2025-01-01').status_code, 200)
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase
+from django.utils import timezone
+
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from subject.models import Subject
+from users.models import CustomUser
+from teacher import fragments
+
+ROW = Template(
+    '{% load fragment_cache %}'
+    '{% fragment "attendance_row" student=row.student.id %}{{ row.student.username }}:{{ row.count }}{% endfragment %}'
+)
+
+CARD = Template(
+    '{% load fragment_cache %}'
+    '{% fragment "parent_child_card" student=child.id %}{{ child.username }}:{{ stats }}{% endfragment %}'
+)
+
+
+class Row:
+    renders = 0
+
+    def __init__(self, student):
+        self.student = student
+
+    @property
+    def count(self):
+        Row.renders += 1
+        return AttendanceRecord.objects.filter(student=self.student).count()
+
+
+class FragmentTagTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Row.renders = 0
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.session = AttendanceSession.objects.create(
+            title='Maths', classroom=classroom, teacher=self.teacher, start_time=timezone.now())
+        self.students = [CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+                         for i in range(2)]
+
+    def render(self, student):
+        return ROW.render(Context({'row': Row(student)}))
+
+    def test_unchanged_rows_come_from_cache(self):
+        self.assertEqual(self.render(self.students[0]), 's0:0')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(self.students[0]), 's0:0')
+        self.assertEqual(Row.renders, 1)
+
+    def test_writes_invalidate_only_the_affected_student(self):
+        for student in self.students:
+            self.render(student)
+        AttendanceRecord.objects.create(session=self.session, student=self.students[0], status='present')
+
+        self.assertEqual(self.render(self.students[0]), 's0:1')
+        self.assertEqual(self.render(self.students[1]), 's1:0')
+        self.assertEqual(Row.renders, 3)
+
+    def test_login_does_not_invalidate(self):
+        self.render(self.students[0])
+        self.students[0].last_login = timezone.now()
+        self.students[0].save(update_fields=['last_login'])
+        self.render(self.students[0])
+        self.assertEqual(Row.renders, 1)
+
+    def test_bulk_writes_invalidate_through_bump_for(self):
+        self.render(self.students[1])
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=self.session, student=self.students[1], status='late'),
+        ])
+        self.assertEqual(self.render(self.students[1]), 's1:0')
+        fragments.bump_for(AttendanceRecord, student_id=[self.students[1].pk])
+        self.assertEqual(self.render(self.students[1]), 's1:1')
+
+    def test_child_card_follows_submissions_and_subjects(self):
+        student = self.students[0]
+        subject = Subject.objects.create(name='Maths')
+        assignment = Assignment.objects.create(title='Homework', classroom=self.session.classroom, subject=subject,
+                                               teacher=self.teacher, due_date=timezone.now())
+
+        def card(stats):
+            return CARD.render(Context({'child': student, 'stats': stats}))
+
+        self.assertEqual(card('pending'), 's0:pending')
+        self.assertEqual(card('stale'), 's0:pending')
+        AssignmentSubmission.objects.create(assignment=assignment, student=student)
+        self.assertEqual(card('completed'), 's0:completed')
+        subject.name = 'Mathematics'
+        subject.save()
+        self.assertEqual(card('renamed'), 's0:renamed')
+
+    def test_unknown_fragment(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load fragment_cache %}{% fragment "nope" %}x{% endfragment %}').render(Context())
+
+    def test_positional_arguments_vary_the_key(self):
+        template = Template('{% load fragment_cache %}'
+                            '{% fragment "attendance_row" lang student=1 %}{{ lang }}{% endfragment %}')
+        self.assertEqual(template.render(Context({'lang': 'en'})), 'en')
+        self.assertEqual(template.render(Context({'lang': 'fr'})), 'fr')
@@ -0,0 +1,181 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser
+from teacher import grade_stats
+from teacher.grade_stats import GradeFrame, GRADE_TYPES, GRADE_TYPE_WEIGHTS
+
+
+def make_rows(count=2000, students=40, subjects=6, seed=7):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    rows = []
+    for _ in range(count):
+        percentage = round(max(0, min(100, rng.normalvariate(78, 12))), 2)
+        possible = rng.choice([10, 20, 25, 50, 100])
+        rows.append((
+            rng.randint(1, students),
+            rng.randint(1, subjects),
+            rng.choice(GRADE_TYPES),
+            Decimal(str(round(percentage / 100 * possible, 2))),
+            Decimal(possible),
+            Decimal(str(percentage)),
+            start + timedelta(days=rng.randint(0, 120)),
+        ))
+    return rows
+
+
+# Row-by-row reference implementations, written the way the grade views
+# compute these values today.
+
+def loop_averages(rows, key):
+    totals = {}
+    for row in rows:
+        total, count = totals.get(key(row), (0.0, 0))
+        totals[key(row)] = (total + float(row[5]), count + 1)
+    return {k: total / count for k, (total, count) in totals.items()}
+
+
+def loop_weighted(rows, key):
+    by_type = {}
+    for row in rows:
+        by_type.setdefault(key(row), {}).setdefault(row[2], []).append(float(row[5]))
+    result = {}
+    for group, types in by_type.items():
+        weighted = total_weight = 0.0
+        for grade_type, values in types.items():
+            weight = GRADE_TYPE_WEIGHTS.get(grade_type, 0.0)
+            weighted += weight * sum(values) / len(values)
+            total_weight += weight
+        if total_weight:
+            result[group] = weighted / total_weight
+        else:
+            result[group] = sum(sum(v) for v in types.values()) / sum(len(v) for v in types.values())
+    return result
+
+
+def loop_points(percentage):
+    if percentage >= 90:
+        return 4.0
+    if percentage >= 80:
+        return 3.0
+    if percentage >= 70:
+        return 2.0
+    if percentage >= 60:
+        return 1.0
+    return 0.0
+
+
+class GradeStatsMatchLoopTest(SimpleTestCase):
+    def setUp(self):
+        self.rows = make_rows()
+        self.frame = GradeFrame.from_rows(self.rows)
+
+    def assertMappingAlmostEqual(self, actual, expected, places=7):
+        self.assertEqual(set(actual), set(expected))
+        for key, value in expected.items():
+            self.assertAlmostEqual(actual[key], value, places=places, msg=key)
+
+    def test_average_percentages(self):
+        self.assertMappingAlmostEqual(
+            grade_stats.average_percentages(self.frame), loop_averages(self.rows, lambda r: r[0]))
+        self.assertMappingAlmostEqual(
+            grade_stats.average_percentages(self.frame, by='subject'), loop_averages(self.rows, lambda r: r[1]))
+
+    def test_weighted_percentages(self):
+        self.assertMappingAlmostEqual(
+            grade_stats.weighted_percentages(self.frame), loop_weighted(self.rows, lambda r: r[0]))
+        self.assertMappingAlmostEqual(
+            grade_stats.weighted_percentages(self.frame, by='student_subject'),
+            loop_weighted(self.rows, lambda r: (r[0], r[1])))
+
+    def test_unweighted_types_fall_back_to_plain_mean(self):
+        rows = [(1, 1, 'extra_credit', Decimal(5), Decimal(10), Decimal('50'), date(2025, 1, 1)),
+                (1, 1, 'extra_credit', Decimal(7), Decimal(10), Decimal('70'), date(2025, 1, 2))]
+        self.assertEqual(grade_stats.weighted_percentages(GradeFrame.from_rows(rows)), {1: 60.0})
+
+    def test_gpa(self):
+        per_subject = loop_weighted(self.rows, lambda r: (r[0], r[1]))
+        points = {}
+        for (student_id, _), percentage in per_subject.items():
+            points.setdefault(student_id, []).append(loop_points(percentage))
+        expected = {s: round(sum(p) / len(p), 2) for s, p in points.items()}
+        self.assertEqual(grade_stats.gpa(self.frame), expected)
+
+    def test_percentile_ranks(self):
+        scores = loop_weighted(self.rows, lambda r: r[0])
+        ranks = grade_stats.percentile_ranks(self.frame)
+        for student_id, score in scores.items():
+            below = sum(1 for s in scores.values() if s < score)
+            equal = sum(1 for s in scores.values() if s == score)
+            above = sum(1 for s in scores.values() if s > score)
+            self.assertEqual(ranks[student_id]['rank'], above + 1)
+            self.assertAlmostEqual(
+                ranks[student_id]['percentile'], round((below + 0.5 * equal) / len(scores) * 100, 2))
+
+    def test_rank_ties_share_rank(self):
+        ranks = grade_stats.rank_scores({'a': 90.0, 'b': 90.0, 'c': 70.0})
+        self.assertEqual([ranks[k]['rank'] for k in 'abc'], [1, 1, 3])
+        self.assertEqual(ranks['c']['percentile'], round(0.5 / 3 * 100, 2))
+
+    def test_moving_average_trend(self):
+        window = 3
+        ordered = {}
+        for row in sorted(self.rows, key=lambda r: (r[0], r[6])):
+            ordered.setdefault(row[0], []).append(row)
+        trends = grade_stats.moving_average_trend(self.frame, window=window)
+        self.assertEqual(set(trends), set(ordered))
+        for student_id, student_rows in ordered.items():
+            # Ties on date keep load order in both implementations
+            values = [float(r[5]) for r in student_rows]
+            expected = [
+                round(sum(values[max(0, i + 1 - window):i + 1]) / len(values[max(0, i + 1 - window):i + 1]), 2)
+                for i in range(len(values))
+            ]
+            actual = [a for _, a in trends[student_id]]
+            self.assertEqual(len(actual), len(expected))
+            for a, e in zip(actual, expected):
+                # Both sides round to two decimals; allow for a half-cent tie
+                self.assertAlmostEqual(a, e, delta=0.011)
+
+    def test_empty_frame(self):
+        frame = GradeFrame.from_rows([])
+        self.assertEqual(grade_stats.weighted_percentages(frame), {})
+        self.assertEqual(grade_stats.gpa(frame), {})
+        self.assertEqual(grade_stats.moving_average_trend(frame), {})
+
+
+class GradeFrameQuerysetTest(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.student = CustomUser.objects.create_user(username='student', password='x', role='student')
+        self.subjects = [Subject.objects.create(name=name, description='') for name in ('Maths', 'Physics')]
+        for i, (_, _, grade_type, earned, possible, percentage, assigned) in enumerate(make_rows(60, 1, 2)):
+            Grade.objects.create(
+                student=self.student, teacher=self.teacher, subject=self.subjects[i % 2],
+                title=f'Grade {i}', grade_type=grade_type, points_earned=earned,
+                points_possible=possible, percentage=percentage, date_assigned=assigned,
+            )
+
+    def test_student_summary_matches_loop(self):
+        grades = list(Grade.objects.filter(student=self.student))
+        rows = [(g.student_id, g.subject_id, g.grade_type, g.points_earned, g.points_possible,
+                 g.percentage, g.date_assigned) for g in grades]
+
+        with self.assertNumQueries(1):
+            summary = grade_stats.student_summary(self.student)
+
+        self.assertEqual(summary['total_grades'], len(grades))
+        self.assertEqual(summary['average_grade'],
+                         round(sum(float(g.percentage) for g in grades) / len(grades), 1))
+        self.assertAlmostEqual(summary['weighted_average'],
+                               round(loop_weighted(rows, lambda r: r[0])[self.student.id], 1))
+        subject_averages = loop_averages(rows, lambda r: r[1])
+        for subject in self.subjects:
+            self.assertAlmostEqual(summary['subjects_stats'][subject.id]['average'],
+                                   subject_averages[subject.id])
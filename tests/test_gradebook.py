@@ -0,0 +1,136 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser, StudentProfile
+from teacher.gradebook import class_rankings
+from teacher.models import GradebookEntry
+
+
+class GradebookTestCase(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.other_classroom = Classroom.objects.create(name='9B', grade='9th', teacher=self.teacher)
+        self.maths = Subject.objects.create(name='Maths', description='')
+        self.physics = Subject.objects.create(name='Physics', description='')
+        self.students = []
+        for i, classroom in enumerate([self.classroom] * 3 + [self.other_classroom]):
+            student = CustomUser.objects.create_user(username=f'student{i}', password='x', role='student')
+            profile, _ = StudentProfile.objects.get_or_create(user=student, defaults={'student_id': f'S{i}'})
+            profile.classroom = classroom
+            profile.save()
+            self.students.append(student)
+
+    def add_grade(self, student, percentage, subject=None, grade_type='exam'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Grade.objects.create(
+                student=student, teacher=self.teacher, subject=subject or self.maths,
+                title='Unit Test', grade_type=grade_type, points_earned=percentage,
+                points_possible=100, percentage=percentage, date_assigned=date(2025, 3, 1),
+            )
+
+
+class GradebookTest(GradebookTestCase):
+    def test_grade_write_refreshes_classroom_subject(self):
+        self.add_grade(self.students[0], 70)
+        self.add_grade(self.students[1], 90)
+        self.add_grade(self.students[2], 80)
+
+        with self.assertNumQueries(1):
+            ranking = [(e.student_id, e.rank) for e in class_rankings(self.classroom, self.maths)]
+        self.assertEqual(ranking, [(self.students[1].id, 1), (self.students[2].id, 2), (self.students[0].id, 3)])
+        top = GradebookEntry.objects.get(student=self.students[1], subject=self.maths)
+        self.assertEqual(float(top.percentile), round(2.5 / 3 * 100, 2))
+
+    def test_other_classrooms_and_subjects_untouched(self):
+        self.add_grade(self.students[3], 95)
+        self.add_grade(self.students[0], 60, subject=self.physics)
+        self.assertFalse(class_rankings(self.classroom, self.maths).exists())
+        self.assertEqual(class_rankings(self.other_classroom, self.maths).get().rank, 1)
+
+    def test_edit_and_delete_rerank(self):
+        low = self.add_grade(self.students[0], 50)
+        self.add_grade(self.students[1], 75)
+        low.percentage = 99
+        with self.captureOnCommitCallbacks(execute=True):
+            low.save()
+        self.assertEqual(class_rankings(self.classroom, self.maths).first().student_id, self.students[0].id)
+
+        low.subject = self.physics
+        with self.captureOnCommitCallbacks(execute=True):
+            low.save()
+        self.assertEqual([e.student_id for e in class_rankings(self.classroom, self.maths)], [self.students[1].id])
+        self.assertEqual([e.student_id for e in class_rankings(self.classroom, self.physics)], [self.students[0].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            low.delete()
+        self.assertFalse(class_rankings(self.classroom, self.physics).exists())
+
+    def test_moving_a_student_reranks_both_classrooms(self):
+        self.add_grade(self.students[0], 70)
+        self.add_grade(self.students[1], 90)
+        self.add_grade(self.students[3], 80)
+        profile = StudentProfile.objects.only('id').get(user=self.students[0])
+        profile.classroom = self.other_classroom
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual([(e.student_id, e.rank) for e in class_rankings(self.classroom, self.maths)],
+                         [(self.students[1].id, 1)])
+        self.assertEqual([(e.student_id, e.rank) for e in class_rankings(self.other_classroom, self.maths)],
+                         [(self.students[3].id, 1), (self.students[0].id, 2)])
+
+    def test_grades_loaded_with_deferred_fields(self):
+        grade = self.add_grade(self.students[0], 50)
+        self.add_grade(self.students[1], 75)
+        self.assertEqual(len(Grade.objects.only('id')), 2)
+
+        deferred = Grade.objects.only('id').get(pk=grade.pk)
+        deferred.subject = self.physics
+        with self.captureOnCommitCallbacks(execute=True):
+            deferred.save()
+        self.assertEqual([e.student_id for e in class_rankings(self.classroom, self.maths)], [self.students[1].id])
+        self.assertEqual([e.student_id for e in class_rankings(self.classroom, self.physics)], [self.students[0].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.only('id').get(pk=grade.pk).delete()
+        self.assertFalse(class_rankings(self.classroom, self.physics).exists())
+
+
+@override_settings(ROOT_URLCONF='teacher.urls')
+class GradebookApiTest(GradebookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_grade(self.students[0], 70)
+        self.add_grade(self.students[1], 90)
+        self.add_grade(self.students[3], 80)
+        self.add_grade(self.students[0], 60, subject=self.physics)
+
+    def rows(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('gradebook-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted((row['student'], row['subject']) for row in response.json())
+
+    def test_rows_are_limited_to_what_the_user_may_see(self):
+        admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.assertEqual(len(self.rows(admin)), 4)
+        self.assertEqual(self.rows(admin, classroom=self.classroom.pk, subject=self.maths.pk),
+                         [(self.students[0].pk, self.maths.pk), (self.students[1].pk, self.maths.pk)])
+        self.assertEqual(self.rows(self.students[0]),
+                         [(self.students[0].pk, self.maths.pk), (self.students[0].pk, self.physics.pk)])
+
+        other = CustomUser.objects.create_user(username='other', password='x', role='teacher')
+        self.other_classroom.teacher = other
+        self.other_classroom.save()
+        self.assertEqual(self.rows(other), [(self.students[3].pk, self.maths.pk)])
+        self.assertEqual(len(self.rows(self.teacher)), 3)
+
+    def test_non_numeric_filters_are_rejected(self):
+        self.client.force_login(self.teacher)
+        for params in ({'classroom': 'x'}, {'subject': '1; drop'}):
+            self.assertEqual(self.client.get(reverse('gradebook-list'), params).status_code, 400)
@@ -0,0 +1,57 @@
+from collections import Counter
+from datetime import date
+
+from django.db.models import F
+from django.test import TestCase
+
+from attendance.models import AttendanceRecord
+from feedback.models import FeedbackResponse
+from grades.models import Grade
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher.loadgen import LoadGenerator
+
+VOLUMES = {'students': 90, 'attendance_records': 4000, 'grades': 600, 'feedback_responses': 150}
+
+
+class LoadGeneratorTest(TestCase):
+    def generate(self, prefix='load', seed=3):
+        return LoadGenerator(seed=seed, prefix=prefix, anchor=date(2025, 6, 30), **VOLUMES).generate()
+
+    def test_volumes_and_relations(self):
+        counts = self.generate()
+
+        self.assertEqual(counts['attendance.AttendanceRecord'], 4000)
+        self.assertEqual(AttendanceRecord.objects.count(), 4000)
+        self.assertEqual(Grade.objects.count(), 600)
+        self.assertEqual(FeedbackResponse.objects.count(), 150)
+        self.assertEqual(CustomUser.objects.filter(role='student').count(), 90)
+        self.assertEqual(StudentProfile.objects.exclude(classroom=None).count(), 90)
+        self.assertTrue(ParentProfile.objects.filter(students__isnull=False).exists())
+        # Every record belongs to a student of the session's classroom
+        self.assertFalse(AttendanceRecord.objects.exclude(
+            student__student_profile__classroom=F('session__classroom')).exists())
+        # The ORM still works on the generated ids
+        self.assertTrue(CustomUser.objects.create_user(username='after', password='x').pk)
+
+    def test_attendance_weights_match_seeders(self):
+        self.generate()
+        statuses = Counter(AttendanceRecord.objects.values_list('status', flat=True))
+        self.assertAlmostEqual(statuses['present'] / 4000, 0.85, delta=0.03)
+        self.assertAlmostEqual(statuses['late'] / 4000, 0.10, delta=0.03)
+        self.assertAlmostEqual(statuses['absent'] / 4000, 0.05, delta=0.02)
+        average = sum(float(p) for p in Grade.objects.values_list('percentage', flat=True)) / 600
+        self.assertAlmostEqual(average, 78, delta=2)
+
+    def test_same_seed_same_data(self):
+        def snapshot(prefix):
+            return list(Grade.objects.filter(student__username__startswith=prefix).order_by('pk').values_list(
+                'title', 'percentage', 'date_assigned'))
+
+        self.generate('first')
+        self.generate('second')
+        self.assertEqual(snapshot('first_'), snapshot('second_'))
+
+    def test_prefix_must_be_new(self):
+        self.generate()
+        with self.assertRaises(ValueError):
+            self.generate()
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from users.models import CustomUser
+from teacher import metrics
+
+MIDDLEWARE = settings.MIDDLEWARE + ['teacher.middleware.MetricsMiddleware']
+
+
+class ExpositionTest(SimpleTestCase):
+    def setUp(self):
+        metrics.registry.reset()
+
+    def test_counter_and_histogram_lines(self):
+        metrics.ATTENDANCE_MARKS.inc(status='present')
+        metrics.ATTENDANCE_MARKS.inc(2, status='present')
+        metrics.DATA_JOB_DURATION.observe(3, kind='export', job_type='students', outcome='completed')
+        text = metrics.exposition()
+
+        self.assertIn('# TYPE attendance_marks_total counter', text)
+        self.assertIn('attendance_marks_total{status="present"} 3', text)
+        labels = 'kind="export",job_type="students",outcome="completed"'
+        self.assertIn(f'data_job_duration_seconds_bucket{{{labels},le="1.0"}} 0', text)
+        self.assertIn(f'data_job_duration_seconds_bucket{{{labels},le="5.0"}} 1', text)
+        self.assertIn(f'data_job_duration_seconds_bucket{{{labels},le="+Inf"}} 1', text)
+        self.assertIn(f'data_job_duration_seconds_count{{{labels}}} 1', text)
+
+    def test_label_values_are_escaped(self):
+        metrics.record_cache('nav "teacher"', hit=True)
+        self.assertIn('cache_requests_total{cache="nav \\"teacher\\"",result="hit"} 1', metrics.exposition())
+
+    def test_process_files_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            # Another worker's file, as written by its own registry
+            with open(os.path.join(directory, 'metrics_1.json'), 'w') as other:
+                json.dump({'counters': [['sqlite_lock_retries_total', [], 4]], 'histograms': []}, other)
+            metrics.SQLITE_LOCK_RETRIES.inc()
+            metrics.registry.flush()
+
+            self.assertIn('sqlite_lock_retries_total 5', metrics.exposition())
+            self.assertTrue(os.path.exists(os.path.join(directory, f'metrics_{os.getpid()}.json')))
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+
+    def test_latency_is_labelled_with_url_name(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('teacherprofile-list'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="teacherprofile-list",method="GET",status="2xx"} 1',
+                      text)
+
+    def test_attendance_marks_are_counted(self):
+        teacher = CustomUser.objects.create_user(username='t', role='teacher')
+        student = CustomUser.objects.create_user(username='s', role='student')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        session = AttendanceSession.objects.create(
+            title='Maths', classroom=classroom, teacher=teacher, start_time=timezone.now())
+        record = AttendanceRecord.objects.create(session=session, student=student, status='late')
+        self.assertIn('attendance_marks_total{status="late"} 1', metrics.exposition())
+
+        # Re-saves and note edits are not marks; status changes are
+        record.notes = 'Bus was late'
+        record.save()
+        AttendanceRecord.objects.get(pk=record.pk).save()
+        self.assertIn('attendance_marks_total{status="late"} 1', metrics.exposition())
+        record.status = 'present'
+        record.save()
+        self.assertIn('attendance_marks_total{status="present"} 1', metrics.exposition())
+
+    def test_remote_scrapers_need_an_allowed_address(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, 403)
+        # Loopback is not trusted by default: it is what a local reverse proxy forwards from
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.9']):
+            response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
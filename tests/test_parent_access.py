@@ -0,0 +1,74 @@
+from datetime import date
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher import parent_access
+
+
+class ParentAccessTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.parent = CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        self.profile = ParentProfile.objects.create(user=self.parent)
+        self.children = [self.student(f'child{i}') for i in range(2)]
+        self.other = self.student('other')
+        self.profile.students.add(*[child.student_profile for child in self.children])
+
+    def student(self, username):
+        user = CustomUser.objects.create_user(username=username, password='x', role='student')
+        StudentProfile.objects.create(user=user, student_id=username.upper())
+        return user
+
+    def request(self, user=None):
+        request = RequestFactory().get('/')
+        request.user = user or self.parent
+        return request
+
+    def test_ids_are_loaded_once_and_checks_cost_no_queries(self):
+        request = self.request()
+        with self.assertNumQueries(1):
+            for _ in range(50):
+                self.assertTrue(parent_access.can_access(request, self.children[0].pk))
+                self.assertFalse(parent_access.can_access(request, str(self.other.pk)))
+        with self.assertNumQueries(0):
+            self.assertEqual(parent_access.student_ids(self.request()), {child.pk for child in self.children})
+
+    def test_link_changes_invalidate(self):
+        parent_access.student_ids(self.request())
+        self.profile.students.remove(self.children[1].student_profile)
+        self.assertEqual(parent_access.student_ids(self.request()), {self.children[0].pk})
+
+        self.other.student_profile.parents.add(self.profile)
+        self.assertIn(self.other.pk, parent_access.student_ids(self.request()))
+
+        self.other.student_profile.parents.clear()
+        self.assertNotIn(self.other.pk, parent_access.student_ids(self.request()))
+
+        self.children[0].student_profile.delete()
+        self.assertEqual(parent_access.student_ids(self.request()), frozenset())
+
+    def test_restrict(self):
+        subject = Subject.objects.create(name='Maths')
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        for student in self.children + [self.other]:
+            Grade.objects.create(student=student, subject=subject, teacher=teacher, title='Quiz',
+                                 points_earned=8, points_possible=10, percentage=80, date_assigned=date(2025, 3, 1))
+        grades = parent_access.restrict(Grade.objects.all(), self.request())
+        self.assertEqual({grade.student_id for grade in grades}, {child.pk for child in self.children})
+        self.assertEqual(parent_access.restrict(Grade.objects.all(), self.request(teacher)).count(), 3)
+
+    def test_decorator(self):
+        view = parent_access.parent_access_required(lambda request, child_id: HttpResponse('ok'))
+        self.assertEqual(view(self.request(), child_id=self.children[0].pk).status_code, 200)
+        with self.assertRaises(PermissionDenied):
+            view(self.request(), child_id=self.other.pk)
+        with self.assertRaises(PermissionDenied):
+            view(self.request(), child_id='abc')
+        self.assertEqual(view(self.request(AnonymousUser()), child_id=self.other.pk).status_code, 200)
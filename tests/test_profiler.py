@@ -0,0 +1,125 @@
+import threading
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from users.models import CustomUser
+from teacher import profiler
+from teacher.models import ProfilingCapture, ProfilingSession
+
+MIDDLEWARE = settings.MIDDLEWARE + ['teacher.middleware.ProfilerMiddleware']
+
+
+class OutputTest(SimpleTestCase):
+    stacks = {'main;view;query': 6, 'main;view;render': 3, 'main;view': 1}
+
+    def test_collapsed_text(self):
+        self.assertEqual(profiler.collapsed_text(self.stacks),
+                         'main;view 1\nmain;view;query 6\nmain;view;render 3\n')
+
+    def test_top_functions_by_self_samples(self):
+        rows = profiler.top_functions(self.stacks)
+        self.assertEqual([row['function'] for row in rows], ['query', 'render', 'view', 'main'])
+        self.assertEqual((rows[2]['self'], rows[2]['total'], rows[2]['total_pct']), (1, 10, 100.0))
+
+    def test_sampler_records_the_target_thread(self):
+        def busy_wait():
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+
+        sampler = profiler.Sampler(threading.get_ident(), 0.002)
+        sampler.start()
+        busy_wait()
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        self.assertTrue(any('busy_wait' in stack.rsplit(';', 1)[-1] for stack in sampler.stacks))
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class ProfilerMiddlewareTest(TestCase):
+    def setUp(self):
+        profiler.forget_armed()
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.client.force_login(self.teacher)
+
+    def test_nothing_is_profiled_unless_armed(self):
+        self.client.get(reverse('teacherprofile-list'))
+        self.assertFalse(ProfilingCapture.objects.exists())
+
+    def test_armed_session_profiles_n_matching_requests(self):
+        session = profiler.arm(self.admin, url_pattern='teacherprofiles', requests=2, interval_ms=1)
+        self.client.get(reverse('assignment-list'))
+        for _ in range(3):
+            self.client.get(reverse('teacherprofile-list'))
+
+        captures = list(session.captures.all())
+        self.assertEqual([capture.view_name for capture in captures], ['teacherprofile-list'] * 2)
+        session.refresh_from_db()
+        self.assertEqual(session.requests_remaining, 0)
+
+    def test_session_limited_to_one_user(self):
+        session = profiler.arm(self.admin, user=self.admin, requests=5)
+        self.client.get(reverse('teacherprofile-list'))
+        self.assertFalse(session.captures.exists())
+
+    def test_invalid_pattern_is_rejected(self):
+        with self.assertRaises(ValueError):
+            profiler.arm(self.admin, url_pattern='(')
+        with self.assertRaises(ValueError):
+            profiler.arm(self.admin, interval_ms=0)
+
+    def test_admin_form_validates_the_session(self):
+        request = RequestFactory().get('/')
+        request.user = CustomUser.objects.create_superuser(username='root', password='x')
+        form = admin.site._registry[ProfilingSession].get_form(request)({
+            'url_pattern': '(', 'requests_remaining': 5, 'interval_ms': 0, 'created_by': self.admin.pk,
+            'expires_at_0': '2030-01-01', 'expires_at_1': '10:00',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'url_pattern', 'interval_ms'})
+
+    def test_stored_invalid_pattern_does_not_break_requests(self):
+        ProfilingSession.objects.create(url_pattern='(', requests_remaining=5, created_by=self.admin,
+                                        expires_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.client.get(reverse('teacherprofile-list')).status_code, 200)
+        self.assertFalse(ProfilingCapture.objects.exists())
+
+
+class ProfilerViewsTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.client.force_login(self.admin)
+
+    def test_arm_and_download(self):
+        response = self.client.post(reverse('profiler_sessions'), {
+            'url_pattern': '^/attendance/', 'username': 'admin', 'requests': '3', 'interval_ms': '2',
+        })
+        session = ProfilingSession.objects.get()
+        self.assertRedirects(response, reverse('profiler_session', args=[session.pk]),
+                             fetch_redirect_response=False)
+        self.assertEqual((session.user, session.requests_remaining), (self.admin, 3))
+
+        ProfilingCapture.objects.create(session=session, method='GET', path='/attendance/', status_code=200,
+                                        duration_ms=12.0, samples=2, stacks={'a;b': 2})
+        collapsed = self.client.get(reverse('profiler_download', args=[session.pk, 'collapsed']))
+        self.assertEqual(collapsed.content, b'a;b 2\n')
+        top = self.client.get(reverse('profiler_download', args=[session.pk, 'top']))
+        self.assertIn(b'b,2,2,100.0,100.0', top.content)
+
+    def test_disarm(self):
+        session = profiler.arm(self.admin, requests=5)
+        self.client.post(reverse('profiler_session', args=[session.pk]))
+        session.refresh_from_db()
+        self.assertFalse(session.is_armed)
+
+    def test_teachers_cannot_arm(self):
+        self.client.force_login(CustomUser.objects.create_user(username='t', password='x', role='teacher'))
+        self.assertEqual(self.client.post(reverse('profiler_sessions'), {'requests': '1'}).status_code, 403)
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import CustomUser, ParentProfile, StudentProfile, TeacherProfile
+from teacher import parent_access, provisioning
+from teacher.models import AccountInvite
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTest(TestCase):
+    def test_hash_passwords_in_pool_keeps_order(self):
+        passwords = [f'secret-{i}' if i % 5 else '' for i in range(40)]
+        hashes = provisioning.hash_passwords(passwords, workers=2)
+
+        self.assertEqual(len(hashes), 40)
+        for password, encoded in zip(passwords, hashes):
+            if password:
+                self.assertTrue(check_password(password, encoded))
+            else:
+                self.assertTrue(encoded.startswith('!'))
+        self.assertEqual(len(set(hashes)), 40)
+
+    def test_shared_pool_is_reused_across_calls(self):
+        with provisioning.HashingPool(workers=2) as pool:
+            first = provisioning.hash_passwords([f'a-{i}' for i in range(20)], pool=pool)
+            executor = pool._executor
+            second = provisioning.hash_passwords([f'b-{i}' for i in range(20)], pool=pool)
+            self.assertIs(pool._executor, executor)
+        self.assertIsNone(pool._executor)
+        self.assertTrue(check_password('a-3', first[3]))
+        self.assertTrue(check_password('b-19', second[19]))
+
+    def test_provision_students_and_parents(self):
+        students, invites = provisioning.provision_accounts(
+            [{'username': f's{i}', 'first_name': 'S', 'password': 'pw', 'profile': {'student_id': f'ID{i}'}}
+             for i in range(3)],
+            'student',
+        )
+        self.assertEqual(invites, {})
+        self.assertEqual([s.username for s in students], ['s0', 's1', 's2'])
+        self.assertTrue(students[0].check_password('pw'))
+        self.assertEqual(StudentProfile.objects.get(user=students[2]).student_id, 'ID2')
+
+        profile_ids = list(StudentProfile.objects.order_by('pk').values_list('pk', flat=True))
+        with self.assertNumQueries(8):
+            parents, _ = provisioning.provision_accounts(
+                [{'username': 'p0', 'profile': {'relationship': 'Mother'}, 'students': profile_ids[:2]},
+                 {'username': 'p1', 'students': profile_ids[2:]}],
+                'parent',
+            )
+        self.assertEqual(parents[0].role, 'parent')
+        self.assertEqual(ParentProfile.objects.get(user=parents[0]).students.count(), 2)
+
+    def test_parent_links_retire_cached_children(self):
+        students, _ = provisioning.provision_accounts([{'username': 's0', 'password': 'pw'}], 'student')
+        with mock.patch.object(parent_access, 'bump_parents', wraps=parent_access.bump_parents) as bump:
+            parents, _ = provisioning.provision_accounts(
+                [{'username': 'p0', 'students': [students[0].student_profile.pk]}], 'parent',
+            )
+        bump.assert_called_once_with({parents[0].pk})
+        self.assertEqual(parent_access.children_ids(parents[0]), {students[0].pk})
+
+    def test_profile_ids_are_generated_when_not_given(self):
+        # The profile fields comprehensive_data_expansion.py provisions with
+        teachers, _ = provisioning.provision_accounts(
+            [{'username': f't{i}', 'password': 'pw',
+              'profile': {'department': 'Science', 'hire_date': date(2020, 1, 6), 'qualification': 'M.Sc.',
+                          'experience_years': 4, 'specialization': 'Physics'}}
+             for i in range(3)],
+            'teacher',
+        )
+        students, _ = provisioning.provision_accounts(
+            [{'username': f's{i}', 'password': 'pw',
+              'profile': {'grade': '9th', 'admission_date': date(2023, 9, 1), 'parent_guardian_name': 'P',
+                          'parent_guardian_phone': '555', 'emergency_contact_name': 'E',
+                          'emergency_contact_phone': '556', 'blood_group': 'O+', 'medical_conditions': 'None'}}
+             for i in range(3)] + [{'username': 'given', 'profile': {'student_id': 'OWN1'}}],
+            'student',
+        )
+        profiles = TeacherProfile.objects.filter(user__in=teachers)
+        self.assertEqual(len({profile.teacher_id for profile in profiles}), 3)
+        self.assertEqual(len({profile.employee_id for profile in profiles}), 3)
+        self.assertTrue(all(profile.employee_id for profile in profiles))
+        ids = dict(StudentProfile.objects.values_list('user__username', 'student_id'))
+        self.assertEqual(ids['given'], 'OWN1')
+        self.assertEqual(ids['s0'], f"STU{CustomUser.objects.get(username='s0').pk:06d}")
+        self.assertEqual(len(set(ids.values())), 4)
+
+    def test_existing_usernames_are_skipped(self):
+        CustomUser.objects.create_user(username='taken', password='x', role='teacher')
+        users, _ = provisioning.provision_accounts(
+            [{'username': 'taken', 'profile': {'student_id': 'A'}},
+             {'username': 'fresh', 'profile': {'student_id': 'B'}},
+             {'username': 'fresh', 'profile': {'student_id': 'C'}}],
+            'student',
+        )
+        self.assertEqual([u.username for u in users], ['fresh'])
+        self.assertEqual(CustomUser.objects.get(username='taken').role, 'teacher')
+
+    def test_invites_are_single_use(self):
+        users, invites = provisioning.provision_accounts(
+            [{'username': 'invited', 'profile': {'student_id': 'A'}},
+             {'username': 'direct', 'password': 'pw', 'profile': {'student_id': 'B'}}],
+            'student', invite=True,
+        )
+        self.assertEqual(set(invites), {'invited'})
+        self.assertFalse(users[0].has_usable_password())
+        # Only the hash is stored
+        self.assertFalse(AccountInvite.objects.filter(token_hash=invites['invited']).exists())
+
+        url = reverse('accept_invite')
+        password = 'a-Long-enough-passw0rd'
+        response = self.client.post(url, {'token': invites['invited'], 'password': password})
+        self.assertEqual(response.json(), {'success': True, 'username': 'invited'})
+        self.assertTrue(CustomUser.objects.get(username='invited').check_password(password))
+
+        response = self.client.post(url, {'token': invites['invited'], 'password': password})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_invite_is_rejected(self):
+        user = CustomUser.objects.create_user(username='late', role='student')
+        token = provisioning.create_invites([user.pk], ttl=timedelta(seconds=-1))[user.pk]
+        with self.assertRaises(ValueError):
+            provisioning.redeem_invite(token, 'whatever-password')
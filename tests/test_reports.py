@@ -0,0 +1,112 @@
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from feedback.models import FeedbackCategory, FeedbackResponse, FeedbackSession
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser, ParentProfile, StudentProfile
+from teacher import reports
+
+TERM = reports.term_named('2025-fall')
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@override_settings(ROOT_URLCONF='teacher.urls')
+class StudentReportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.subject = Subject.objects.create(name='Maths')
+        self.student = CustomUser.objects.create_user(username='ada', password='x', role='student',
+                                                      first_name='Ada', last_name='L')
+        StudentProfile.objects.create(user=self.student, student_id='S1', classroom=self.classroom)
+        for day, status in [(6, 'present'), (7, 'late'), (8, 'absent')]:
+            session = AttendanceSession.objects.create(title=f'Oct {day}', classroom=self.classroom,
+                                                       teacher=self.teacher, start_time=at(2025, 10, day, 9))
+            AttendanceRecord.objects.create(session=session, student=self.student, status=status)
+        for percentage in (70, 90):
+            self.grade(percentage)
+        self.grade(50, date(2025, 3, 1))  # last year's spring term
+        assignments = [
+            Assignment.objects.create(title=f'Homework {i}', classroom=self.classroom, subject=self.subject,
+                                      teacher=self.teacher, due_date=at(2025, 10, 10 + i, 17))
+            for i in range(2)
+        ]
+        AssignmentSubmission.objects.create(assignment=assignments[0], student=self.student)
+        category = FeedbackCategory.objects.create(name='Course')
+        session = FeedbackSession.objects.create(title='Term survey', category=category, classroom=self.classroom,
+                                                 created_by=self.teacher, start_date=at(2025, 11, 3, 9))
+        FeedbackResponse.objects.create(session=session, respondent=self.student)
+
+    def grade(self, percentage, day=date(2025, 10, 9)):
+        return Grade.objects.create(student=self.student, subject=self.subject, teacher=self.teacher, title='Quiz',
+                                    grade_type='quiz', points_earned=percentage, points_possible=100,
+                                    percentage=percentage, date_assigned=day)
+
+    def test_terms(self):
+        self.assertEqual(reports.term_for(date(2026, 1, 15)), TERM)
+        self.assertEqual(TERM, ('2025-fall', date(2025, 9, 1), date(2026, 1, 31)))
+        self.assertEqual(reports.term_for(date(2026, 5, 1)), ('2025-spring', date(2026, 2, 1), date(2026, 8, 31)))
+        with self.assertRaises(ValueError):
+            reports.term_named('fall')
+
+    def test_report_is_built_with_fixed_queries_and_cached(self):
+        with self.assertNumQueries(6):
+            report = reports.student_report(self.student.pk, TERM)
+        with self.assertNumQueries(0):
+            self.assertEqual(reports.student_report(self.student.pk, TERM), report)
+
+        self.assertEqual(report['student']['classroom'], '9A')
+        attendance = report['attendance']
+        self.assertEqual((attendance['total'], attendance['present'], attendance['late']), (3, 1, 1))
+        self.assertEqual(report['grades']['average'], 80.0)
+        self.assertEqual(report['grades']['subjects'], [{'subject': 'Maths', 'count': 2, 'average': 80.0}])
+        self.assertEqual((report['assignments']['total'], report['assignments']['submitted']), (2, 1))
+        self.assertEqual((report['feedback']['sessions'], report['feedback']['responded']), (1, 1))
+
+    def test_timeline_merges_domains_newest_first(self):
+        with self.assertNumQueries(1):
+            entries = reports.timeline(self.student.pk, date(2025, 10, 12))
+        self.assertEqual([(entry['kind'], entry['date'].day) for entry in entries],
+                         [('grade', 9), ('grade', 9), ('attendance', 8), ('attendance', 7), ('attendance', 6)])
+        self.assertEqual({entry['score'] for entry in entries}, {70.0, 90.0, None})
+
+    def test_writes_invalidate(self):
+        reports.student_report(self.student.pk, TERM)
+        self.grade(100)
+        self.assertEqual(reports.student_report(self.student.pk, TERM)['grades']['count'], 3)
+        AssignmentSubmission.objects.create(assignment=Assignment.objects.last(), student=self.student)
+        self.assertEqual(reports.student_report(self.student.pk, TERM)['assignments']['submitted'], 2)
+
+    def test_html_export_streams(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(f'/reports/students/{self.student.pk}/', {'term': '2025-fall', 'format': 'html'})
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('<h1>Ada L</h1>', html)
+        self.assertIn('Homework 1', html)
+        self.assertTrue(html.endswith('</html>'))
+        self.assertEqual(self.client.get(f'/reports/students/{self.student.pk}/', {'term': 'x'}).status_code, 400)
+
+    def test_access(self):
+        parent = CustomUser.objects.create_user(username='parent', password='x', role='parent')
+        ParentProfile.objects.create(user=parent)
+        other = CustomUser.objects.create_user(username='other', password='x', role='student')
+        url = f'/reports/students/{self.student.pk}/'
+        self.client.force_login(parent)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        parent.parent_profile.students.add(self.student.student_profile)
+        self.assertEqual(self.client.get(url, {'term': '2025-fall'}).json()['grades']['count'], 2)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(f'/reports/students/{self.teacher.pk}/').status_code, 403)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from assignments.models import Assignment, AssignmentSubmission
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from subject.models import Subject
+from users.models import CustomUser, StudentProfile
+from teacher import risk
+from teacher.grade_stats import GradeFrame
+from teacher.models import RiskModelRun, StudentRiskScore
+
+DAY = 86400
+
+
+class LogisticModelTest(SimpleTestCase):
+    def test_fit_separates_classes(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(2000, 3))
+        y = (X[:, 0] - 2 * X[:, 1] + rng.normal(scale=0.5, size=2000) > 0).astype(float)
+        model = risk.LogisticModel.fit(X, y)
+        accuracy = ((model.predict_proba(X) > 0.5) == y).mean()
+        self.assertGreater(accuracy, 0.9)
+        self.assertGreater(model.coefficients[1], 0)
+        self.assertLess(model.coefficients[2], 0)
+
+    def test_missing_features_count_as_the_mean(self):
+        X = np.array([[0.0, 1.0], [1.0, 0.0], [np.nan, 0.5], [1.0, 1.0]])
+        model = risk.LogisticModel.fit(X, np.array([0.0, 1.0, 0.0, 1.0]))
+        self.assertFalse(np.isnan(model.predict_proba(X)).any())
+        self.assertEqual(model.standardize(X)[2, 0], 0)
+
+
+class BuildFeaturesTest(SimpleTestCase):
+    def test_features(self):
+        now = timezone.now()
+        t = now.timestamp()
+        inputs = risk.RiskInputs(
+            students=[1, 2],
+            classrooms=[10, -1],
+            attendance=([1, 1, 1, 1, 99], [t - DAY, t - 2 * DAY, t - 20 * DAY, t + DAY, t - DAY], [0, 2, 1, 0, 0]),
+            grades=GradeFrame.from_rows([]),
+            assignments=([10, 10, 11], [t - DAY, t - 3 * DAY, t - DAY]),
+            submissions=([1], [t - DAY], [t - DAY + 60]),
+        )
+        features = dict(zip(risk.FEATURES, risk.build_features(inputs, now).T))
+        self.assertEqual(features['attendance_14d'][0], 0.5)
+        self.assertAlmostEqual(features['attendance_60d'][0], 1 / 3)
+        self.assertAlmostEqual(features['late_rate_60d'][0], 1 / 3)
+        self.assertEqual(features['missing_rate'][0], 0.5)
+        self.assertEqual(features['late_submission_rate'][0], 1.0)
+        # No data at all for the second student
+        self.assertTrue(np.isnan(risk.build_features(inputs, now)[1]).all())
+
+
+class RiskPipelineTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        subject = Subject.objects.create(name='Maths')
+        self.students = []
+        for i in range(10):
+            student = CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+            StudentProfile.objects.create(user=student, student_id=f'S{i}', classroom=classroom)
+            self.students.append(student)
+        self.struggling = self.students[:4]
+        sessions = [
+            AttendanceSession.objects.create(title=f'Day {day}', classroom=classroom, teacher=teacher,
+                                             start_time=self.now - timedelta(days=day, hours=1))
+            for day in range(0, 90, 2)
+        ]
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student,
+                             status='absent' if student in self.struggling and i % 3 else 'present')
+            for i, session in enumerate(sessions) for student in self.students
+        ])
+        assignment = Assignment.objects.create(title='Essay', classroom=classroom, subject=subject, teacher=teacher,
+                                               due_date=self.now - timedelta(days=5))
+        for student in self.students[4:]:
+            AssignmentSubmission.objects.create(assignment=assignment, student=student)
+
+    def test_scores_every_student(self):
+        run = risk.run_pipeline(self.now)
+        self.assertEqual(run.students_scored, 10)
+        self.assertEqual(run.training_rows, 10)
+        scores = {score.student_id: score for score in StudentRiskScore.objects.all()}
+        for student in self.struggling:
+            self.assertEqual(scores[student.pk].level, 'high')
+        for student in self.students[4:]:
+            self.assertEqual(scores[student.pk].level, 'low')
+        self.assertEqual(run.summary['high'], 4)
+        self.assertIn(scores[self.struggling[0].pk].top_factor, risk.FEATURES)
+
+    def test_rescoring_drops_students_who_left(self):
+        risk.run_pipeline(self.now)
+        self.students[5].is_active = False
+        self.students[5].save()
+        risk.run_pipeline(self.now + timedelta(minutes=1), retrain=False)
+        self.assertEqual(StudentRiskScore.objects.count(), 9)
+        self.assertEqual(RiskModelRun.objects.first().trained_at, self.now)
+
+    def test_training_needs_both_outcomes(self):
+        AttendanceRecord.objects.update(status='present')
+        with self.assertRaises(ValueError):
+            risk.run_pipeline(self.now)
+
+    def test_endpoint_reads_stored_scores(self):
+        risk.run_pipeline(self.now)
+        admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.client.force_login(admin)
+        with self.assertNumQueries(4):  # session, user, run, scores
+            data = self.client.get(reverse('risk_students')).json()
+        self.assertEqual(len(data['students']), 4)
+        self.assertEqual(data['summary']['high'], 4)
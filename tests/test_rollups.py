@@ -0,0 +1,168 @@
+from datetime import date, datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from subject.models import Subject
+from users.models import CustomUser
+from teacher import rollups
+from teacher.models import ClassroomAttendanceRollup, StudentAttendanceRollup
+
+
+def counts(row):
+    return {field: getattr(row, field) for field in rollups.COUNT_FIELDS}
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.classroom = Classroom.objects.create(name='9A', grade='9th', teacher=self.teacher)
+        self.subject = Subject.objects.create(name='Maths')
+        self.students = [CustomUser.objects.create_user(username=f's{i}', password='x', role='student')
+                         for i in range(3)]
+        self.march = self.session(date(2025, 3, 3))
+        self.april = self.session(date(2025, 4, 7))
+
+    def session(self, day, subject=True):
+        return AttendanceSession.objects.create(
+            title='Lesson', classroom=self.classroom, subject=self.subject if subject else None,
+            teacher=self.teacher, start_time=timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=9)))
+
+    def rollup(self, model, period, day, **lookup):
+        return counts(model.objects.get(period=period, date=day, **lookup))
+
+    def snapshot(self):
+        return sorted(
+            [(row.period, row.date, row.classroom_id, row.subject_id, *counts(row).values())
+             for row in ClassroomAttendanceRollup.objects.all()]
+            + [(row.period, row.date, row.student_id, None, *counts(row).values())
+               for row in StudentAttendanceRollup.objects.all()],
+            key=repr,
+        )
+
+
+class IncrementalRollupTest(RollupTestCase):
+    def test_marks_update_day_and_month_rows(self):
+        AttendanceRecord.objects.create(session=self.march, student=self.students[0], status='present')
+        AttendanceRecord.objects.create(session=self.march, student=self.students[1], status='late')
+        day = self.rollup(ClassroomAttendanceRollup, 'day', date(2025, 3, 3), classroom=self.classroom)
+        self.assertEqual(day, {'total': 2, 'present': 1, 'late': 1, 'absent': 0, 'excused': 0})
+        month = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 3, 1), classroom=self.classroom)
+        self.assertEqual(month, day)
+        student = self.rollup(StudentAttendanceRollup, 'month', date(2025, 3, 1), student=self.students[1])
+        self.assertEqual(student['late'], 1)
+
+    def test_corrections_and_deletes(self):
+        record = AttendanceRecord.objects.create(session=self.march, student=self.students[0], status='absent')
+        record.status = 'excused'
+        record.save()
+        record = AttendanceRecord.objects.get(pk=record.pk)
+        record.session = self.april
+        record.save()
+        march = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 3, 1), classroom=self.classroom)
+        april = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 4, 1), classroom=self.classroom)
+        self.assertEqual(march['total'], 0)
+        self.assertEqual(april, {'total': 1, 'present': 0, 'late': 0, 'absent': 0, 'excused': 1})
+
+        record.delete()
+        april = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 4, 1), classroom=self.classroom)
+        self.assertEqual(april['total'], 0)
+
+    def test_sessions_without_subject_share_one_bucket(self):
+        first, second = self.session(date(2025, 3, 4), subject=False), self.session(date(2025, 3, 4), subject=False)
+        AttendanceRecord.objects.create(session=first, student=self.students[0], status='present')
+        AttendanceRecord.objects.create(session=second, student=self.students[0], status='present')
+        rows = ClassroomAttendanceRollup.objects.filter(period='day', date=date(2025, 3, 4), subject=None)
+        self.assertEqual([row.total for row in rows], [2])
+
+    def test_incremental_matches_rebuild(self):
+        statuses = ['present', 'late', 'absent', 'excused', 'present', 'absent']
+        for i, status in enumerate(statuses):
+            AttendanceRecord.objects.create(session=[self.march, self.april][i % 2],
+                                            student=self.students[i % 3], status=status)
+        AttendanceRecord.objects.filter(status='present').first().delete()
+        incremental = self.snapshot()
+        rollups.rebuild(date(2025, 3, 1), date(2025, 4, 30))
+        self.assertEqual([row for row in incremental if row[4]], self.snapshot())
+
+    def test_records_loaded_with_deferred_fields(self):
+        record = AttendanceRecord.objects.create(session=self.march, student=self.students[0], status='present')
+        AttendanceRecord.objects.create(session=self.march, student=self.students[1], status='late')
+        self.assertEqual(len(AttendanceRecord.objects.only('id')), 2)
+
+        deferred = AttendanceRecord.objects.only('id').get(pk=record.pk)
+        deferred.status = 'absent'
+        deferred.save()
+        day = self.rollup(ClassroomAttendanceRollup, 'day', date(2025, 3, 3), classroom=self.classroom)
+        self.assertEqual(day, {'total': 2, 'present': 0, 'late': 1, 'absent': 1, 'excused': 0})
+
+        AttendanceRecord.objects.only('id').get(pk=record.pk).delete()
+        student = self.rollup(StudentAttendanceRollup, 'day', date(2025, 3, 3), student=self.students[0])
+        self.assertEqual(student['total'], 0)
+        month = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 3, 1), classroom=self.classroom)
+        self.assertEqual(month, {'total': 1, 'present': 0, 'late': 1, 'absent': 0, 'excused': 0})
+
+
+class RebuildTest(RollupTestCase):
+    def test_bulk_writes_are_rolled_up_by_rebuild(self):
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=self.march, student=student, status='present') for student in self.students
+        ])
+        self.assertFalse(ClassroomAttendanceRollup.objects.exists())
+        rollups.rebuild_sessions([self.march.pk], [s.pk for s in self.students])
+        month = self.rollup(ClassroomAttendanceRollup, 'month', date(2025, 3, 1), classroom=self.classroom)
+        self.assertEqual(month['present'], 3)
+
+    def test_backfill_command(self):
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=self.students[0], status='absent')
+            for session in (self.march, self.april)
+        ])
+        out = StringIO()
+        call_command('backfill_rollups', stdout=out)
+        self.assertIn('March 2025 to April 2025', out.getvalue())
+        self.assertEqual(StudentAttendanceRollup.objects.filter(period='month', absent=1).count(), 2)
+
+
+class TrendQueriesTest(RollupTestCase):
+    def setUp(self):
+        super().setUp()
+        other = Classroom.objects.create(name='9B', grade='9th', teacher=self.teacher)
+        for month in range(1, 13):
+            ClassroomAttendanceRollup.objects.create(period='month', date=date(2025, month, 1),
+                                                     classroom=self.classroom, subject=self.subject,
+                                                     total=10, present=9)
+            ClassroomAttendanceRollup.objects.create(period='month', date=date(2025, month, 1),
+                                                     classroom=other, total=10, present=5)
+
+    def test_monthly_trend_reads_month_rows(self):
+        with self.assertNumQueries(1):
+            trend = rollups.monthly_trend(date(2025, 1, 15), date(2025, 12, 31))
+        self.assertEqual(len(trend), 12)
+        self.assertEqual(trend[0], {'month': date(2025, 1, 1), 'total': 20, 'present': 14, 'late': 0,
+                                    'absent': 0, 'excused': 0, 'attendance_rate': 70.0})
+
+    def test_class_comparison(self):
+        comparison = rollups.class_comparison(date(2025, 1, 1), date(2025, 6, 30))
+        self.assertEqual([(row['classroom'], row['attendance_rate']) for row in comparison],
+                         [('9A', 90.0), ('9B', 50.0)])
+
+    def test_student_days(self):
+        StudentAttendanceRollup.objects.create(period='day', date=date(2025, 3, 5), student=self.students[0],
+                                               total=2, present=1, late=1)
+        strip = rollups.student_days(self.students[0].pk, today=date(2025, 3, 7))
+        self.assertEqual([day['status'] for day in strip], ['none', 'none', 'none', 'none', 'late', 'none', 'none'])
+        self.assertEqual(strip[4]['day'], 'Wed')
+
+    def test_endpoint(self):
+        admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        self.client.force_login(admin)
+        data = self.client.get(reverse('attendance_trends')).json()
+        self.assertEqual(set(data), {'start', 'end', 'months', 'classrooms'})
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(reverse('attendance_trends')).status_code, 403)
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import ResolverMatch
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, AttendanceSession
+from classroom.models import Classroom
+from grades.models import Grade
+from subject.models import Subject
+from users.models import CustomUser, StudentProfile
+
+from teacher import routers
+from teacher.middleware import ReplicaRoutingMiddleware
+
+REPLICA = 'replica_router_test'
+SOURCE = 'replica_source_test'
+
+
+class Aliases:
+    """Register throwaway SQLite aliases for one test"""
+
+    def add_aliases(self, **paths):
+        databases = connections.configure_settings({
+            'default': {}, **{alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+                              for alias, path in paths.items()},
+        })
+        for alias in paths:
+            connections.settings[alias] = databases[alias]
+            self.addCleanup(self.remove_alias, alias)
+
+    def remove_alias(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+class User:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+@override_settings(REPLICA_DATABASE=REPLICA)
+class ReplicaRouterTest(Aliases, SimpleTestCase):
+    def setUp(self):
+        self.add_aliases(**{REPLICA: ':memory:'})
+        self.router = routers.ReplicaRouter()
+        cache.clear()
+
+    def test_reads_stay_on_primary_outside_a_replica_block(self):
+        self.assertIsNone(self.router.db_for_read(None))
+        with routers.request_routing():
+            self.assertIsNone(self.router.db_for_read(None))
+
+    def test_replica_block_reads_from_replica_and_writes_to_primary(self):
+        with routers.replica():
+            self.assertEqual(self.router.db_for_read(None), REPLICA)
+            self.assertEqual(self.router.db_for_write(None), 'default')
+            self.assertEqual(self.router.db_for_read(None), REPLICA)
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_pin_on_write(self):
+        with routers.replica(pin_on_write=True):
+            self.assertEqual(self.router.db_for_read(None), REPLICA)
+            self.router.db_for_write(None)
+            self.assertIsNone(self.router.db_for_read(None))
+
+    @override_settings(REPLICA_DATABASE='missing')
+    def test_unconfigured_replica_falls_back_to_primary(self):
+        with routers.replica():
+            self.assertIsNone(self.router.db_for_read(None))
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'teacher'))
+        self.assertIsNone(self.router.allow_migrate('default', 'teacher'))
+
+    def test_streamed_iteration_keeps_request_routing(self):
+        def rows():
+            yield self.router.db_for_read(None)
+
+        with routers.request_routing() as routing:
+            routing.enabled = True
+            stream = routers.keep_routing(rows())
+        self.assertEqual(list(stream), [REPLICA])
+
+    def test_streamed_iteration_stays_on_primary_after_a_write(self):
+        def rows():
+            yield self.router.db_for_read(None)
+
+        with routers.request_routing() as routing:
+            routing.enabled = True
+            self.router.db_for_write(None)
+            stream = routers.keep_routing(rows())
+        self.assertEqual(list(stream), [None])
+
+
+@override_settings(REPLICA_DATABASE=REPLICA)
+class ReplicaRoutingMiddlewareTest(Aliases, SimpleTestCase):
+    def setUp(self):
+        self.add_aliases(**{REPLICA: ':memory:'})
+        self.router = routers.ReplicaRouter()
+        cache.clear()
+
+    def request(self, method='get', view_name='export_data', user=None, write=False):
+        seen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(None)
+            seen.append(self.router.db_for_read(None))
+            return None
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user or AnonymousUser()
+        request.resolver_match = ResolverMatch(view, (), {}, url_name=view_name)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware.get_response = get_response
+        middleware(request)
+        return seen[0]
+
+    def test_replica_views_read_from_replica(self):
+        self.assertEqual(self.request(), REPLICA)
+        self.assertIsNone(self.request(view_name='take_attendance'))
+        self.assertIsNone(self.request(method='post'))
+
+    def test_writes_make_the_user_sticky(self):
+        user = User(7)
+        self.assertIsNone(self.request(user=user, write=True))
+        self.assertTrue(routers.is_sticky(7))
+        self.assertIsNone(self.request(user=user))
+        self.assertEqual(self.request(user=User(8)), REPLICA)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0.05)
+    def test_sticky_window_expires(self):
+        routers.stick(7)
+        time.sleep(0.1)
+        self.assertEqual(self.request(user=User(7)), REPLICA)
+
+
+class SpyRouter(routers.ReplicaRouter):
+    """Record the models read inside a replica block"""
+
+    def __init__(self):
+        self.replica_reads = set()
+
+    def db_for_read(self, model, **hints):
+        routing = routers.current()
+        if routing is not None and routing.enabled:
+            self.replica_reads.add(model._meta.label)
+        return super().db_for_read(model, **hints)
+
+
+class AnalyticsCommandsTest(TestCase):
+    def setUp(self):
+        self.spy = SpyRouter()
+        # The primary stands in for the replica, so the commands still see their data
+        self.enterContext(override_settings(DATABASE_ROUTERS=[self.spy], REPLICA_DATABASE='default'))
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        classroom = Classroom.objects.create(name='9A', grade='9th', teacher=teacher)
+        student = CustomUser.objects.create_user(username='ada', password='x', role='student')
+        StudentProfile.objects.create(user=student, student_id='S1', classroom=classroom)
+        subject = Subject.objects.create(name='Maths')
+        Grade.objects.create(student=student, subject=subject, teacher=teacher, title='Quiz', grade_type='quiz',
+                             points_earned=80, points_possible=100, percentage=80,
+                             date_assigned=timezone.localdate())
+        session = AttendanceSession.objects.create(title='Today', classroom=classroom, teacher=teacher,
+                                                   start_time=timezone.now())
+        AttendanceRecord.objects.create(session=session, student=student, status='present')
+        self.spy.replica_reads.clear()
+
+    def test_commands_read_from_the_replica(self):
+        call_command('rebuild_gradebook', stdout=StringIO())
+        call_command('backfill_rollups', stdout=StringIO())
+        # Too little history to train on, but the inputs were read first
+        with self.assertRaises(CommandError):
+            call_command('score_student_risk', stdout=StringIO())
+        self.assertLessEqual({'grades.Grade', 'attendance.AttendanceSession', 'attendance.AttendanceRecord',
+                              'users.CustomUser'}, self.spy.replica_reads)
+
+    def test_analytics_views_are_replica_views(self):
+        self.assertIn('risk_students', routers.DEFAULT_REPLICA_VIEWS)
+        self.assertIn('attendance_trends', routers.DEFAULT_REPLICA_VIEWS)
+
+
+class SyncReplicaCommandTest(Aliases, SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source_path = os.path.join(directory.name, 'primary.sqlite3')
+        self.replica_path = os.path.join(directory.name, 'replica.sqlite3')
+        self.add_aliases(**{SOURCE: self.source_path, REPLICA: self.replica_path})
+        with connections[SOURCE].cursor() as cursor:
+            cursor.execute('CREATE TABLE marks (id INTEGER PRIMARY KEY, status TEXT)')
+            cursor.execute("INSERT INTO marks (status) VALUES ('present'), ('late')")
+
+    def replica_rows(self):
+        replica = sqlite3.connect(self.replica_path)
+        self.addCleanup(replica.close)
+        return replica.execute('SELECT status FROM marks ORDER BY id').fetchall()
+
+    def test_copies_primary_into_replica(self):
+        out = StringIO()
+        call_command('sync_replica', source=SOURCE, replica=REPLICA, stdout=out)
+        self.assertEqual(self.replica_rows(), [('present',), ('late',)])
+        self.assertIn(f'Synced {REPLICA}', out.getvalue())
+
+    def test_requires_a_replica(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replica', source=SOURCE, replica='missing', stdout=StringIO())
@@ -0,0 +1,49 @@
+import os
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from teacher import sessions
+
+
+class SessionSettingsTest(SimpleTestCase):
+    def test_modes(self):
+        self.assertEqual(sessions.session_settings('cached_db'),
+                         {'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db'})
+        self.assertTrue(sessions.session_settings('signed_cookies')['SESSION_COOKIE_HTTPONLY'])
+
+    def test_mode_from_environment(self):
+        with mock.patch.dict(os.environ, {'SESSION_MODE': 'cache'}):
+            self.assertEqual(sessions.session_settings()['SESSION_ENGINE'], 'django.contrib.sessions.backends.cache')
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            sessions.session_settings('redis')
+
+
+class PruneSessionsTest(TestCase):
+    def setUp(self):
+        self.now = now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(hours=i + 1))
+             for i in range(5)]
+            + [Session(session_key=f'live{i}', session_data='', expire_date=now + timedelta(days=1))
+               for i in range(2)]
+        )
+
+    def test_deletes_expired_sessions_in_batches(self):
+        self.assertEqual(sessions.prune_expired(batch_size=2, now=self.now), 5)
+        self.assertEqual(set(Session.objects.values_list('session_key', flat=True)), {'live0', 'live1'})
+        self.assertEqual(sessions.prune_expired(batch_size=2, now=self.now), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('prune_sessions', '--batch-size', '3', stdout=out)
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+        self.assertEqual(Session.objects.count(), 2)
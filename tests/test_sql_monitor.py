@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from users.models import CustomUser
+from teacher import sql_monitor
+from teacher.models import TeacherProfile
+
+MIDDLEWARE = settings.MIDDLEWARE + ['teacher.middleware.SQLInstrumentationMiddleware']
+
+
+class FingerprintTest(SimpleTestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            sql_monitor.fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            sql_monitor.fingerprint('SELECT * FROM t WHERE id IN (%s)  AND name = %s LIMIT 5'),
+        )
+
+    def test_different_statements_differ(self):
+        self.assertNotEqual(sql_monitor.fingerprint('SELECT a FROM t WHERE id = %s'),
+                            sql_monitor.fingerprint('SELECT b FROM t WHERE id = %s'))
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE, SQL_MONITOR={'SAMPLE_RATE': 1.0, 'REPEAT_THRESHOLD': 3})
+class SQLInstrumentationMiddlewareTest(TestCase):
+    def setUp(self):
+        sql_monitor.report.reset()
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+        for i in range(5):
+            TeacherProfile.objects.create(user=CustomUser.objects.create_user(username=f't{i}', role='teacher'))
+        self.client.force_login(self.admin)
+
+    def test_request_is_measured_and_reported(self):
+        with self.settings(SQL_MONITOR={'SAMPLE_RATE': 1.0, 'SLOW_MS': 0}), self.assertLogs('teacher.sql') as logs:
+            response = self.client.get(reverse('teacherprofile-list'))
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+')
+        report = self.client.get(reverse('sql_report'), {'format': 'json'}).json()
+        request = report['requests'][0]
+        self.assertEqual((request['path'], request['view']), (reverse('teacherprofile-list'), 'teacherprofile-list'))
+        self.assertGreater(request['queries'], 0)
+        # Every query counts as slow with SLOW_MS=0 and keeps the frames that issued it
+        self.assertEqual(len(request['slow']), min(5, request['queries']))
+        self.assertIn('test_sql_monitor.py', logs.output[0])
+        self.assertNotIn('middleware.py', logs.output[0])
+        self.assertTrue(report['fingerprints'])
+
+    def test_repeated_statements_are_flagged(self):
+        def n_plus_one(request):
+            from django.http import HttpResponse
+            names = [profile.user.username for profile in TeacherProfile.objects.all()]
+            return HttpResponse(','.join(names))
+
+        from teacher.middleware import SQLInstrumentationMiddleware
+        from django.test import RequestFactory
+        with self.assertLogs('teacher.sql', 'WARNING') as logs:
+            SQLInstrumentationMiddleware(n_plus_one)(RequestFactory().get('/n-plus-one/'))
+
+        summary = sql_monitor.report.snapshot()['requests'][0]
+        shape, count, _ = summary['repeated'][0]
+        self.assertEqual(count, 5)
+        self.assertIn('users_customuser', shape)
+        self.assertTrue(any('Possible N+1' in line for line in logs.output))
+
+    def test_unsampled_requests_are_untouched(self):
+        with self.settings(SQL_MONITOR={'SAMPLE_RATE': 0.0}):
+            response = self.client.get(reverse('teacherprofile-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_report_is_admin_only(self):
+        self.client.force_login(CustomUser.objects.get(username='t0'))
+        self.assertEqual(self.client.get(reverse('sql_report'), {'format': 'json'}).status_code, 403)
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from django.db import OperationalError, connections, transaction
+from django.test import SimpleTestCase
+
+from teacher import metrics
+
+ALIAS = 'sqlite_backend_test'
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        self.connect()
+        self.addCleanup(self.disconnect)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE marks (id INTEGER PRIMARY KEY, status TEXT)')
+        metrics.registry.reset()
+
+    def connect(self, **options):
+        if ALIAS in connections.settings:
+            self.disconnect()
+        databases = connections.configure_settings({
+            'default': {}, ALIAS: {'ENGINE': 'teacher.db_backends.sqlite3', 'NAME': self.path, 'OPTIONS': options},
+        })
+        connections.settings[ALIAS] = databases[ALIAS]
+
+    def disconnect(self):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.settings[ALIAS]
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_on_connect(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_pragmas_can_be_overridden(self):
+        self.connect(pragmas={'synchronous': 'FULL', 'mmap_size': None})
+        self.assertEqual(self.pragma('synchronous'), 2)
+        self.assertEqual(self.pragma('mmap_size'), 0)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using=ALIAS):
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+
+    def test_locked_writes_are_retried(self):
+        self.connect(timeout=0.01, lock_retries=8, lock_backoff=0.02)
+        other = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        release = threading.Timer(0.1, other.execute, ['COMMIT'])
+        release.start()
+        self.addCleanup(release.join)
+
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute("INSERT INTO marks (status) VALUES ('present')")
+        self.assertGreater(metrics.registry.counters[('sqlite_lock_retries_total', ())], 0)
+
+    def test_retries_are_bounded(self):
+        self.connect(timeout=0.01, lock_retries=2, lock_backoff=0.01)
+        other = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            with transaction.atomic(using=ALIAS):
+                pass
+        self.assertEqual(metrics.registry.counters[('sqlite_lock_retries_total', ())], 2)
+        other.execute('ROLLBACK')
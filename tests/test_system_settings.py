@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import CustomUser
+from teacher import caching, risk, system_settings
+from teacher.models import SystemSetting
+
+
+@override_settings(SYSTEM_SETTINGS_CHECK_SECONDS=60)
+class SystemSettingsTest(TestCase):
+    def setUp(self):
+        system_settings._cache.clear()
+        self.addCleanup(system_settings._cache.clear)
+
+    def test_defaults_without_rows(self):
+        self.assertEqual(system_settings.get('page_size'), 25)
+        self.assertEqual(system_settings.get('late_threshold_minutes'), 15)
+        with self.assertRaises(KeyError):
+            system_settings.get('colour')
+
+    def test_reads_are_served_from_memory_within_the_check_window(self):
+        system_settings.get('page_size')
+        with self.assertNumQueries(0):
+            for _ in range(100):
+                system_settings.get('page_size')
+
+    def test_other_workers_changes_are_seen_after_the_check_window(self):
+        self.assertEqual(system_settings.get('page_size'), 25)
+        # Written by another process, which cannot clear this process's cache
+        SystemSetting.objects.create(key='page_size', value=50)
+        self.assertEqual(system_settings.get('page_size'), 25)
+
+        system_settings._cache.checked_at -= 61
+        with self.assertNumQueries(2):
+            self.assertEqual(system_settings.get('page_size'), 50)
+
+    def test_unchanged_stamp_does_not_reload(self):
+        system_settings.update({'page_size': 50})
+        system_settings.get('page_size')
+        system_settings._cache.checked_at -= 61
+        with self.assertNumQueries(1):
+            self.assertEqual(system_settings.get('page_size'), 50)
+
+    def test_update_validates_and_refreshes_immediately(self):
+        saved = system_settings.update({'late_threshold_minutes': '20', 'page_size': 100})
+        self.assertEqual(saved, {'late_threshold_minutes': 20, 'page_size': 100})
+        self.assertEqual(system_settings.get('late_threshold_minutes'), 20)
+
+        for changes in ({'page_size': 30}, {'late_threshold_minutes': 0}, {'attendance_threshold': 'high'},
+                        {'colour': 'blue'}):
+            with self.assertRaises(ValueError):
+                system_settings.update(changes)
+        self.assertEqual(system_settings.get('page_size'), 100)
+
+    def test_update_is_all_or_nothing(self):
+        save = SystemSetting.objects.update_or_create
+
+        def fail_on_page_size(key, **kwargs):
+            if key == 'page_size':
+                raise DatabaseError('disk full')
+            return save(key=key, **kwargs)
+
+        with mock.patch.object(SystemSetting.objects, 'update_or_create', side_effect=fail_on_page_size):
+            with self.assertRaises(DatabaseError):
+                system_settings.update({'late_threshold_minutes': 20, 'page_size': 50})
+        self.assertFalse(SystemSetting.objects.exists())
+
+    @override_settings(NAVIGATION_CACHE_TIMEOUT=None)
+    def test_settings_are_read_where_they_apply(self):
+        system_settings.update({'attendance_threshold': 80, 'cache_timeout_minutes': 5,
+                                'session_timeout_minutes': 45})
+        self.assertEqual(risk.at_risk_attendance(), 0.8)
+        self.assertEqual(caching.timeout(), 300)
+        with override_settings(NAVIGATION_CACHE_TIMEOUT=60):
+            self.assertEqual(caching.timeout(), 60)
+
+
+        self.client.force_login(CustomUser.objects.create_user(username='ada', password='x', role='student'))
+        self.assertEqual(self.client.session.get_expiry_age(), 45 * 60)
+
+    def test_invalid_stored_values_fall_back_to_defaults(self):
+        SystemSetting.objects.create(key='page_size', value=7)
+        self.assertEqual(system_settings.get('page_size'), 25)
+
+    def test_reset(self):
+        system_settings.update({'page_size': 50, 'cache_timeout_minutes': 5})
+        system_settings.reset('page_size')
+        self.assertEqual(system_settings.get('page_size'), 25)
+        self.assertEqual(system_settings.get('cache_timeout_minutes'), 5)
+        system_settings.reset()
+        self.assertFalse(SystemSetting.objects.exists())
+
+
+class SystemConfigViewTest(TestCase):
+    def setUp(self):
+        system_settings._cache.clear()
+        self.addCleanup(system_settings._cache.clear)
+        self.admin = CustomUser.objects.create_user(username='admin', password='x', role='admin')
+
+    def test_admins_only(self):
+        teacher = CustomUser.objects.create_user(username='teacher', password='x', role='teacher')
+        self.client.force_login(teacher)
+        response = self.client.post(reverse('system_config'), {'page_size': 50})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SystemSetting.objects.exists())
+
+    def test_post_saves_settings(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('system_config'), {'page_size': '50', 'session_timeout_minutes': '60'})
+        self.assertEqual(response.json(), {'success': True, 'settings': {'page_size': 50, 'session_timeout_minutes': 60}})
+        self.assertEqual(SystemSetting.objects.get(key='page_size').updated_by, self.admin)
+        self.assertEqual(system_settings.get('session_timeout_minutes'), 60)
+
+    def test_post_rejects_invalid_values(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('system_config'), {'page_size': '50', 'cache_timeout_minutes': '500'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Cache timeout', response.json()['error'])
+        self.assertFalse(SystemSetting.objects.exists())
+
+    def test_post_reset_restores_defaults(self):
+        system_settings.update({'page_size': 50, 'attendance_threshold': 90})
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('system_config'), {'reset': '1'})
+        self.assertEqual(response.json()['settings']['page_size'], system_settings.SETTINGS['page_size'].default)
+        self.assertFalse(SystemSetting.objects.exists())
+        self.assertEqual(system_settings.get('attendance_threshold'),
+                         system_settings.SETTINGS['attendance_threshold'].default)
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate, login
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from users.models import CustomUser
+from teacher import throttling
+
+MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'teacher.middleware.LoginThrottleMiddleware',
+]
+
+
+def login_view(request):
+    user = authenticate(request, username=request.POST.get('username'), password=request.POST.get('password'))
+    if user is None:
+        return HttpResponse('Invalid credentials', status=401)
+    login(request, user)
+    return HttpResponse('Welcome')
+
+
+urlpatterns = [
+    path('login/', login_view, name='login'),
+    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+]
+
+
+class SlidingWindowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_previous_window_fades_out(self):
+        window = throttling.SlidingWindow(100)
+        keys = {'ip': '10.0.0.1'}
+        for _ in range(4):
+            window.hit(keys, now=1050)
+        self.assertEqual(window.counts(keys, now=1099)['ip'], 4)
+        self.assertEqual(window.counts(keys, now=1125)['ip'], 3)
+        self.assertEqual(window.counts(keys, now=1150)['ip'], 2)
+        self.assertEqual(window.counts(keys, now=1200)['ip'], 0)
+
+    def test_reset(self):
+        window = throttling.SlidingWindow(100)
+        window.hit({'user_ip': 'ada|10.0.0.1'}, now=1050)
+        window.hit({'user_ip': 'ada|10.0.0.1'}, now=1150)
+        window.reset('user_ip', 'ada|10.0.0.1', now=1160)
+        self.assertEqual(window.counts({'user_ip': 'ada|10.0.0.1'}, now=1160)['user_ip'], 0)
+
+
+@override_settings(ROOT_URLCONF=__name__, MIDDLEWARE=MIDDLEWARE,
+                   LOGIN_THROTTLE={'LIMITS': {'ip': 10, 'user_ip': 3, 'user': 6}})
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='ada', password='secret', role='teacher')
+
+    def attempt(self, username='ada', password='wrong', ip='10.0.0.1'):
+        return self.client.post('/login/', {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_account_is_throttled_per_address_before_authentication(self):
+        for _ in range(3):
+            self.assertEqual(self.attempt().status_code, 401)
+        with mock.patch(f'{__name__}.authenticate') as auth:
+            response = self.attempt(password='secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        auth.assert_not_called()
+        # The same account from another address is still allowed
+        self.assertEqual(self.attempt(password='secret', ip='10.0.0.2').status_code, 200)
+
+    def test_success_clears_the_account_count(self):
+        for _ in range(2):
+            self.attempt()
+        self.assertEqual(self.attempt(password='secret').status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.attempt().status_code, 401)
+
+    def test_credential_stuffing_address_is_throttled(self):
+        for i in range(10):
+            self.assertEqual(self.attempt(username=f'user{i}').status_code, 401)
+        self.assertEqual(self.attempt(username='someone').status_code, 429)
+        self.assertEqual(self.attempt(password='secret', ip='10.0.0.9').status_code, 200)
+
+    def test_account_limit_across_addresses(self):
+        for i in range(6):
+            self.attempt(ip=f'10.0.1.{i}')
+        self.assertEqual(self.attempt(password='secret', ip='10.0.2.1').status_code, 429)
+
+    def test_token_endpoint(self):
+        for _ in range(3):
+            response = self.client.post('/token/', {'username': 'ada', 'password': 'wrong'},
+                                        content_type='application/json', REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post('/token/', {'username': 'ada', 'password': 'secret'},
+                                    content_type='application/json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE={'ENABLED': False})
+    def test_disabled(self):
+        for _ in range(10):
+            self.attempt()
+        self.assertEqual(self.attempt(password='secret').status_code, 200)
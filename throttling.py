@@ -0,0 +1,200 @@
+"""
+Login throttling
+
+Failed logins are counted in sliding windows under three keys:
+
+- 'ip': every failure from one address (credential stuffing tries many
+  accounts from each address)
+- 'user_ip': failures for one account from one address (password guessing)
+- 'user': failures for one account from anywhere, with a higher limit so an
+  attacker cannot lock a user out as easily from other addresses
+
+LoginThrottleMiddleware counts an attempt when a login form or the token
+endpoint is posted, before the view runs, and answers 429 if that takes any
+key over its limit; a rejected attempt never reaches authenticate(), so it
+costs no password hashing. Counting before the attempt runs means concurrent
+attempts cannot all slip in under the limit. Attempts that did not fail
+(no user_login_failed signal) are taken back once the response is ready,
+and a successful login also clears the earlier failures of its 'user_ip' key.
+
+Each key keeps two fixed buckets in the cache (the current and previous
+window) and the count is estimated as current + previous * (unelapsed part of
+the current window), a sliding window in O(1) space per key. The check is a
+get_many and one increment per key. Use a cache shared by all workers (Redis,
+Memcached) so every worker sees the same counts.
+
+Enable it with 'teacher.middleware.LoginThrottleMiddleware' in MIDDLEWARE
+and tune it with the LOGIN_THROTTLE setting (see DEFAULTS).
+"""
+
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import LOGIN_THROTTLED
+
+DEFAULTS = {
+    'ENABLED': True,
+    'WINDOW_SECONDS': 15 * 60,
+    # Failures allowed per window before attempts are rejected
+    'LIMITS': {'ip': 30, 'user_ip': 5, 'user': 50},
+    # URL names of the views that take passwords
+    'VIEWS': ('login', 'users:student_credential_login', 'token_obtain_pair', 'admin:login'),
+    # Form fields (or JSON keys) naming the account
+    'IDENTIFIER_FIELDS': ('username', 'student_id'),
+}
+KEY_PREFIX = 'teacher:login'
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'LOGIN_THROTTLE', {})}
+
+
+def client_ip(request):
+    # Set REMOTE_ADDR from a trusted proxy's header in the proxy, not here:
+    # X-Forwarded-For can be set to anything by the client
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def login_identifier(request, fields):
+    """The account name posted to a login view ('' if there is none)"""
+    data = request.POST
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip().lower()[:150]
+    return ''
+
+
+def throttle_keys(ip, identifier):
+    """{scope: key} for an attempt; account scopes only when an account was named"""
+    keys = {'ip': ip}
+    if identifier:
+        keys['user_ip'] = f'{identifier}|{ip}'
+        keys['user'] = identifier
+    return keys
+
+
+class SlidingWindow:
+    """Failure counts per key over a sliding window, kept as two cache buckets per key"""
+
+    def __init__(self, window):
+        self.window = window
+
+    def _buckets(self, scope, key, now):
+        # Hashed so any username is a valid cache key
+        digest = hashlib.sha1(key.encode()).hexdigest()[:24]
+        bucket = int(now // self.window)
+        return f'{KEY_PREFIX}:{scope}:{digest}:{bucket}', f'{KEY_PREFIX}:{scope}:{digest}:{bucket - 1}'
+
+    def counts(self, keys, now=None):
+        """{scope: estimated failures in the last window} for {scope: key}"""
+        now = time.time() if now is None else now
+        buckets = {scope: self._buckets(scope, key, now) for scope, key in keys.items()}
+        stored = cache.get_many([name for pair in buckets.values() for name in pair])
+        unelapsed = 1 - (now % self.window) / self.window
+        return {
+            scope: stored.get(current, 0) + stored.get(previous, 0) * unelapsed
+            for scope, (current, previous) in buckets.items()
+        }
+
+    def hit(self, keys, now=None):
+        """
+        Count one failure under each key; returns {scope: (bucket, estimated
+        count including this one)}, the buckets being what undo() takes back.
+        """
+        now = time.time() if now is None else now
+        buckets = {scope: self._buckets(scope, key, now) for scope, key in keys.items()}
+        unelapsed = 1 - (now % self.window) / self.window
+        previous = cache.get_many([pair[1] for pair in buckets.values()])
+        counts = {}
+        for scope, (current, before) in buckets.items():
+            # Kept for two windows: one as the current bucket, one as the previous
+            if cache.add(current, 1, 2 * self.window):
+                count = 1
+            else:
+                try:
+                    count = cache.incr(current)
+                except ValueError:
+                    # Evicted between add() and incr()
+                    cache.set(current, 1, 2 * self.window)
+                    count = 1
+            counts[scope] = (current, count + previous.get(before, 0) * unelapsed)
+        return counts
+
+    def undo(self, buckets):
+        for bucket in buckets:
+            try:
+                cache.decr(bucket)
+            except ValueError:
+                pass
+
+    def reset(self, scope, key, now=None):
+        now = time.time() if now is None else now
+        cache.delete_many(self._buckets(scope, key, now))
+
+    def retry_after(self, now=None):
+        now = time.time() if now is None else now
+        return math.ceil(self.window - now % self.window)
+
+
+def check(request):
+    """
+    Count the attempt; (scope, retry_after) when it must be rejected,
+    otherwise None and the attempt stays counted until finish().
+    """
+    options = config()
+    identifier = login_identifier(request, options['IDENTIFIER_FIELDS'])
+    # Remembered so a success clears the same account name
+    request._login_identifier = identifier
+    window = SlidingWindow(options['WINDOW_SECONDS'])
+    now = time.time()
+    counts = window.hit(throttle_keys(client_ip(request), identifier), now)
+    buckets = [bucket for bucket, _ in counts.values()]
+    for scope, (_, count) in counts.items():
+        if count > options['LIMITS'][scope]:
+            window.undo(buckets)
+            LOGIN_THROTTLED.inc(scope=scope)
+            return scope, window.retry_after(now)
+    request._login_attempt = buckets
+    return None
+
+
+def finish(request):
+    """Take back the attempt counted by check() unless it failed"""
+    buckets = getattr(request, '_login_attempt', None)
+    if buckets and not getattr(request, '_login_failed', False):
+        SlidingWindow(config()['WINDOW_SECONDS']).undo(buckets)
+
+
+def _http_request(request):
+    # DRF passes its Request wrapper to authenticate()
+    return getattr(request, '_request', request)
+
+
+def record_failure(request, username=''):
+    request = _http_request(request)
+    if getattr(request, '_login_attempt', None):
+        # Already counted by check()
+        request._login_failed = True
+        return
+    identifier = (username or '').strip().lower()[:150]
+    SlidingWindow(config()['WINDOW_SECONDS']).hit(throttle_keys(client_ip(request), identifier))
+
+
+def record_success(request):
+    request = _http_request(request)
+    identifier = getattr(request, '_login_identifier', None)
+    if identifier:
+        SlidingWindow(config()['WINDOW_SECONDS']).reset('user_ip', f'{identifier}|{client_ip(request)}')
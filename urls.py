@@ -1,12 +1,38 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TeacherProfileViewSet, AssignmentViewSet, QuizViewSet
+from .views import (
+    TeacherProfileViewSet, AssignmentViewSet, QuizViewSet, GradebookViewSet, export_data,
+    data_job_create, data_job_import, data_job_status, data_job_download, accept_invite,
+    sql_report, metrics_endpoint, profiler_sessions, profiler_session, profiler_download,
+    automation_rules, risk_students, attendance_trends, system_config, student_report,
+    announcement_inbox, announcement_read, school_announcement_create,
+)
 
 router = DefaultRouter()
 router.register(r'teacherprofiles', TeacherProfileViewSet, basename='teacherprofile')
 router.register(r'assignments', AssignmentViewSet, basename='assignment')
 router.register(r'quizzes', QuizViewSet, basename='quiz')
+router.register(r'gradebook', GradebookViewSet, basename='gradebook')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('exports/', export_data, name='export_data'),
+    path('jobs/', data_job_create, name='data_job_create'),
+    path('jobs/import/', data_job_import, name='data_job_import'),
+    path('jobs/<int:job_id>/', data_job_status, name='data_job_status'),
+    path('jobs/<int:job_id>/download/', data_job_download, name='data_job_download'),
+    path('invites/accept/', accept_invite, name='accept_invite'),
+    path('monitoring/sql/', sql_report, name='sql_report'),
+    path('metrics/', metrics_endpoint, name='metrics'),
+    path('monitoring/profiler/', profiler_sessions, name='profiler_sessions'),
+    path('monitoring/profiler/<int:session_id>/', profiler_session, name='profiler_session'),
+    path('monitoring/profiler/<int:session_id>/<str:output>/', profiler_download, name='profiler_download'),
+    path('automation/', automation_rules, name='automation_rules'),
+    path('analytics/risk/', risk_students, name='risk_students'),
+    path('analytics/attendance/', attendance_trends, name='attendance_trends'),
+    path('system/config/', system_config, name='system_config'),
+    path('reports/students/<int:student_id>/', student_report, name='student_report'),
+    path('announcements/', announcement_inbox, name='announcement_inbox'),
+    path('announcements/read/', announcement_read, name='announcement_read'),
+    path('announcements/school/', school_announcement_create, name='school_announcement_create'),
 ]
@@ -1,18 +1,515 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden,
+    JsonResponse, StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework import viewsets, permissions
-from .models import TeacherProfile, Assignment, Quiz
-from .serializers import TeacherProfileSerializer, AssignmentSerializer, QuizSerializer
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from . import (
+    announcements, automation, exports, jobs, metrics, parent_access, profiler, provisioning, reports, rollups, sql_monitor,
+    system_settings,
+)
+from .api_auth import CachedJWTAuthentication
+from .routers import keep_routing
+from .models import (
+    TeacherProfile, Assignment, Quiz, GradebookEntry, DataJob, ProfilingSession, AutomationRule, AutomationRun,
+    AutomationAlert, RiskModelRun, StudentRiskScore, SystemSetting,
+)
+from .serializers import TeacherProfileSerializer, AssignmentSerializer, QuizSerializer, GradebookEntrySerializer
+
+# API clients authenticate with JWTs, the browsable API with the login session
+API_AUTHENTICATION = [CachedJWTAuthentication, SessionAuthentication]
 
 class TeacherProfileViewSet(viewsets.ModelViewSet):
     queryset = TeacherProfile.objects.all()
     serializer_class = TeacherProfileSerializer
+    authentication_classes = API_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
 class AssignmentViewSet(viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
+    authentication_classes = API_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
 class QuizViewSet(viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
+    authentication_classes = API_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+
+class GradebookViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Class rankings from the materialized gradebook, filtered by ?classroom=&subject=.
+    Admins see every row, teachers the classrooms they teach, students and
+    parents only their own or their children's rows.
+    """
+    serializer_class = GradebookEntrySerializer
+    authentication_classes = API_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        entries = GradebookEntry.objects.select_related('student').order_by('classroom', 'subject', 'rank')
+        role = getattr(user, 'role', None)
+        if is_school_admin(user):
+            pass
+        elif parent_access.is_parent(user):
+            entries = parent_access.restrict(entries, self.request)
+        elif role == 'student':
+            entries = entries.filter(student=user)
+        elif role == 'teacher':
+            entries = entries.filter(classroom__teacher=user)
+        else:
+            entries = entries.none()
+        for param in ('classroom', 'subject'):
+            value = self.request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    raise DRFValidationError({param: 'Must be a classroom or subject id.'})
+                entries = entries.filter(**{f'{param}_id': int(value)})
+        return entries
+
+
+def is_school_admin(user):
+    return user.is_staff or getattr(user, 'role', None) == 'admin'
+
+
+@login_required
+def export_data(request):
+    """Stream an export for the data management page without buffering it in memory"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can export data.')
+
+    export_type = request.GET.get('type', '')
+    export_format = request.GET.get('format', 'csv').lower()
+    compress = request.GET.get('compress') in ('1', 'true', 'gzip')
+    try:
+        datasets = exports.resolve_datasets(export_type)
+        # Checked here: once streaming has started an error can only truncate the file
+        start_date, end_date = exports.parse_date_range(request.GET.get('start_date'), request.GET.get('end_date'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if export_format not in exports.EXPORT_FORMATS:
+        return HttpResponseBadRequest(f'Unsupported format: {export_format}')
+
+    stream = exports.export_stream(
+        datasets,
+        export_format=export_format,
+        compress=compress,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    content_type = 'application/gzip' if compress else exports.EXPORT_FORMATS[export_format][0]
+    # The stream runs after the view returns, outside the request's routing
+    response = StreamingHttpResponse(keep_routing(stream), content_type=content_type)
+    filename = exports.export_filename(export_type, export_format, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def job_payload(job):
+    payload = {
+        'id': job.id,
+        'kind': job.kind,
+        'job_type': job.job_type,
+        'status': job.status,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'percent': job.percent,
+        'error': job.error.split('\n', 1)[0] if job.error else '',
+        'status_url': reverse('data_job_status', args=[job.id]),
+    }
+    if job.status == 'completed' and job.artifact:
+        payload['download_url'] = reverse('data_job_download', args=[job.id])
+        payload['artifact_size'] = job.artifact_size
+    if job.kind == 'import' and 'result' in job.params:
+        payload['result'] = job.params['result']
+    return payload
+
+
+@login_required
+@require_POST
+def data_job_create(request):
+    """Queue a background export and return its progress URL"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can export data.')
+    try:
+        job = jobs.enqueue_export(
+            request.user,
+            request.POST.get('type', ''),
+            export_format=request.POST.get('format', 'csv').lower(),
+            compress=request.POST.get('compress') in ('1', 'true', 'gzip'),
+            start_date=request.POST.get('start_date') or None,
+            end_date=request.POST.get('end_date') or None,
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, 'job': job_payload(job)}, status=202)
+
+
+@login_required
+@require_POST
+def data_job_import(request):
+    """Queue a background CSV import of an uploaded file"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can import data.')
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'message': 'No file uploaded.'}, status=400)
+    try:
+        job = jobs.enqueue_import(request.user, request.POST.get('type', ''), upload)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, 'job': job_payload(job)}, status=202)
+
+
+@login_required
+@require_GET
+def data_job_status(request, job_id):
+    """Progress of a data job, polled by the data management page"""
+    job = get_object_or_404(DataJob, id=job_id, created_by=request.user)
+    return JsonResponse(job_payload(job))
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+DOWNLOAD_BLOCK = 64 * 1024
+
+
+def _file_range(path, start, length):
+    with open(path, 'rb') as artifact:
+        artifact.seek(start)
+        while length > 0:
+            data = artifact.read(min(DOWNLOAD_BLOCK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+@login_required
+@require_GET
+def data_job_download(request, job_id):
+    """Download a job artifact, honouring Range requests so downloads can resume"""
+    job = get_object_or_404(DataJob, id=job_id, created_by=request.user, status='completed')
+    path = jobs.artifact_path(job)
+    if not job.artifact or not os.path.exists(path):
+        raise Http404('Export file is no longer available.')
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{job.id}-{size}-{int(stat.st_mtime)}"'
+    range_header = request.META.get('HTTP_RANGE', '')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    match = RANGE_RE.match(range_header)
+    if match and (not if_range or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(0, size - int(last))
+            end = size - 1
+        else:
+            start, end = 0, size - 1
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        response = StreamingHttpResponse(_file_range(path, start, end - start + 1), status=206,
+                                         content_type='application/octet-stream')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type='application/octet-stream')
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Content-Disposition'] = f'attachment; filename="{job.artifact.split("_", 2)[-1]}"'
+    return response
+
+
+@require_POST
+def accept_invite(request):
+    """Set the first password for a provisioned account from its one-time invite token"""
+    password = request.POST.get('password', '')
+    try:
+        validate_password(password)
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'message': ' '.join(e.messages)}, status=400)
+    try:
+        user = provisioning.redeem_invite(request.POST.get('token', ''), password)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, 'username': user.username})
+
+
+@login_required
+def sql_report(request):
+    """Rolling SQL report from SQLInstrumentationMiddleware (this process only)"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can view the SQL report.')
+    if request.method == 'POST':
+        sql_monitor.report.reset(sql_monitor.config()['REPORT_SIZE'])
+        return redirect('sql_report')
+    snapshot = sql_monitor.report.snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(snapshot)
+    return render(request, 'advanced/sql_report.html', {'report': snapshot, 'options': sql_monitor.config()})
+
+
+@require_GET
+def metrics_endpoint(request):
+    """Text exposition for Prometheus, for admins and for scrapers listed in METRICS_ALLOWED_IPS"""
+    # No addresses by default: behind a local reverse proxy every request comes from loopback
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not is_school_admin(request.user):
+        return HttpResponseForbidden('Metrics are only available to administrators and allowed scrapers.')
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required
+def profiler_sessions(request):
+    """Arm the sampling profiler and list recent profiling sessions"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can use the profiler.')
+    error = None
+    if request.method == 'POST':
+        user = None
+        username = request.POST.get('username', '').strip()
+        try:
+            if username:
+                user = get_user_model().objects.filter(username=username).first()
+                if user is None:
+                    raise ValueError(f'No user named {username}.')
+            session = profiler.arm(
+                request.user,
+                url_pattern=request.POST.get('url_pattern', '').strip(),
+                user=user,
+                requests=int(request.POST.get('requests') or 10),
+                interval_ms=int(request.POST.get('interval_ms') or profiler.DEFAULT_INTERVAL_MS),
+                minutes=int(request.POST.get('minutes') or profiler.DEFAULT_MINUTES),
+            )
+        except ValueError as e:
+            error = str(e)
+        else:
+            return redirect('profiler_session', session_id=session.pk)
+    sessions = ProfilingSession.objects.select_related('user', 'created_by')[:50]
+    return render(request, 'advanced/profiler.html', {
+        'sessions': sessions, 'error': error, 'form': request.POST if error else {},
+    })
+
+
+@login_required
+def profiler_session(request, session_id):
+    """Captures and top functions of one profiling session; POST disarms it"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can use the profiler.')
+    session = get_object_or_404(ProfilingSession.objects.select_related('user'), pk=session_id)
+    if request.method == 'POST':
+        profiler.disarm(session)
+        return redirect('profiler_session', session_id=session.pk)
+    captures = list(session.captures.all())
+    stacks = profiler.merged_stacks(captures)
+    return render(request, 'advanced/profiler_session.html', {
+        'session': session,
+        'captures': captures,
+        'samples': sum(stacks.values()),
+        'top_functions': profiler.top_functions(stacks),
+    })
+
+
+@login_required
+@require_GET
+def profiler_download(request, session_id, output):
+    """Collapsed stacks (for flame graphs) or the top-functions table as CSV"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can use the profiler.')
+    session = get_object_or_404(ProfilingSession, pk=session_id)
+    stacks = profiler.merged_stacks(session.captures.all())
+    if output == 'collapsed':
+        response = HttpResponse(profiler.collapsed_text(stacks), content_type='text/plain; charset=utf-8')
+        filename = f'profile_{session.pk}.collapsed.txt'
+    elif output == 'top':
+        response = HttpResponse(profiler.top_functions_csv(stacks), content_type='text/csv')
+        filename = f'profile_{session.pk}_top_functions.csv'
+    else:
+        raise Http404('Unknown profile output')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def automation_rules(request):
+    """Automation rules with their recent runs; POST runs all active rules or toggles one"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can manage automation rules.')
+    if request.method == 'POST':
+        if request.POST.get('action') == 'toggle':
+            rule_id = request.POST.get('rule_id', '')
+            if not rule_id.isdigit():
+                return HttpResponseBadRequest('rule_id must be an automation rule id.')
+            rule = get_object_or_404(AutomationRule, pk=int(rule_id))
+            rule.status = 'inactive' if rule.status == 'active' else 'active'
+            rule.save(update_fields=['status'])
+            return JsonResponse({'success': True, 'status': rule.status})
+        automation.run_due_rules(force=True)
+        return redirect('automation_rules')
+    week_ago = timezone.now() - timedelta(days=7)
+    return render(request, 'advanced/automation.html', {
+        'automation_rules': AutomationRule.objects.all(),
+        'automation_runs': AutomationRun.objects.select_related('rule')[:20],
+        'alerts_this_week': AutomationAlert.objects.filter(created_at__gte=week_ago).count(),
+        'open_alerts': AutomationAlert.objects.filter(resolved_at__isnull=True).count(),
+    })
+
+
+@login_required
+@require_GET
+def risk_students(request):
+    """Stored at-risk scores from the nightly pipeline for the analytics page"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can view risk predictions.')
+    run = RiskModelRun.objects.first()
+    if run is None:
+        return JsonResponse({'scored_at': None, 'summary': {}, 'students': []})
+    scores = StudentRiskScore.objects.filter(level='high').select_related('student')[:10]
+    return JsonResponse({
+        'scored_at': run.scored_at.isoformat(),
+        'summary': run.summary,
+        'students': [
+            {
+                'id': score.student_id,
+                'name': score.student.get_full_name() or score.student.username,
+                'score': score.score,
+                'level': score.level,
+                'top_factor': score.top_factor,
+                'attendance_14d': score.features.get('attendance_14d'),
+            }
+            for score in scores
+        ],
+    })
+
+
+@login_required
+@require_GET
+def attendance_trends(request):
+    """Monthly attendance trend and class comparison for the academic year, read from the rollups"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can view school analytics.')
+    start, end = rollups.academic_year()
+    classroom = request.GET.get('classroom', '')
+    return JsonResponse({
+        'start': start,
+        'end': end,
+        'months': rollups.monthly_trend(start, end, classroom_id=int(classroom) if classroom.isdigit() else None),
+        'classrooms': rollups.class_comparison(start, end),
+    })
+
+
+@login_required
+def system_config(request):
+    """System settings page; POST validates and stores the submitted settings, or with reset=1
+    returns every setting to its default"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can change system settings.')
+    if request.method == 'POST' and request.POST.get('reset'):
+        system_settings.reset()
+        return JsonResponse({'success': True, 'settings': system_settings.values()})
+    if request.method == 'POST':
+        changes = {key: request.POST[key] for key in system_settings.SETTINGS if key in request.POST}
+        try:
+            saved = system_settings.update(changes, user=request.user)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        return JsonResponse({'success': True, 'settings': saved})
+    last_change = SystemSetting.objects.order_by('-updated_at').first()
+    return render(request, 'advanced/system_config.html', {
+        'current_config': {
+            **system_settings.values(),
+            'last_update': last_change.updated_at if last_change else 'Never',
+        },
+        'page_sizes': system_settings.SETTINGS['page_size'].choices,
+    })
+
+
+@login_required
+@require_GET
+@parent_access.parent_access_required
+def student_report(request, student_id):
+    """A student's term report (?term=2025-fall, default the current term) as JSON, or streamed as a
+    printable HTML page with ?format=html"""
+    if getattr(request.user, 'role', None) == 'student' and request.user.pk != student_id:
+        return HttpResponseForbidden('You can only view your own report.')
+    try:
+        term = reports.term_named(request.GET['term']) if request.GET.get('term') else reports.term_for()
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    report = reports.student_report(student_id, term)
+    if request.GET.get('format') != 'html':
+        return JsonResponse(report)
+    response = StreamingHttpResponse(reports.render_html(report), content_type='text/html; charset=utf-8')
+    if request.GET.get('download'):
+        response['Content-Disposition'] = f'attachment; filename="{reports.report_filename(report)}"'
+    return response
+
+
+def _stream_key(classroom_id):
+    return 'school' if classroom_id is announcements.SCHOOL else str(classroom_id)
+
+
+@login_required
+@require_GET
+def announcement_inbox(request):
+    """Unread counts per stream and the newest announcements across the user's streams"""
+    unread = announcements.unread_counts(request.user)
+    return JsonResponse({
+        'unread': {_stream_key(stream): count for stream, count in unread.items()},
+        'total_unread': sum(unread.values()),
+        'announcements': announcements.inbox(request.user),
+    })
+
+
+@login_required
+@require_POST
+def announcement_read(request):
+    """Mark the stream of the posted classroom, or the school stream without one, read up to `up_to` or its newest"""
+    classroom = request.POST.get('classroom') or None
+    up_to = request.POST.get('up_to') or None
+    if (classroom is not None and not classroom.isdigit()) or (up_to is not None and not up_to.isdigit()):
+        return HttpResponseBadRequest('classroom and up_to must be announcement and classroom ids.')
+    if classroom is not None:
+        classroom = int(classroom)
+        if classroom not in announcements.classroom_ids(request.user):
+            return HttpResponseForbidden('You do not receive announcements from this classroom.')
+    last_read = announcements.mark_read(request.user, classroom, int(up_to) if up_to else None)
+    return JsonResponse({'stream': _stream_key(classroom), 'last_read_id': last_read})
+
+
+@login_required
+@require_POST
+def school_announcement_create(request):
+    """Post an announcement to the whole school"""
+    if not is_school_admin(request.user):
+        return HttpResponseForbidden('Only administrators can post school announcements.')
+    message = request.POST.get('message', '').strip()
+    if not message:
+        return HttpResponseBadRequest('The announcement needs a message.')
+    announcement = announcements.post(message, author=request.user)
+    return JsonResponse({'id': announcement.pk, 'created_at': announcement.created_at}, status=201)
@@ -5,13 +5,52 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from .models import AttendanceSession, AttendanceRecord, AttendanceReport
 from classroom.models import Classroom
 from subject.models import Subject
 from users.models import CustomUser
+from teacher import caching, system_settings
 import json
 from datetime import datetime, timedelta
 
+class StudentAttendanceRow:
+    """Attendance statistics for one student row, queried on first use"""
+
+    def __init__(self, student):
+        self.student = student
+
+    @cached_property
+    def counts(self):
+        return AttendanceRecord.objects.filter(student=self.student).aggregate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present')),
+            late=Count('id', filter=Q(status='late')),
+            absent=Count('id', filter=Q(status='absent')),
+        )
+
+    @property
+    def total_sessions(self):
+        return self.counts['total']
+
+    @property
+    def present_count(self):
+        return self.counts['present']
+
+    @property
+    def late_count(self):
+        return self.counts['late']
+
+    @property
+    def absent_count(self):
+        return self.counts['absent']
+
+    @property
+    def attendance_percentage(self):
+        total = self.counts['total']
+        return round(self.counts['present'] / total * 100, 1) if total > 0 else 0
+
+
 def attendance_list(request):
     """Main attendance page showing student attendance list"""
     # Get all students with their attendance statistics
@@ -26,34 +65,16 @@ def attendance_list(request):
     if classroom_filter:
         students = students.filter(student_profile__classroom_id=classroom_filter)
     
-    # Get attendance data for each student
-    student_data = []
-    for student in students:
-        # Calculate attendance statistics
-        total_sessions = AttendanceRecord.objects.filter(student=student).count()
-        present_count = AttendanceRecord.objects.filter(student=student, status='present').count()
-        late_count = AttendanceRecord.objects.filter(student=student, status='late').count()
-        absent_count = AttendanceRecord.objects.filter(student=student, status='absent').count()
-        
-        attendance_percentage = (present_count / total_sessions * 100) if total_sessions > 0 else 0
-        
-        student_data.append({
-            'student': student,
-            'total_sessions': total_sessions,
-            'present_count': present_count,
-            'late_count': late_count,
-            'absent_count': absent_count,
-            'attendance_percentage': round(attendance_percentage, 1)
-        })
-    
-    # Pagination
-    paginator = Paginator(student_data, 20)
+    # Rows count their records only when rendered, so rows served from the
+    # fragment cache cost no queries
+    paginator = Paginator(students.select_related('student_profile__classroom').order_by('pk'), system_settings.get('page_size'))
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = [StudentAttendanceRow(student) for student in page_obj.object_list]
     
     # Get filter options
-    classrooms = Classroom.objects.all()
-    subjects = Subject.objects.all()
+    classrooms = caching.classrooms()
+    subjects = caching.subjects()
     
     context = {
         'page_obj': page_obj,
@@ -117,13 +138,13 @@ def attendance_sessions_list(request):
         sessions = sessions.filter(start_time__date=date_filter)
     
     # Pagination
-    paginator = Paginator(sessions, 10)
+    paginator = Paginator(sessions, system_settings.get('page_size'))
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
     # Get filter options
-    classrooms = Classroom.objects.all()
-    subjects = Subject.objects.all()
+    classrooms = caching.classrooms()
+    subjects = caching.subjects()
     
     context = {
         'page_obj': page_obj,
@@ -161,6 +182,7 @@ def attendance_session_create(request):
                 teacher=request.user,
                 attendance_type=attendance_type,
                 duration_minutes=duration_minutes,
+                late_threshold_minutes=system_settings.get('late_threshold_minutes'),
                 end_time=timezone.now() + timedelta(minutes=duration_minutes)
             )
             
@@ -171,8 +193,8 @@ def attendance_session_create(request):
             messages.error(request, f'Error creating session: {str(e)}')
     
     # Get context for form
-    classrooms = Classroom.objects.all()
-    subjects = Subject.objects.all()
+    classrooms = caching.classrooms()
+    subjects = caching.subjects()
     
     context = {
         'classrooms': classrooms,
@@ -243,9 +265,15 @@ def attendance_mark_ajax(request):
                         teacher=request.user,
                         attendance_type='daily',
                         start_time=timezone.now(),
-                        end_time=timezone.now() + timedelta(hours=1)
+                        end_time=timezone.now() + timedelta(hours=1),
+                        late_threshold_minutes=system_settings.get('late_threshold_minutes')
                     )
                 
+                # Marked present after the session's late threshold counts as late
+                late_after = session.start_time + timedelta(minutes=session.late_threshold_minutes)
+                if status == 'present' and timezone.now() > late_after:
+                    status = 'late'
+                
                 # Create or update attendance record
                 record, created = AttendanceRecord.objects.get_or_create(
                     session=session,
@@ -350,8 +378,8 @@ def attendance_reports(request):
         sessions = sessions.filter(start_time__date__lte=date_to)
     
     # Get filter options
-    classrooms = Classroom.objects.all()
-    subjects = Subject.objects.all()
+    classrooms = caching.classrooms()
+    subjects = caching.subjects()
     
     context = {
         'sessions': sessions,